@@ -0,0 +1,413 @@
+"""
+Benchmark
+Internetsiz yuklama sinovi: soxta yt-dlp va soxta Telegram Bot API bilan
+N ta parallel foydalanuvchi xabarlarini dp.feed_update orqali o'lchash.
+Xabarlar middleware'lardan o'tib handle_text_messages'ga tushadi va ssenariyga
+qarab search_song, search_artist yoki handle_link -> handle_video_link
+(Instagram havolalari) bajariladi.
+
+yt_dlp.YoutubeDL o'rniga tayyor info lug'atlari va generatsiya qilingan media
+fayllarni qaytaruvchi FakeYoutubeDL (sozlanadigan kechikish bilan) ishlatiladi,
+Bot API so'rovlari esa lokal aiohttp stub serverga yuboriladi (BOT_API_URL).
+Shuning uchun natijalar tarmoqqa bog'liq emas va o'zgarishlarni solishtirish mumkin.
+
+Ishlatish:
+    python benchmark.py --users 50 --requests 4 --scenario mix
+    python benchmark.py --users 20 --scenario artist --download-latency 2.0
+    python benchmark.py --users 100 --distinct 5      # keshlar va birlashtirish bilan
+
+Natija: kechikish (p50/p95/p99), o'tkazuvchanlik va eng yuqori RSS.
+ffmpeg o'rnatilgan bo'lsa haqiqiy (qisqa) m4a/mp4 fayllar yaratiladi, aks holda
+tasodifiy baytlar yoziladi (audio ajratish va kodlash bosqichlari xatolik beradi).
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import asyncio
+import hashlib
+import logging
+import argparse
+import itertools
+import resource
+import tempfile
+import subprocess
+from collections import Counter
+
+from aiohttp import web
+
+from webhook_replay import percentile
+from metrics import YDL_FIRST_BYTE_SECONDS, QUEUE_WAIT_SECONDS, AUDIO_EXTRACT_SECONDS
+
+
+
+# SOXTA YT-DLP
+
+
+class FakeYoutubeDL:
+    """
+    yt_dlp.YoutubeDL o'rnini bosuvchi sinf: tarmoqqa chiqmaydi, kechikishni
+    time.sleep orqali taqlid qiladi (haqiqiy yt-dlp kabi thread'ni band qiladi).
+    """
+
+    init_latency = 0.0
+    search_latency = 0.5
+    download_latency = 1.5
+    jitter = 0.3
+    # kengaytma -> namuna fayl (prepare_media yaratadi)
+    media = {}
+
+    def __init__(self, params=None):
+        # Extractor'lar, cookie jar va HTTP handler'larni ishga tushirish narxi
+        self._sleep(self.init_latency)
+        self.params = params or {}
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def _sleep(self, base: float) -> None:
+        if base > 0:
+            time.sleep(max(0.0, random.gauss(base, base * self.jitter)))
+
+    def _first_byte(self) -> None:
+        for hook in self.params.get('progress_hooks', []):
+            hook({'status': 'downloading', 'downloaded_bytes': 1})
+
+    def extract_info(self, url: str, download: bool = True, **kwargs):
+        self._sleep(self.search_latency)
+        match = re.match(r'ytsearch(\d+):(.+)', url)
+        if match:
+            return {'_type': 'playlist', 'entries': fake_search_entries(match.group(2), int(match.group(1)))}
+        if 'instagram.com' in url:
+            info = fake_instagram_info(url)
+        else:
+            video_id = url.rsplit('=', 1)[-1]
+            info = {'id': video_id, 'title': video_id, 'ext': 'm4a', 'duration': 180}
+        if download:
+            return self.process_ie_result(info, download=True)
+        return info
+
+    def prepare_filename(self, info: dict) -> str:
+        template = self.params.get('outtmpl', '%(id)s.%(ext)s')
+        if isinstance(template, dict):
+            template = template.get('default', '%(id)s.%(ext)s')
+        return template.replace('%(id)s', info['id']).replace('%(ext)s', info['ext'])
+
+    def process_ie_result(self, info: dict, download: bool = True):
+        self._sleep(self.download_latency)
+        self._first_byte()
+        path = self.prepare_filename(info)
+        write_media(path, info['ext'])
+        return {**info, 'requested_downloads': [{'filepath': path}]}
+
+
+def fake_search_entries(query: str, count: int) -> list:
+    """So'rov bo'yicha barqaror (deterministik) qidiruv natijalari"""
+    digest = hashlib.sha1(query.encode('utf-8')).hexdigest()
+    name = re.sub(r'\s*official audio$', '', query, flags=re.IGNORECASE).title()
+    entries = []
+    for i in range(count):
+        video_id = f"{digest[:8]}{i:03d}"
+        entries.append({
+            'id': video_id,
+            'title': f"{name} - Qo'shiq {i + 1} (Official Audio)",
+            'uploader': f"{name} - Topic",
+            'channel': f"{name} - Topic",
+            'duration': 150 + (i * 37) % 200,
+            'url': f"https://www.youtube.com/watch?v={video_id}",
+        })
+    return entries
+
+
+def fake_instagram_info(url: str) -> dict:
+    shortcode = url.rstrip('/').rsplit('/', 1)[-1]
+    return {
+        'id': shortcode,
+        'title': f"Video by bench_{shortcode.lower()}",
+        'uploader': f"bench_{shortcode.lower()}",
+        'track': f"Qo'shiq {shortcode}",
+        'artist': "Benchmark Ijrochi",
+        'description': '',
+        'ext': 'mp4',
+    }
+
+
+def write_media(path: str, ext: str) -> None:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    shutil.copyfile(FakeYoutubeDL.media[ext], path)
+
+
+def prepare_media(directory: str, audio_seconds: int, video_seconds: int, fallback_kb: int) -> bool:
+    """
+    Namuna media fayllarni yaratish (ffmpeg bo'lsa haqiqiy, aks holda tasodifiy baytlar)
+
+    Returns:
+        True - ffmpeg orqali yaratildi
+    """
+    commands = {
+        'm4a': ['-f', 'lavfi', '-i', f'sine=frequency=440:duration={audio_seconds}', '-c:a', 'aac', '-b:a', '128k'],
+        'mp3': ['-f', 'lavfi', '-i', f'sine=frequency=440:duration={audio_seconds}', '-c:a', 'libmp3lame', '-b:a', '192k'],
+        'mp4': ['-f', 'lavfi', '-i', f'testsrc=size=320x240:rate=15:duration={video_seconds}',
+                '-f', 'lavfi', '-i', f'sine=frequency=440:duration={video_seconds}',
+                '-c:v', 'mpeg4', '-c:a', 'aac', '-shortest'],
+    }
+    real = True
+    for ext, args in commands.items():
+        path = os.path.join(directory, f"sample.{ext}")
+        try:
+            subprocess.run(['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', *args, path],
+                           check=True, capture_output=True)
+        except (OSError, subprocess.CalledProcessError):
+            real = False
+            with open(path, 'wb') as f:
+                f.write(os.urandom(fallback_kb * 1024))
+        FakeYoutubeDL.media[ext] = path
+    return real
+
+
+
+# SOXTA TELEGRAM BOT API
+
+
+class FakeBotAPI:
+    """
+    Lokal Bot API stub: /bot<token>/<method> so'rovlariga Telegram kabi javob beradi.
+    Yuborish kechikishi = api_latency + hajm / upload_speed.
+    chat_limit > 0 bo'lsa, bitta chatga sekundiga shundan ko'p so'rov 429 oladi.
+    """
+
+    def __init__(self, latency: float, upload_mbps: float, chat_limit: int = 0):
+        self.latency = latency
+        self.upload_bps = upload_mbps * 1024 * 1024 / 8
+        self.chat_limit = chat_limit
+        self.calls = Counter()
+        self.bytes_received = 0
+        self._ids = itertools.count(1)
+        self._recent = {}
+
+    async def handle(self, request):
+        method = request.match_info['method']
+        size = request.content_length or 0
+        params = await request.post()
+        self.calls[method] += 1
+        self.bytes_received += size
+        await asyncio.sleep(self.latency + (size / self.upload_bps if self.upload_bps else 0))
+
+        chat_id = int(params.get('chat_id', 0))
+        if self.chat_limit and chat_id:
+            now = time.monotonic()
+            recent = [t for t in self._recent.get(chat_id, []) if now - t < 1.0]
+            if len(recent) >= self.chat_limit:
+                self.calls['429'] += 1
+                return web.json_response({
+                    'ok': False, 'error_code': 429,
+                    'description': 'Too Many Requests: retry after 1',
+                    'parameters': {'retry_after': 1},
+                })
+            recent.append(now)
+            self._recent[chat_id] = recent
+
+        n = next(self._ids)
+        if method in ('deleteWebhook', 'setWebhook', 'deleteMessage'):
+            return web.json_response({'ok': True, 'result': True})
+        if method == 'getMe':
+            return web.json_response({'ok': True, 'result': {'id': 1, 'is_bot': True, 'first_name': 'Bench'}})
+
+        result = {
+            'message_id': n,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+        }
+        if method == 'sendMediaGroup':
+            media = json.loads(params.get('media', '[]'))
+            return web.json_response({'ok': True, 'result': [
+                {**result, 'message_id': next(self._ids),
+                 'audio': {'file_id': f"AUDIO{n}_{i}", 'file_unique_id': f"a{n}_{i}", 'duration': 180}}
+                for i in range(len(media))
+            ]})
+        if method == 'sendAudio':
+            result['audio'] = {'file_id': f"AUDIO{n}", 'file_unique_id': f"a{n}", 'duration': 180}
+        elif method == 'sendVideo':
+            result['video'] = {'file_id': f"VIDEO{n}", 'file_unique_id': f"v{n}",
+                               'width': 320, 'height': 240, 'duration': 10}
+        else:
+            result['text'] = params.get('text', '')
+        return web.json_response({'ok': True, 'result': result})
+
+    async def start(self, port: int):
+        app = web.Application(client_max_size=2 * 1024 ** 3)
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', port).start()
+        return runner
+
+
+
+# YUKLAMA
+
+
+def request_texts(scenario: str, count: int, distinct: int, seed: int) -> list:
+    """Foydalanuvchilar yuboradigan matnlar (distinct=0 - hammasi har xil)"""
+    rng = random.Random(seed)
+    texts = []
+    for i in range(count):
+        k = rng.randrange(distinct) if distinct else i
+        kind = scenario if scenario != 'mix' else rng.choices(['song', 'artist', 'instagram'], [6, 2, 2])[0]
+        if kind == 'song':
+            texts.append(f"Ijrochi {k} - Qo'shiq {k}")
+        elif kind == 'artist':
+            texts.append(f"Ijrochi {k}")
+        else:
+            texts.append(f"https://www.instagram.com/reel/BENCH{k:06d}/")
+    return texts
+
+
+async def run_load(args, api: FakeBotAPI) -> None:
+    from aiogram.types import Update
+    import run
+    import instagram_downloader
+
+    run.setup()
+    stub = await api.start(args.port)
+    update_ids = itertools.count(1)
+    latencies = []
+    errors = 0
+    texts = request_texts(args.scenario, args.users * args.requests, args.distinct, args.seed)
+
+    async def user(user_id: int, own: list):
+        nonlocal errors
+        for text in own:
+            update = Update.model_validate({
+                'update_id': next(update_ids),
+                'message': {
+                    'message_id': next(update_ids),
+                    'date': int(time.time()),
+                    'chat': {'id': user_id, 'type': 'private'},
+                    'from': {'id': user_id, 'is_bot': False, 'first_name': f"User{user_id}"},
+                    'text': text,
+                }
+            }, context={'bot': run.bot})
+            started = time.perf_counter()
+            try:
+                await run.dp.feed_update(run.bot, update)
+            except Exception as e:
+                errors += 1
+                print(f"Xatolik ({text}): {e}", file=sys.stderr)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*[
+            user(100000 + u, texts[u * args.requests:(u + 1) * args.requests])
+            for u in range(args.users)
+        ])
+        elapsed = time.perf_counter() - started
+    finally:
+        pool_stats = {pool.profile: pool.stats() for pool in instagram_downloader.YDL_POOLS}
+        await run.bot.session.close()
+        await stub.cleanup()
+        run.teardown()
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"So'rovlar: {len(latencies)} ({args.users} foydalanuvchi x {args.requests}), xatolar: {errors}")
+    print(f"Vaqt: {elapsed:.2f}s, o'tkazuvchanlik: {len(latencies) / elapsed:.2f} so'rov/s")
+    print(
+        f"Kechikish: p50={percentile(latencies, 50):.2f}s "
+        f"p95={percentile(latencies, 95):.2f}s "
+        f"p99={percentile(latencies, 99):.2f}s "
+        f"max={max(latencies, default=0):.2f}s"
+    )
+    print(f"Eng yuqori RSS: {peak_rss:.1f} MB (bot + stub), ffmpeg: {children_rss:.1f} MB")
+    print(f"Bot API: {dict(api.calls)}, yuborilgan: {api.bytes_received / 1024 / 1024:.1f} MB")
+    print(f"Birlashtirilgan so'rovlar: {instagram_downloader.coalescing_stats()}")
+    print(f"YoutubeDL pullari: {pool_stats}")
+    print(f"Yuborish (flood-limit): {run.uploader.stats()}")
+    print(f"Media kesh: {run.media_cache.stats()}")
+    for (profile, warm), (count, total) in sorted(YDL_FIRST_BYTE_SECONDS.totals().items()):
+        kind = "qayta ishlatilgan" if warm == '1' else "yangi"
+        print(f"  {profile}: birinchi baytgacha {total / count:.3f}s ({kind} obyekt, {count} ta)")
+    count, total = QUEUE_WAIT_SECONDS.totals().get(('transcode',), (0, 0.0))
+    if count:
+        print(f"Transcode navbati: o'rtacha {total / count:.3f}s ({count} ta fayl)")
+    for (mode,), (count, total) in sorted(AUDIO_EXTRACT_SECONDS.totals().items()):
+        print(f"  {mode}: o'rtacha {total / count:.3f}s ({count} ta fayl)")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Internetsiz yuklama sinovi (soxta yt-dlp va Bot API)")
+    parser.add_argument('--users', type=int, default=20, help="Parallel foydalanuvchilar soni")
+    parser.add_argument('--requests', type=int, default=3, help="Har bir foydalanuvchining so'rovlari (ketma-ket)")
+    parser.add_argument('--scenario', choices=['song', 'artist', 'instagram', 'mix'], default='mix')
+    parser.add_argument('--distinct', type=int, default=0, help="Har xil so'rovlar soni (0 - hammasi har xil)")
+    parser.add_argument('--init-latency', type=float, default=0.2, help="YoutubeDL obyektini yaratish narxi (s)")
+    parser.add_argument('--search-latency', type=float, default=0.5, help="extract_info kechikishi (s)")
+    parser.add_argument('--download-latency', type=float, default=1.5, help="Yuklash kechikishi (s)")
+    parser.add_argument('--jitter', type=float, default=0.3, help="Kechikish tarqoqligi (nisbiy)")
+    parser.add_argument('--api-latency', type=float, default=0.05, help="Bot API javob kechikishi (s)")
+    parser.add_argument('--upload-mbps', type=float, default=100, help="Bot API'ga yuklash tezligi (Mbit/s, 0 - cheksiz)")
+    parser.add_argument('--chat-limit', type=int, default=0, help="Stub: chatga sekundiga so'rovlar, oshsa 429 (0 - cheksiz)")
+    parser.add_argument('--media-group', action='store_true', help="Ijrochi qo'shiqlarini albom qilib yuborish")
+    parser.add_argument('--audio-seconds', type=int, default=180)
+    parser.add_argument('--video-seconds', type=int, default=15)
+    parser.add_argument('--fallback-kb', type=int, default=1024, help="ffmpeg bo'lmasa namuna fayl hajmi (KB)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bot-benchmark-')
+    args.port = free_port()
+
+    # run.py import qilinishidan oldin: bot stub serverga ulanadi, kesh va fayllar vaqtinchalik papkada
+    os.environ.update({
+        'BOT_TOKEN': '123456:BENCHMARK',
+        'BOT_API_URL': f'http://127.0.0.1:{args.port}',
+        'BOT_API_LOCAL': '0',
+        'FILE_CACHE_PATH': os.path.join(workdir, 'cache.db'),
+        'WORK_DIR': os.path.join(workdir, 'downloads'),
+        'MEDIA_CACHE_DIR': os.path.join(workdir, 'media_cache'),
+        'METRICS_PORT': '0',
+        'UPLOAD_MEDIA_GROUP': '1' if args.media_group else '0',
+        # Soxta foydalanuvchilar xabarlarni ketma-ket tez yuboradi: spam limiti o'lchovga xalaqit bermasin
+        'USER_RATE_LIMIT': '0',
+        'USER_MAX_ACTIVE': '0',
+    })
+
+    import yt_dlp
+    FakeYoutubeDL.init_latency = args.init_latency
+    FakeYoutubeDL.search_latency = args.search_latency
+    FakeYoutubeDL.download_latency = args.download_latency
+    FakeYoutubeDL.jitter = args.jitter
+    yt_dlp.YoutubeDL = FakeYoutubeDL
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    try:
+        real = prepare_media(workdir, args.audio_seconds, args.video_seconds, args.fallback_kb)
+        if not real:
+            print("ffmpeg topilmadi: namuna fayllar tasodifiy baytlardan iborat", file=sys.stderr)
+        asyncio.run(run_load(args, FakeBotAPI(args.api_latency, args.upload_mbps, args.chat_limit)))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Metadata Benchmark
+metadata modulini eski (har chaqiruvda re.sub/re.search) kod bilan solishtirish
+
+Haqiqiy YouTube/Instagram sarlavhalariga o'xshash korpus yaratiladi va har
+ikkala usul uchun o'rtacha vaqt chiqariladi (natijalar bir xilligi
+test_metadata.py'da tekshiriladi). Ijrochi qidiruvida bir xil sarlavhalar qayta-qayta kelgani uchun
+korpusda takrorlar ham bor (--unique bilan o'chiriladi).
+
+Ishlatish:
+    python benchmark_metadata.py --titles 5000 --rounds 20
+    python benchmark_metadata.py --unique        # keshsiz holat
+"""
+
+import re
+import sys
+import time
+import random
+import logging
+import argparse
+
+import metadata
+
+ARTISTS = ["Janob Rasul", "Sherali Jo'rayev", "Yulduz Usmonova", "Shahzoda", "Ozoda", "Ulug'bek Rahmatullayev"]
+SONGS = ["Sevgi", "Yurak", "Bahor", "Onajon", "Yor-yor", "Kecha", "Dunyo", "Sog'inch", "Baxt", "Hayot"]
+TAGS = ["", "(Official Audio)", "(Official Video)", "[Official Music Video]", "(Audio)", "| Full Version",
+        "klip 2024", "(Original Mix)", "2023", "Official Clip", "(Lyric Video)", "(Live)", "[Official Audio] 2022"]
+CHANNELS = ["{} - Topic", "{} Official", "{}VEVO", "{} Music", "Handasa Media", "{}"]
+DESCRIPTIONS = ["", "Music: {artist} - {song}", "🎵 {artist} - {song} | #music", "🎧 {song}",
+                "Yangi video! #reels @{user}", "Song: Original audio", "Musiqa: {song}\nhttps://t.me/x"]
+INSTAGRAM_TITLES = ["Video by {user}", "Instagram reel by {user}", "{artist} - {song} #trend #uzbek",
+                    "@{user} https://example.com", "Bugun", ""]
+
+
+def youtube_corpus(count: int, seed: int, unique: bool) -> list:
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        artist = rng.choice(ARTISTS)
+        song = rng.choice(SONGS)
+        title = rng.choice([f"{artist} - {song} {rng.choice(TAGS)}", f"{song} {rng.choice(TAGS)}"]).strip()
+        if unique:
+            title = f"{title} #{i}"
+        corpus.append((title, rng.choice(CHANNELS).format(artist)))
+    return corpus
+
+
+def instagram_corpus(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        fields = {'artist': rng.choice(ARTISTS), 'song': rng.choice(SONGS), 'user': f"user_{i}.uz"}
+        info = {
+            'uploader': rng.choice([fields['user'], None]),
+            'description': rng.choice(DESCRIPTIONS).format(**fields),
+            'title': rng.choice(INSTAGRAM_TITLES).format(**fields),
+        }
+        kind = rng.randint(0, 5)
+        if kind == 0:
+            info['track'], info['artist'] = fields['song'], fields['artist']
+        elif kind == 1:
+            info['music_info'] = {'title': 'Original audio', 'artist': fields['user']}
+        elif kind == 2:
+            info['alt_title'] = fields['song']
+        corpus.append(info)
+    return corpus
+
+
+def legacy_clean(raw_title: str, uploader: str, strip_year: bool) -> tuple:
+    """YouTube yo'llaridagi eski tozalash (solishtirish uchun)"""
+    artist = uploader.replace(' - Topic', '').replace('Official', '')
+    if strip_year:
+        # Eski batch yo'li VEVO'ni olib tashlamasdi, clean_track ikkalasida ham oladi
+        artist = artist.replace('VEVO', '')
+    artist = artist.strip()
+    title = raw_title
+    if " - " in raw_title:
+        p = raw_title.split(" - ", 1)
+        artist, title = p[0].strip(), p[1].strip()
+    junks = [r'\(official.*?\)', r'\[official.*?\]', r'audio', r'video', r'clip', r'klip', r'full', r'original']
+    if strip_year:
+        junks.append(r'\d{4}')
+    for junk in junks:
+        title = re.sub(junk, '', title, flags=re.IGNORECASE).strip()
+        artist = re.sub(junk, '', artist, flags=re.IGNORECASE).strip()
+    return title, artist
+
+
+def legacy_song_query(info: dict):
+    """download_instagram_content dagi eski tahlil (solishtirish uchun)"""
+    song_query = None
+    track = info.get('track')
+    artist = info.get('artist')
+    uploader = info.get('uploader')
+    alt_title = info.get('alt_title')
+    description = info.get('description', '')
+    title = info.get('title', '')
+    music_info = info.get('music_info', {})
+    if music_info:
+        track = music_info.get('title', track)
+        artist = music_info.get('artist', artist)
+    if track and artist:
+        song_query = f"{artist} - {track}"
+    elif track:
+        song_query = track
+    elif alt_title:
+        song_query = f"{artist} - {alt_title}" if artist else alt_title
+    if not song_query and description:
+        for pattern in [r'(?:Music|Song|Musiqa|Trek|Nomi):\s*([^\n|]+)', r'🎵\s*([^\n|]+)',
+                        r'🎧\s*([^\n|]+)', r'🎤\s*([^\n|]+)']:
+            match = re.search(pattern, description, re.IGNORECASE)
+            if match:
+                song_query = match.group(1).strip()
+                break
+    for forbidden in ["original audio", "original music", "originalniy zvuk", "asl audio"]:
+        if song_query and forbidden in song_query.lower():
+            song_query = f"{uploader} yangi klip" if uploader else None
+            break
+    if not song_query and title:
+        clean_title = re.sub(r'Instagram (?:video|reel|reels|post|TV).*', '', title, flags=re.IGNORECASE).strip()
+        clean_title = re.sub(r'#\w+|@\w+|https?://\S+|www\.\S+', '', clean_title).strip()
+        if clean_title and len(clean_title) > 5:
+            song_query = clean_title
+    if not song_query and uploader:
+        clean_uploader = re.sub(r'[\._]', ' ', uploader).strip()
+        song_query = f"{clean_uploader} qo'shiq"
+    return song_query
+
+
+def measure(fn, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Metadata tozalash tezligini o'lchash")
+    parser.add_argument('--titles', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--unique', action='store_true', help="Takrorlanmaydigan sarlavhalar (kesh yordam bermaydi)")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    # ANALIZ loglari o'lchovga xalaqit bermasin
+    logging.disable(logging.INFO)
+
+    titles = youtube_corpus(args.titles, args.seed, args.unique)
+    infos = instagram_corpus(args.titles, args.seed)
+
+    for strip_year, label in ((True, 'song'), (False, 'batch')):
+        old = measure(lambda: [legacy_clean(t, u, strip_year) for t, u in titles], args.rounds)
+        metadata.clean_track.cache_clear()
+        new = measure(lambda: [metadata.clean_track(t, u, strip_year) for t, u in titles], args.rounds)
+        print(
+            f"{label}: {args.titles} ta sarlavha | eski: {old * 1000:.2f}ms | "
+            f"clean_track: {new * 1000:.2f}ms | {old / new:.2f}x | {metadata.clean_track.cache_info()}"
+        )
+
+    old = measure(lambda: [legacy_song_query(i) for i in infos], args.rounds)
+    new = measure(lambda: [metadata.song_query_from_info(i) for i in infos], args.rounds)
+    print(
+        f"instagram: {args.titles} ta post | eski: {old * 1000:.2f}ms | "
+        f"song_query_from_info: {new * 1000:.2f}ms | {old / new:.2f}x"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Ranking Benchmark
+ranking.rank tezligini eski rate_entry closure'lari bilan solishtirish
+
+Minglab sun'iy qidiruv natijalari yaratiladi, ikkala usul bir xil tartib
+berishi tekshiriladi va har biri uchun o'rtacha vaqt chiqariladi.
+
+Ishlatish:
+    python benchmark_ranking.py --entries 5000 --rounds 20
+    python benchmark_ranking.py --weights weights.json   # o'zgartirilgan jadval bilan (tekshiruvsiz)
+"""
+
+import sys
+import time
+import random
+import argparse
+
+import ranking
+
+WORDS = ["sevgi", "yurak", "bahor", "onajon", "yor", "kecha", "dunyo", "sog'inch", "baxt", "hayot"]
+ARTISTS = ["Janob Rasul", "Sherali Jo'rayev", "Yulduz Usmonova", "Shahzoda", "Handasa", "Ozoda"]
+TAGS = ["", "(Official Audio)", "(Official Video)", "[Official Music Video]", "(Live)", "(Remix)",
+        "klip", "Full Version", "#shorts", "(Original Mix)", "2024"]
+CHANNELS = ["{} - Topic", "{} Official", "{}VEVO", "{} Music", "Handasa Media", "random fan channel"]
+
+
+def synthetic_entries(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    entries = []
+    for i in range(count):
+        artist = rng.choice(ARTISTS)
+        song = " ".join(rng.sample(WORDS, rng.randint(1, 3))).title()
+        entries.append({
+            'id': f"v{i:010d}",
+            'title': f"{artist} - {song} {rng.choice(TAGS)}".strip(),
+            'uploader': rng.choice(CHANNELS).format(artist),
+            # Chegara qiymatlari (butun va kasr) ham tekshiriladi
+            'duration': rng.choice([
+                rng.randint(20, 90), rng.randint(120, 420), rng.randint(400, 3600),
+                rng.choice([59, 59.5, 60, 119.5, 120, 360, 360.5, 420, 420.5, 600, 600.5, 601]),
+            ]),
+        })
+    return entries
+
+
+def legacy_song(entries: list, q: str) -> list:
+    """download_youtube_audio dagi eski rate_entry (solishtirish uchun)"""
+    def rate_entry(e):
+        score = 0
+        title = e.get('title', '').lower()
+        uploader = e.get('uploader', '').lower()
+        duration = e.get('duration', 0)
+        if 150 <= duration <= 360:
+            score += 150
+        elif 120 <= duration <= 600:
+            score += 80
+        elif duration < 60:
+            score -= 200
+        elif duration > 600:
+            score -= 50
+        if any(k in title for k in ['official', 'original', 'full', 'audio']): score += 60
+        if any(k in title for k in ['clip', 'klip', 'music video']): score += 30
+        if 'mix' in title or 'remix' in title: score -= 100
+        if 'live' in title: score -= 30
+        if 'short' in title or 'reel' in title: score -= 150
+        if any(k in uploader for k in ['official', 'vevo', 'topic', 'music', 'handasa']): score += 100
+        q_clean = q.lower().replace('official', '').replace('audio', '').strip()
+        q_words = q_clean.split()
+        match_count = sum(1 for w in q_words if w in title or w in uploader)
+        if q_words:
+            score += (match_count / len(q_words)) * 150
+        if 'handasa' in q_clean and 'handasa' in uploader:
+            score += 200
+        return score
+
+    sorted_entries = sorted(entries, key=rate_entry, reverse=True)
+    # Eski kod top 5 ni log qilishda rate_entry'ni qayta chaqirardi
+    for entry in sorted_entries[:5]:
+        rate_entry(entry)
+    return sorted_entries
+
+
+def legacy_batch(entries: list, q: str) -> list:
+    """download_batch_youtube_audio dagi eski rate_entry (solishtirish uchun)"""
+    def rate_entry(e):
+        score = 0
+        title = e.get('title', '').lower()
+        duration = e.get('duration', 0)
+        if 120 <= duration <= 420: score += 100
+        if any(k in title for k in ['official', 'audio', 'original']): score += 50
+        if any(k in title for k in ['mix', 'remix', 'live', 'short', 'reel']): score -= 150
+        return score
+
+    return sorted(entries, key=rate_entry, reverse=True)
+
+
+def measure(fn, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reyting tezligini o'lchash")
+    parser.add_argument('--entries', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--query', default="Handasa Janob Rasul sevgi official audio")
+    parser.add_argument('--weights', help="Og'irliklar JSON fayli (RANKING_WEIGHTS)")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    ranking.configure(args.weights)
+    entries = synthetic_entries(args.entries, args.seed)
+
+    for profile, legacy in (('song', legacy_song), ('batch', legacy_batch)):
+        if not args.weights:
+            new_order = [e['id'] for _, e in ranking.rank(entries, args.query, profile)]
+            old_order = [e['id'] for e in legacy(entries, args.query)]
+            if new_order != old_order:
+                print(f"{profile}: tartib eski usuldan farq qiladi!", file=sys.stderr)
+                return 1
+
+        old = measure(lambda: legacy(entries, args.query), args.rounds)
+        new = measure(lambda: ranking.rank(entries, args.query, profile), args.rounds)
+        print(
+            f"{profile}: {args.entries} ta nomzod | eski: {old * 1000:.2f}ms | "
+            f"ranking.rank: {new * 1000:.2f}ms | {old / new:.2f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,399 @@
+"""
+Broker Module
+Bot va worker jarayonlari orasidagi lokal ish navbati (SQLite)
+
+Bot jarayoni ishni `jobs` jadvaliga yozadi, worker jarayonlari uni navbat
+bilan oladi va natijani `events` jadvaliga yozadi. Tashqi servis kerak emas:
+hammasi bitta mashinadagi SQLite fayl (WAL rejimi) orqali ishlaydi. Fayllar
+esa umumiy diskda, so'rovning ishchi papkasida qoladi.
+
+Ish hodisalari:
+    item     - oraliq natija (ijrochi qidiruvida har bir tayyor qo'shiq)
+    progress - yuklash holati (progress.snapshot), status xabari uchun
+    result   - yakuniy natija
+    error    - xatolik matni
+
+Ish holatlari: queued -> running -> done. Bot natijani kutmay qo'ysa
+(timeout, handler bekor qilindi) bajarilayotgan ish `cancelled` deb
+belgilanadi: worker uni to'xtatadi va hech kimga kerak bo'lmagan fayllarni
+o'chiradi, keyin ishni o'zi o'chiradi.
+
+Bot tomonida bitta poller barcha kutilayotgan ishlar uchun yangi hodisalarni
+rowid bo'yicha o'qiydi, shuning uchun ishlar soni so'rovlar sonini oshirmaydi.
+Ikkala tomonda ham SQLite so'rovlari jarayonning alohida broker thread'ida
+bajariladi: boshqa jarayon yozish qulfini ushlab turganda (timeout=10) bot
+update'larni, worker esa yuklashlarni to'xtatmaydi.
+
+Misol:
+    result = await broker.call('youtube_audio', {'query': text, 'output_dir': path})
+    async for item in broker.stream('youtube_batch', payload):
+        ...
+"""
+
+import json
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ITEM = 'item'
+PROGRESS = 'progress'
+RESULT = 'result'
+ERROR = 'error'
+
+
+class JobFailed(Exception):
+    """Worker ishni xatolik bilan tugatdi"""
+
+
+class Broker:
+    """
+    SQLite asosidagi ish navbati (bot va worker'lar uchun umumiy).
+
+    Ulanish har bir jarayonda alohida ochiladi. Bot tomonidagi async metodlar
+    SQLite'ni bitta broker thread'ida chaqiradi (so'rovlar navbat bilan,
+    yuborilish tartibida bajariladi); worker tomonidagi metodlar sinxron,
+    worker ularni in_thread() orqali xuddi shu thread'da chaqiradi.
+    """
+
+    def __init__(self, path: str = "jobs.db", poll_interval: float = 0.1):
+        """
+        Args:
+            path: SQLite fayl yo'li
+            poll_interval: Yangi ish/hodisalarni tekshirish oralig'i (sekund)
+        """
+        self.path = path
+        self.poll_interval = poll_interval
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        # Bot tomoni: ish ID -> hodisalar navbati
+        self._waiting: Dict[int, asyncio.Queue] = {}
+        self._cursor = 0
+        self._poller: Optional[asyncio.Task] = None
+        self._thread: Optional[ThreadPoolExecutor] = None
+
+    def configure(self, path: Optional[str] = None, poll_interval: Optional[float] = None) -> None:
+        """Sozlamalarni o'zgartirish (birinchi ishlatishdan oldin)"""
+        if path is not None:
+            self.path = path
+        if poll_interval is not None:
+            self.poll_interval = poll_interval
+
+    # BOT TOMONI
+
+    def submit(self, kind: str, payload: dict) -> int:
+        """Ishni navbatga qo'yish, ish ID sini qaytaradi"""
+        with self._lock:
+            db = self._connect()
+            cur = db.execute(
+                "INSERT INTO jobs (kind, payload, status, created_at) VALUES (?, ?, 'queued', ?)",
+                (kind, json.dumps(payload, ensure_ascii=False), time.time())
+            )
+            db.commit()
+            return cur.lastrowid
+
+    async def stream(self, kind: str, payload: dict, timeout: float = 900,
+                     on_progress: Optional[Callable[[dict], None]] = None) -> AsyncIterator[Any]:
+        """
+        Ishni yuborish va oraliq natijalarni kelishi bilan qaytarish
+
+        Args:
+            kind: Ish turi (worker.HANDLERS kaliti)
+            payload: Ish parametrlari (JSON)
+            timeout: Ikki hodisa orasidagi eng ko'p kutish (sekund)
+            on_progress: Worker yuborgan progress hodisalari uchun callback
+
+        Raises:
+            JobFailed: Worker xatolik qaytarsa
+            asyncio.TimeoutError: Worker javob bermasa
+        """
+        self._start_poller()
+        job_id = await self._submit(kind, payload)
+        queue = self._waiting[job_id] = asyncio.Queue()
+        try:
+            while True:
+                event, data = await asyncio.wait_for(queue.get(), timeout)
+                if event == ITEM:
+                    yield data
+                elif event == PROGRESS:
+                    if on_progress is not None:
+                        on_progress(data)
+                elif event == RESULT:
+                    return
+                else:
+                    raise JobFailed(data)
+        finally:
+            del self._waiting[job_id]
+            await self._release(job_id)
+
+    async def call(self, kind: str, payload: dict, timeout: float = 900,
+                   on_progress: Optional[Callable[[dict], None]] = None) -> Any:
+        """Ishni yuborish va yakuniy natijani kutish (parametrlar stream() dagi kabi)"""
+        self._start_poller()
+        job_id = await self._submit(kind, payload)
+        queue = self._waiting[job_id] = asyncio.Queue()
+        try:
+            while True:
+                event, data = await asyncio.wait_for(queue.get(), timeout)
+                if event == RESULT:
+                    return data
+                if event == ERROR:
+                    raise JobFailed(data)
+                if event == PROGRESS and on_progress is not None:
+                    on_progress(data)
+        finally:
+            del self._waiting[job_id]
+            await self._release(job_id)
+
+    def in_thread(self, func: Callable[..., Any], *args) -> "asyncio.Future":
+        """
+        Sinxron broker metodini broker thread'ida bajarish (event loop bloklanmaydi)
+
+        Chaqirilgan zahoti navbatga qo'yiladi: bitta thread bo'lgani uchun
+        so'rovlar chaqiruv tartibida bajariladi.
+        """
+        if self._thread is None:
+            self._thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="broker")
+        return asyncio.get_running_loop().run_in_executor(self._thread, partial(func, *args))
+
+    async def _submit(self, kind: str, payload: dict) -> int:
+        """submit() ni broker thread'ida bajarish (kutish bekor qilinsa ham ish navbatda qolmaydi)"""
+        future = self.in_thread(self.submit, kind, payload)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            future.add_done_callback(self._forget_submitted)
+            raise
+
+    def _forget_submitted(self, future: "asyncio.Future") -> None:
+        if not future.cancelled() and future.exception() is None:
+            self.in_thread(self._forget, future.result())
+
+    async def _release(self, job_id: int) -> None:
+        """Ishni o'chirish (so'rovchi bekor qilinsa ham thread'dagi so'rov oxirigacha bajariladi)"""
+        try:
+            await asyncio.shield(self.in_thread(self._forget, job_id))
+        except sqlite3.Error as e:
+            logger.error(f"Broker ishini o'chirishda xatolik #{job_id}: {e}")
+
+    def _start_poller(self) -> None:
+        if self._poller is None or self._poller.done():
+            # Kursor ish yuborilishidan oldin o'qiladi (broker thread'i navbat bilan ishlaydi)
+            self._poller = asyncio.create_task(self._poll(self.in_thread(self._last_event_id)))
+
+    def _last_event_id(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+    def _fetch_events(self, cursor: int) -> list:
+        with self._lock:
+            return self._connect().execute(
+                "SELECT id, job_id, event, data FROM events WHERE id > ? ORDER BY id", (cursor,)
+            ).fetchall()
+
+    async def _poll(self, cursor: "asyncio.Future") -> None:
+        """Yangi hodisalarni o'qib, kutayotgan ishlarga tarqatish"""
+        try:
+            self._cursor = await cursor
+        except sqlite3.Error as e:
+            # Boshidan o'qish ham to'g'ri (eski ishlarning hodisalari e'tiborsiz qoladi)
+            logger.error(f"Broker hodisalar kursorini o'qishda xatolik: {e}")
+            self._cursor = 0
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if not self._waiting:
+                continue
+            try:
+                rows = await self.in_thread(self._fetch_events, self._cursor)
+            except sqlite3.Error as e:
+                logger.error(f"Broker hodisalarini o'qishda xatolik: {e}")
+                continue
+            for event_id, job_id, event, data in rows:
+                self._cursor = event_id
+                queue = self._waiting.get(job_id)
+                if queue is not None:
+                    queue.put_nowait((event, json.loads(data)))
+
+    def _forget(self, job_id: int) -> None:
+        """
+        Ish natijasi endi kerak emas: hodisalari va tugagan yoki navbatda turgan
+        ish o'chiriladi, bajarilayotgani esa `cancelled` deb belgilanadi
+        (worker to'xtatib, o'zi o'chiradi)
+        """
+        with self._lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute("DELETE FROM events WHERE job_id = ?", (job_id,))
+                db.execute("DELETE FROM jobs WHERE id = ? AND status IN ('queued', 'done')", (job_id,))
+                db.execute("UPDATE jobs SET status = 'cancelled' WHERE id = ? AND status = 'running'", (job_id,))
+                db.commit()
+            except BaseException:
+                db.rollback()
+                raise
+
+    # WORKER TOMONI
+
+    def claim(self, worker: str) -> Optional[Tuple[int, str, dict]]:
+        """
+        Navbatdagi birinchi ishni olish
+
+        Returns:
+            (job_id, kind, payload) yoki None (navbat bo'sh)
+        """
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            # Navbat bo'sh bo'lsa yozish qulfini olmaymiz (bo'sh worker'lar bir-biriga xalaqit bermasin)
+            if db.execute("SELECT 1 FROM jobs WHERE status = 'queued' LIMIT 1").fetchone() is None:
+                return None
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT id, kind, payload FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    db.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat = ? WHERE id = ?",
+                        (worker, now, now, row[0])
+                    )
+                db.commit()
+            except BaseException:
+                db.rollback()
+                raise
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def emit(self, job_id: int, event: str, data: Any = None) -> bool:
+        """
+        Ish hodisasini yozish (item, progress, result yoki error)
+
+        Returns:
+            False - bot ishni bekor qilgan, hodisa yozilmadi (natija hech kimga kerak emas)
+        """
+        with self._lock:
+            db = self._connect()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                cur = db.execute(
+                    "INSERT INTO events (job_id, event, data) "
+                    "SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM jobs WHERE id = ? AND status = 'running')",
+                    (job_id, event, json.dumps(data, ensure_ascii=False), job_id)
+                )
+                if event in (RESULT, ERROR):
+                    db.execute("UPDATE jobs SET status = 'done' WHERE id = ? AND status = 'running'", (job_id,))
+                db.commit()
+            except BaseException:
+                db.rollback()
+                raise
+        return cur.rowcount > 0
+
+    def cancelled(self, worker: str) -> set:
+        """Shu worker bajarayotgan, lekin bot bekor qilgan ishlar ID lari"""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT id FROM jobs WHERE worker = ? AND status = 'cancelled'", (worker,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def discard(self, job_id: int) -> None:
+        """Bekor qilingan ishni o'chirish (worker to'xtatib, fayllarini tozalagach)"""
+        with self._lock:
+            db = self._connect()
+            db.execute("DELETE FROM jobs WHERE id = ? AND status = 'cancelled'", (job_id,))
+            db.commit()
+
+    def heartbeat(self, worker: str) -> None:
+        """Worker tirikligini bildirish (bajarilayotgan ishlari uchun)"""
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE worker = ? AND status IN ('running', 'cancelled')",
+                (time.time(), worker)
+            )
+            db.commit()
+
+    def requeue_stale(self, older_than: float) -> int:
+        """
+        To'satdan to'xtagan worker'ning ishlarini navbatga qaytarish
+        (bekor qilingan ishlari esa o'chiriladi)
+
+        Args:
+            older_than: Shuncha sekund heartbeat bo'lmasa ish "yetim" hisoblanadi
+
+        Returns:
+            Qaytarilgan ishlar soni
+        """
+        with self._lock:
+            db = self._connect()
+            cur = db.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND heartbeat < ?",
+                (time.time() - older_than,)
+            )
+            db.execute("DELETE FROM jobs WHERE status = 'cancelled' AND heartbeat < ?", (time.time() - older_than,))
+            db.commit()
+        if cur.rowcount:
+            logger.warning(f"{cur.rowcount} ta yetim ish navbatga qaytarildi")
+        return cur.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self) -> None:
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+        if self._thread is not None:
+            self._thread.shutdown(wait=True)
+            self._thread = None
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """SQLite ulanishini kerak bo'lganda ochish (lock ichida chaqiriladi)"""
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    worker TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    heartbeat REAL
+                )
+                """
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id INTEGER NOT NULL,
+                    event TEXT NOT NULL,
+                    data TEXT
+                )
+                """
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS events_job ON events (job_id)")
+        return self._db
+
+
+# Jarayon uchun yagona broker ulanishi
+broker = Broker()
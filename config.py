@@ -9,8 +9,174 @@ load_dotenv()
 # TOKEN — Telegram botning maxfiy kaliti
 # Bu token orqali bot Telegram serverlari bilan bog'lanadi
 # Token .env faylidan olinadi (xavfsizlik uchun)
+# Faqat bot jarayoni uchun majburiy (run.py tekshiradi); worker.py tokensiz ishlaydi
 
 TOKEN = os.getenv('BOT_TOKEN')
 
-if not TOKEN:
-    raise ValueError("BOT_TOKEN environment variable o'rnatilmagan! .env faylida BOT_TOKEN ni o'rnating.")
+
+# FILE_ID KESH — Telegram'ga yuklangan fayllarni qayta yuklamasdan yuborish uchun
+# FILE_CACHE_PATH - SQLite fayl yo'li
+# FILE_CACHE_TTL - yozuvning yashash muddati (sekund, standart: 30 kun)
+# FILE_CACHE_MAX_KEYS - kesh hajmi (eng kam ishlatilgan kalitlar o'chiriladi)
+
+FILE_CACHE_PATH = os.getenv('FILE_CACHE_PATH', 'cache.db')
+FILE_CACHE_TTL = int(os.getenv('FILE_CACHE_TTL', str(30 * 24 * 3600)))
+FILE_CACHE_MAX_KEYS = int(os.getenv('FILE_CACHE_MAX_KEYS', '50000'))
+
+
+# BLOKLOVCHI ISHLAR — yt-dlp thread pool va event loop kuzatuvchisi
+# YTDLP_WORKERS - bir vaqtda ishlaydigan yt-dlp threadlar soni
+# LOOP_LAG_THRESHOLD_MS - event loop shuncha ms dan ko'p bloklansa log yoziladi
+
+YTDLP_WORKERS = int(os.getenv('YTDLP_WORKERS', '8'))
+LOOP_LAG_THRESHOLD_MS = int(os.getenv('LOOP_LAG_THRESHOLD_MS', '250'))
+
+
+# TEZ AUDIO — manba AAC/M4A bo'lsa MP3 ga qayta kodlamasdan yuborish
+# FAST_AUDIO=0 qilinsa, har doim MP3 192 kbps ga kodlanadi
+
+FAST_AUDIO = os.getenv('FAST_AUDIO', '1').lower() not in ('0', 'false', 'no')
+
+
+# ISH NAVBATI — barcha yuklab olishlar uchun umumiy navbat limitlari
+# *_WORKERS - shu turdagi ishlarning bir vaqtdagi soni (butun jarayon bo'yicha)
+# PER_USER_JOBS - bitta foydalanuvchi bir turda egallashi mumkin bo'lgan slotlar
+# TRANSCODE_THREADS - bitta ffmpeg jarayonining thread'lari (standart: yadrolar / TRANSCODE_WORKERS)
+
+SEARCH_WORKERS = int(os.getenv('SEARCH_WORKERS', '4'))
+DOWNLOAD_WORKERS = int(os.getenv('DOWNLOAD_WORKERS', '6'))
+TRANSCODE_WORKERS = int(os.getenv('TRANSCODE_WORKERS', str(os.cpu_count() or 2)))
+TRANSCODE_THREADS = int(os.getenv('TRANSCODE_THREADS', str(max(1, (os.cpu_count() or 2) // max(1, TRANSCODE_WORKERS)))))
+UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', '8'))
+PER_USER_JOBS = int(os.getenv('PER_USER_JOBS', '3'))
+
+
+# QIDIRUV KESHI — YouTube qidiruv natijalari (xotira + disk)
+# SEARCH_CACHE_TTL - natijalarning yashash muddati (sekund, standart: 6 soat)
+# SEARCH_CACHE_MEMORY / SEARCH_CACHE_DISK - xotira va diskdagi so'rovlar soni
+
+SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', str(6 * 3600)))
+SEARCH_CACHE_MEMORY = int(os.getenv('SEARCH_CACHE_MEMORY', '2000'))
+SEARCH_CACHE_DISK = int(os.getenv('SEARCH_CACHE_DISK', '50000'))
+
+
+# ISHGA TUSHIRISH REJIMI — long polling yoki webhook
+# BOT_MODE - 'polling' (standart) yoki 'webhook'
+# WEBHOOK_BASE_URL - tashqi HTTPS manzil (masalan: https://mybot.herokuapp.com)
+# WEBHOOK_PATH - webhook yo'li
+# WEBHOOK_SECRET - Telegram har bir so'rovda yuboradigan maxfiy token
+# WEB_HOST / PORT - server tinglaydigan manzil (Heroku PORT ni o'zi beradi)
+# WEBHOOK_REGISTER=0 - Telegram'da webhook o'rnatmaslik (lokal sinov uchun)
+# UPDATE_CONCURRENCY - bir vaqtda qayta ishlanadigan update'lar soni
+
+BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+WEBHOOK_BASE_URL = os.getenv('WEBHOOK_BASE_URL', '')
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET') or None
+WEB_HOST = os.getenv('WEB_HOST', '0.0.0.0')
+PORT = int(os.getenv('PORT', '8080'))
+WEBHOOK_REGISTER = os.getenv('WEBHOOK_REGISTER', '1').lower() not in ('0', 'false', 'no')
+UPDATE_CONCURRENCY = int(os.getenv('UPDATE_CONCURRENCY', '64'))
+
+if BOT_MODE == 'webhook' and WEBHOOK_REGISTER and not WEBHOOK_BASE_URL:
+    raise ValueError("BOT_MODE=webhook uchun WEBHOOK_BASE_URL o'rnatilishi kerak!")
+
+
+# LOKAL BOT API SERVER — o'zimizning telegram-bot-api serverimiz orqali ishlash
+# BOT_API_URL - server manzili (masalan: http://localhost:8081), bo'sh - api.telegram.org
+# BOT_API_LOCAL - server --local rejimida ishlasa: fayllar yo'l orqali uzatiladi
+#                 (qayta yuklanmaydi) va yuborish limiti 2000 MB bo'ladi
+# MAX_UPLOAD_MB - yuboriladigan fayl hajmi chegarasi (standart: rejimga qarab)
+
+BOT_API_URL = os.getenv('BOT_API_URL', '').rstrip('/')
+BOT_API_LOCAL = bool(BOT_API_URL) and os.getenv('BOT_API_LOCAL', '1').lower() not in ('0', 'false', 'no')
+MAX_UPLOAD_MB = int(os.getenv('MAX_UPLOAD_MB', '2000' if BOT_API_LOCAL else '50'))
+
+
+# ISHCHI PAPKA — har bir so'rov downloads/jobs/<id>/ ichida ishlaydi
+# WORK_DIR - vaqtinchalik fayllar papkasi (ishga tushishda tozalanadi)
+# DISK_BUDGET_MB - papka hajmi chegarasi: oshsa yangi yuklashlar navbatda kutadi
+
+WORK_DIR = os.getenv('WORK_DIR', 'downloads')
+DISK_BUDGET_MB = int(os.getenv('DISK_BUDGET_MB', '2048'))
+
+
+# METRIKALAR — Prometheus formatidagi lokal /metrics endpoint
+# METRICS_HOST / METRICS_PORT - endpoint manzili (METRICS_PORT=0 - o'chirilgan)
+
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9100'))
+
+
+# HEDGED YUKLASH — YouTube nomzodlarini "poyga" usulida yuklash
+# HEDGE_DELAY - nomzod shuncha sekund ichida bayt bermasa, keyingisi parallel boshlanadi
+# HEDGE_MAX_PARALLEL - bitta so'rov uchun bir vaqtda yuklanadigan nomzodlar (1 - ketma-ket)
+
+HEDGE_DELAY = float(os.getenv('HEDGE_DELAY', '5'))
+HEDGE_MAX_PARALLEL = int(os.getenv('HEDGE_MAX_PARALLEL', '2'))
+
+
+# REYTING — qidiruv natijalarini tartiblash og'irliklari
+# RANKING_WEIGHTS - og'irliklar jadvali JSON fayli (ranking.py ga qarang), bo'sh - standart
+
+RANKING_WEIGHTS = os.getenv('RANKING_WEIGHTS') or None
+
+
+# HAVOLALAR — bitta xabardagi Instagram/TikTok/YouTube linklari
+# MAX_LINKS_PER_MESSAGE - bitta xabardan qayta ishlanadigan havolalar soni (qolganlari e'tiborsiz)
+
+MAX_LINKS_PER_MESSAGE = int(os.getenv('MAX_LINKS_PER_MESSAGE', '3'))
+
+
+# YUBORISH LIMITLARI — Telegram flood-limit (429) ga tushmaslik uchun
+# UPLOAD_GLOBAL_RATE - barcha chatlarga sekundiga yuborishlar (Telegram: ~30; 0 - cheklanmagan)
+# UPLOAD_CHAT_RATE / UPLOAD_CHAT_BURST - bitta chatga sekundiga yuborishlar (0 - cheklanmagan) va ketma-ket "portlash"
+# UPLOAD_PARALLEL - ijrochi qidiruvida bitta so'rov uchun parallel yuborishlar
+# UPLOAD_MEDIA_GROUP - ijrochi qo'shiqlarini 10 tadan albom qilib yuborish (hammasi tayyor bo'lgach)
+
+UPLOAD_GLOBAL_RATE = float(os.getenv('UPLOAD_GLOBAL_RATE', '25'))
+UPLOAD_CHAT_RATE = float(os.getenv('UPLOAD_CHAT_RATE', '1'))
+UPLOAD_CHAT_BURST = float(os.getenv('UPLOAD_CHAT_BURST', '3'))
+UPLOAD_PARALLEL = int(os.getenv('UPLOAD_PARALLEL', '3'))
+UPLOAD_MEDIA_GROUP = os.getenv('UPLOAD_MEDIA_GROUP', '0').lower() in ('1', 'true', 'yes')
+
+
+# MEDIA KESH — yuklab olingan YouTube audio fayllari diskda saqlanadi (qayta yuklanmaydi)
+# MEDIA_CACHE_DIR - kesh papkasi (WORK_DIR dan tashqarida bo'lsin: u ishga tushishda tozalanadi)
+# MEDIA_CACHE_MB - kesh hajmi chegarasi, eng uzoq ishlatilmaganlari o'chiriladi (0 - o'chirilgan)
+
+MEDIA_CACHE_DIR = os.getenv('MEDIA_CACHE_DIR', 'media_cache')
+MEDIA_CACHE_MB = int(os.getenv('MEDIA_CACHE_MB', '1024'))
+
+
+# WORKER REJIMI — yuklashlarni alohida jarayonlarda bajarish (worker.py ga qarang)
+# WORKER_MODE=1 - bot faqat Telegram bilan ishlaydi, ishlar broker orqali worker'larga yuboriladi
+# WORKER_BROKER - bot va worker'lar uchun umumiy SQLite navbat fayli
+# WORKER_PROCESSES - worker jarayonlari soni (standart: CPU yadrolari)
+# WORKER_CONCURRENCY - bitta jarayonda parallel bajariladigan ishlar
+# WORKER_DRAIN_TIMEOUT - to'xtatishda bajarilayotgan ishlarni kutish (sekund)
+# WORKER_JOB_TIMEOUT - bot worker javobini shuncha sekund kutadi
+
+WORKER_MODE = os.getenv('WORKER_MODE', '0').lower() in ('1', 'true', 'yes')
+WORKER_BROKER = os.getenv('WORKER_BROKER', 'jobs.db')
+WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', str(os.cpu_count() or 2)))
+WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY', '4'))
+WORKER_DRAIN_TIMEOUT = float(os.getenv('WORKER_DRAIN_TIMEOUT', '300'))
+WORKER_JOB_TIMEOUT = float(os.getenv('WORKER_JOB_TIMEOUT', '900'))
+
+
+# PROGRESS — yuklash holatini (foiz, tezlik) status xabarida ko'rsatish
+# PROGRESS_INTERVAL - bitta chatda progress tahrirlari orasidagi eng kam vaqt (sekund, 0 - o'chirilgan)
+
+PROGRESS_INTERVAL = float(os.getenv('PROGRESS_INTERVAL', '3'))
+
+
+# TAKRORIY SO'ROVLAR VA SPAM — bitta foydalanuvchi botni band qilib qo'ymasligi uchun
+# DUPLICATE_WINDOW - bir xil so'rov (havola, qo'shiq, ijrochi) tugagach shuncha sekund qayta bajarilmaydi
+# USER_RATE_LIMIT / USER_RATE_BURST - bitta foydalanuvchidan sekundiga qabul qilinadigan xabarlar (0 - cheklanmagan) va "portlash"
+# USER_MAX_ACTIVE - bitta foydalanuvchining bir vaqtda qayta ishlanadigan xabarlari (0 - cheklanmagan)
+
+DUPLICATE_WINDOW = float(os.getenv('DUPLICATE_WINDOW', '60'))
+USER_RATE_LIMIT = float(os.getenv('USER_RATE_LIMIT', '0.5'))
+USER_RATE_BURST = float(os.getenv('USER_RATE_BURST', '5'))
+USER_MAX_ACTIVE = int(os.getenv('USER_MAX_ACTIVE', '3'))
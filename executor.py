@@ -0,0 +1,160 @@
+"""
+Executor Module
+Bloklovchi ishlarni (yt-dlp, ffmpeg) asyncio event loop'dan tashqarida bajarish uchun modul
+
+yt-dlp sinxron kutubxona, shuning uchun uning har bir chaqiruvi cheklangan
+thread pool'da bajariladi. ffmpeg esa asyncio subprocess orqali ishga
+tushiriladi, shunda bitta foydalanuvchining yuklashi boshqa chatlarni to'xtatmaydi.
+"""
+
+import asyncio
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# yt-dlp uchun thread pool hajmi
+YTDLP_WORKERS = 8
+
+_ytdlp_executor: Optional[ThreadPoolExecutor] = None
+
+
+def configure(ytdlp_workers: int) -> None:
+    """
+    Thread pool hajmini o'rnatish (pool birinchi ishlatilishidan oldin chaqirilishi kerak)
+    """
+    global YTDLP_WORKERS
+    YTDLP_WORKERS = ytdlp_workers
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _ytdlp_executor
+    if _ytdlp_executor is None:
+        _ytdlp_executor = ThreadPoolExecutor(max_workers=YTDLP_WORKERS, thread_name_prefix="ytdlp")
+    return _ytdlp_executor
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Sinxron funksiyani (masalan, ydl.download yoki ydl.extract_info)
+    yt-dlp thread pool'ida bajarish
+
+    Args:
+        func: Bajariladigan funksiya
+        *args, **kwargs: Funksiya argumentlari
+
+    Returns:
+        Funksiya natijasi
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), partial(func, *args, **kwargs))
+
+
+async def run_ffmpeg(*args: str, timeout: Optional[float] = None) -> None:
+    """
+    ffmpeg'ni event loop'ni bloklamasdan ishga tushirish
+
+    Args:
+        *args: ffmpeg argumentlari ('ffmpeg' so'zisiz)
+        timeout: Maksimal bajarilish vaqti (sekund)
+
+    Raises:
+        subprocess.CalledProcessError: ffmpeg xatolik bilan tugasa
+        asyncio.TimeoutError: timeout oshib ketsa
+    """
+    cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', *args]
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        _, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        proc.kill()
+        await proc.wait()
+        raise
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr)
+
+
+async def run_ffprobe(*args: str, timeout: Optional[float] = 30) -> str:
+    """
+    ffprobe'ni event loop'ni bloklamasdan ishga tushirish
+
+    Args:
+        *args: ffprobe argumentlari ('ffprobe' so'zisiz)
+        timeout: Maksimal bajarilish vaqti (sekund)
+
+    Returns:
+        ffprobe stdout matni
+    """
+    cmd = ['ffprobe', '-v', 'error', *args]
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        proc.kill()
+        await proc.wait()
+        raise
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, output=stdout, stderr=stderr)
+    return stdout.decode(errors='replace')
+
+
+def shutdown() -> None:
+    """Thread pool'ni yopish (bot to'xtaganda)"""
+    global _ytdlp_executor
+    if _ytdlp_executor is not None:
+        _ytdlp_executor.shutdown(wait=False, cancel_futures=True)
+        _ytdlp_executor = None
+
+
+class LoopLagWatchdog:
+    """
+    Event loop kechikishini kuzatuvchi.
+
+    Har `interval` sekundda uxlab, uyg'onish qancha kechikkanini o'lchaydi.
+    Agar biror callback loop'ni `threshold` sekunddan ko'proq bloklasa, log yoziladi.
+    """
+
+    def __init__(self, interval: float = 0.5, threshold: float = 0.25):
+        self.interval = interval
+        self.threshold = threshold
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = loop.time() - started - self.interval
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if lag > self.threshold:
+                logger.warning(f"Event loop {lag * 1000:.0f} ms bloklandi (chegara: {self.threshold * 1000:.0f} ms)")
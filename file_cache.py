@@ -0,0 +1,178 @@
+"""
+Telegram file_id Cache Module
+Yuborilgan fayllarning Telegram file_id'larini saqlash uchun modul
+
+Telegram serveriga bir marta yuklangan fayl keyingi safar file_id orqali
+qayta yuklab olmasdan va qayta yuklamasdan yuborilishi mumkin.
+Kalitlar:
+    yt:<video_id>        - YouTube audio
+    ig:<shortcode>       - Instagram post/reel javobi (video + audio + to'liq versiya)
+    query:<so'rov>       - Qo'shiq nomi bo'yicha qidiruv
+    artist:<so'rov>      - Ijrochi bo'yicha 10 talik qidiruv
+"""
+
+import time
+import sqlite3
+import logging
+import threading
+from typing import List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CachedFile(NamedTuple):
+    """Keshdagi bitta yuborilgan fayl"""
+    kind: str                        # 'audio' yoki 'video'
+    file_id: str
+    title: Optional[str] = None
+    performer: Optional[str] = None
+    caption: Optional[str] = None
+
+
+class FileIdCache:
+    """
+    SQLite asosidagi file_id keshi (TTL + LRU eviction).
+
+    Bitta kalit ostida bir nechta fayl saqlanishi mumkin (masalan, Instagram
+    video + audio yoki ijrochining 10 ta qo'shig'i), shuning uchun har bir
+    qator (key, position) juftligi bilan aniqlanadi.
+    """
+
+    def __init__(self, path: str = "cache.db", ttl: float = 30 * 24 * 3600, max_keys: int = 50000):
+        """
+        Args:
+            path: SQLite fayl yo'li
+            ttl: Yozuvning yashash muddati (sekund)
+            max_keys: Saqlanadigan kalitlar soni chegarasi (LRU bo'yicha o'chiriladi)
+        """
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS file_ids (
+                key TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                file_id TEXT NOT NULL,
+                title TEXT,
+                performer TEXT,
+                caption TEXT,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (key, position)
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS file_ids_last_used ON file_ids (last_used)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS file_ids_file_id ON file_ids (file_id)")
+        self._db.commit()
+
+    def get(self, key: str) -> List[CachedFile]:
+        """
+        Kalit bo'yicha fayllarni olish
+
+        Returns:
+            CachedFile ro'yxati (bo'sh ro'yxat - kesh miss)
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT kind, file_id, title, performer, caption, created_at "
+                "FROM file_ids WHERE key = ? ORDER BY position",
+                (key,)
+            ).fetchall()
+
+            if rows and now - rows[0][5] > self.ttl:
+                # Muddati o'tgan yozuv
+                self._db.execute("DELETE FROM file_ids WHERE key = ?", (key,))
+                self._db.commit()
+                rows = []
+
+            if not rows:
+                self.misses += 1
+                return []
+
+            self._db.execute("UPDATE file_ids SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+
+        return [CachedFile(*row[:5]) for row in rows]
+
+    def contains(self, key: str) -> bool:
+        """
+        Kalit keshda bormi (hit/miss statistikasi va LRU vaqti o'zgarmaydi)
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT created_at FROM file_ids WHERE key = ? LIMIT 1", (key,)
+            ).fetchone()
+        return row is not None and time.time() - row[0] <= self.ttl
+
+    def put(self, key: str, files: List[CachedFile]) -> None:
+        """
+        Kalit ostiga fayllarni saqlash (eski qiymat almashtiriladi)
+        """
+        if not files:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute("DELETE FROM file_ids WHERE key = ?", (key,))
+            self._db.executemany(
+                "INSERT INTO file_ids (key, position, kind, file_id, title, performer, caption, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(key, i, f.kind, f.file_id, f.title, f.performer, f.caption, now, now) for i, f in enumerate(files)]
+            )
+            self._evict()
+            self._db.commit()
+
+    def invalidate(self, key: str) -> None:
+        """Kalitni keshdan o'chirish"""
+        with self._lock:
+            self._db.execute("DELETE FROM file_ids WHERE key = ?", (key,))
+            self._db.commit()
+        logger.info(f"Kesh yozuvi o'chirildi: {key}")
+
+    def invalidate_file_id(self, file_id: str) -> None:
+        """
+        Telegram rad etgan file_id'ni ishlatadigan barcha kalitlarni o'chirish
+        """
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM file_ids WHERE key IN (SELECT key FROM file_ids WHERE file_id = ?)",
+                (file_id,)
+            )
+            self._db.commit()
+        logger.info(f"Yaroqsiz file_id keshdan o'chirildi: {file_id}")
+
+    def stats(self) -> dict:
+        """Kesh statistikasi (hit/miss va kalitlar soni)"""
+        with self._lock:
+            keys = self._db.execute("SELECT COUNT(DISTINCT key) FROM file_ids").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'keys': keys,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _evict(self) -> None:
+        """Muddati o'tgan va eng kam ishlatilgan kalitlarni o'chirish (lock ichida chaqiriladi)"""
+        self._db.execute("DELETE FROM file_ids WHERE created_at < ?", (time.time() - self.ttl,))
+        keys = self._db.execute("SELECT COUNT(DISTINCT key) FROM file_ids").fetchone()[0]
+        overflow = keys - self.max_keys
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM file_ids WHERE key IN ("
+                "SELECT key FROM file_ids GROUP BY key ORDER BY MAX(last_used) LIMIT ?)",
+                (overflow,)
+            )
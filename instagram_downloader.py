@@ -1,43 +1,200 @@
 """
 Instagram Downloader Module
-Instagram'dan video va audio yuklab olish uchun modul
+Instagram/TikTok'dan video va audio, YouTube'dan audio yuklab olish uchun modul
 """
 
 import os
 import re
-import yt_dlp
+import time
 import logging
+import shutil
 import asyncio
-import subprocess
-from typing import Optional, Tuple
+import threading
+from typing import List, Optional, Tuple
+
+from executor import run_blocking
+from media import extract_audio, transcode_audio, audio_format, audio_ext
+from scheduler import scheduler, SEARCH, DOWNLOAD, TRANSCODE
+from singleflight import SingleFlight
+from search_cache import search_cache, normalize_query
+from workspace import shared_dir
+from metrics import STAGE_SECONDS, REQUESTS, BYTES
+from ydl_pool import YdlPool
+from ranking import rank
+from metadata import song_query_from_info, clean_track
+from url_router import Link, parse_link, INSTAGRAM, TIKTOK
+from media_cache import media_cache, link_file
+from progress import progress_hook
 
 logger = logging.getLogger(__name__)
 
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36'
+
+# Profil bo'yicha qayta ishlatiladigan YoutubeDL obyektlari
+# (outtmpl va hook'lar har bir checkout'da beriladi)
+search_pool = YdlPool("search", lambda: {
+    'quiet': True,
+    'no_warnings': True,
+    'nocheckcertificate': True,
+    'user_agent': USER_AGENT,
+    'extract_flat': True,  # Faqat metadata olish uchun tezroq
+})
+# Audio xom holda yuklanadi: kodlash alohida TRANSCODE bosqichida (_transcode)
+audio_pool = YdlPool("audio", lambda: {
+    'format': audio_format(),
+    'quiet': True,
+    'no_warnings': True,
+    'nocheckcertificate': True,
+    'user_agent': USER_AGENT,
+})
+video_pool = YdlPool("video", lambda: {
+    'quiet': True,
+    'no_warnings': True,
+    'format': 'best',
+    'ignoreerrors': True,
+    'nocheckcertificate': True,
+    'user_agent': USER_AGENT,
+    'http_headers': {
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.9',
+    }
+})
+YDL_POOLS = (search_pool, audio_pool, video_pool)
+
+# Hedged yuklash: nomzod HEDGE_DELAY sekund ichida bayt bermasa yoki xatolik
+# bersa, keyingisi parallel boshlanadi (bir so'rov uchun HEDGE_MAX_PARALLEL tagacha)
+HEDGE_DELAY = 5.0
+HEDGE_MAX_PARALLEL = 2
+
+
+def configure_hedging(delay: float, max_parallel: int) -> None:
+    """Hedged yuklash sozlamalari (max_parallel=1 - nomzodlar ketma-ket sinaladi)"""
+    global HEDGE_DELAY, HEDGE_MAX_PARALLEL
+    HEDGE_DELAY = delay
+    HEDGE_MAX_PARALLEL = max(1, max_parallel)
+
+
+class _DownloadCancelled(Exception):
+    """yt-dlp thread'idagi yuklashni to'xtatish uchun (progress hook'dan ko'tariladi)"""
+
+# Bir vaqtdagi bir xil so'rovlarni birlashtirish
+search_flights = SingleFlight("youtube-search")
+track_flights = SingleFlight("youtube-track")
+instagram_flights = SingleFlight("instagram")
+tiktok_flights = SingleFlight("tiktok")
+song_flights = SingleFlight("song-query")
+_video_flights = {INSTAGRAM: instagram_flights, TIKTOK: tiktok_flights}
+
+
+def coalescing_stats() -> dict:
+    """Birlashtirilgan so'rovlar statistikasi (manba bo'yicha)"""
+    return {
+        'youtube_search': search_flights.stats(),
+        'youtube_track': track_flights.stats(),
+        'instagram': instagram_flights.stats(),
+        'tiktok': tiktok_flights.stats(),
+        'song_query': song_flights.stats(),
+    }
+
+
+def _link_into(src: str, output_dir: str, stem: str) -> str:
+    """
+    Umumiy natija faylini so'rovchining papkasiga hardlink qilish (nusxalamasdan).
+    Nom band bo'lsa, raqamli qo'shimcha qo'shiladi: {stem}.1.{ext}
+    
+    Args:
+        src: Umumiy fayl yo'li
+        output_dir: So'rovchining papkasi
+        stem: Yangi fayl nomi (kengaytmasiz)
+        
+    Returns:
+        Yangi fayl yo'li
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    ext = os.path.splitext(src)[1]
+    dest = os.path.join(output_dir, f"{stem}{ext}")
+    n = 0
+    while os.path.exists(dest):
+        n += 1
+        dest = os.path.join(output_dir, f"{stem}.{n}{ext}")
+    link_file(src, dest)
+    return dest
+
+
+def _flight_dir(key: str) -> str:
+    """
+    Birlashtirilgan ish uchun alohida vaqtinchalik papka yo'li (ish boshlanganda yaratiladi).
+    Natija shu yerdan har bir so'rovchining papkasiga hardlink qilinadi.
+    """
+    safe = re.sub(r'[^\w.-]', '_', key)[:80]
+    return os.path.join(shared_dir(), f"{safe}_{os.urandom(4).hex()}")
+
 
 def is_instagram_url(url: str) -> bool:
     """
-    URL Instagram linkimi tekshirish
+    Matnda Instagram post/reel linki bormi tekshirish
     
     Args:
-        url: Tekshiriladigan URL
+        url: Tekshiriladigan URL yoki xabar matni
         
     Returns:
         True agar Instagram link bo'lsa, aks holda False
     """
-    instagram_patterns = [
-        r'https?://(?:www\.)?instagram\.com/(?:p|reel|reels|tv)/[\w-]+/?',
-        r'https?://(?:www\.)?instagram\.com/[\w.-]+/(?:p|reel|reels|tv)/[\w-]+/?',
-    ]
+    link = parse_link(url)
+    return link is not None and link.platform == INSTAGRAM
+
+
+def get_instagram_shortcode(url: str) -> Optional[str]:
+    """
+    Instagram linkidan post/reel shortcode'ini olish (kesh kaliti uchun)
+    
+    Args:
+        url: Instagram URL
+        
+    Returns:
+        Shortcode yoki None
+    """
+    link = parse_link(url)
+    return link.id if link is not None and link.platform == INSTAGRAM else None
+
+
+def get_youtube_id(file_path: str) -> Optional[str]:
+    """
+    Yuklab olingan YouTube audio fayl nomidan video ID ni olish
+    ({video_id}_yt.mp3 yoki {video_id}_batch.mp3)
     
-    for pattern in instagram_patterns:
-        if re.match(pattern, url):
-            return True
-    return False
+    Args:
+        file_path: Fayl yo'li
+        
+    Returns:
+        Video ID yoki None
+    """
+    match = re.match(r'(.+)_(?:yt|batch)(?:\.\d+)?\.\w+$', os.path.basename(file_path or ''))
+    return match.group(1) if match else None
+
+
+def _downloaded_filepath(ydl, info: dict, output_dir: str) -> Optional[str]:
+    """
+    yt-dlp yuklab olgan fayl yo'lini info lug'atidan aniqlash
+    """
+    for download in info.get('requested_downloads') or []:
+        path = download.get('filepath')
+        if path and os.path.exists(path):
+            return path
+
+    path = ydl.prepare_filename(info)
+    if os.path.exists(path):
+        return path
+
+    for f in os.listdir(output_dir):
+        if f.startswith(info['id']) and (f.endswith(".mp4") or f.endswith(".webm")):
+            return os.path.join(output_dir, f)
+    return None
 
 
 async def download_instagram_content(url: str, output_dir: str = "downloads") -> Tuple[Optional[str], Optional[str], Optional[str]]:
     """
-    Instagram'dan video va audio yuklab olish + qo'shiq ma'lumotlarini olish
+    Instagram'dan video va audio yuklab olish + qo'shiq ma'lumotlarini olish.
     
     Args:
         url: Instagram video URL
@@ -46,161 +203,373 @@ async def download_instagram_content(url: str, output_dir: str = "downloads") ->
     Returns:
         Tuple: (video_path, audio_path, song_query) yoki (None, None, None) xatolik bo'lsa
     """
+    link = parse_link(url)
+    if link is None or link.platform != INSTAGRAM:
+        link = Link(INSTAGRAM, url, url, f"ig:{url}")
+    return await download_video_content(link, output_dir)
+
+
+async def download_video_content(link: Link, output_dir: str = "downloads") -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Instagram yoki TikTok havolasidan video va audio yuklab olish + qo'shiq ma'lumotlarini olish.
+    Bir xil post/video uchun bir vaqtdagi so'rovlar bitta yuklashga birlashtiriladi.
+    
+    Args:
+        link: url_router havolasi (INSTAGRAM yoki TIKTOK)
+        output_dir: Fayllarni saqlash uchun papka
+        
+    Returns:
+        Tuple: (video_path, audio_path, song_query) yoki (None, None, None) xatolik bo'lsa
+    """
+    staging = _flight_dir(link.key)
+    
+    def cleanup(_):
+        shutil.rmtree(staging, ignore_errors=True)
+    
+    flights = _video_flights[link.platform]
+    with STAGE_SECONDS.time(source=link.platform, stage='total'):
+        async with flights.join(link.key, lambda: _download_video_content(link.url, staging, link.platform), cleanup=cleanup) as result:
+            video_path, audio_path, song_query = result
+            if video_path:
+                video_path = _link_into(video_path, output_dir, os.path.splitext(os.path.basename(video_path))[0])
+            if audio_path:
+                audio_path = _link_into(audio_path, output_dir, os.path.splitext(os.path.basename(audio_path))[0])
+    REQUESTS.inc(source=link.platform, result='success' if video_path or audio_path else 'failure')
+    return video_path, audio_path, song_query
+
+
+async def fetch_song_query(link: Link) -> Optional[str]:
+    """
+    Instagram/TikTok postidagi qo'shiqni faqat metadata orqali aniqlash.
+    Video va audio yuklanmaydi: faqat extract_info + song_query evristikasi,
+    shuning uchun YouTube qidiruvi darhol boshlanishi mumkin.
+    
+    Args:
+        link: url_router havolasi (INSTAGRAM yoki TIKTOK)
+        
+    Returns:
+        YouTube uchun qidiruv matni yoki None
+    """
+    def sync_info():
+        with video_pool.checkout() as ydl:
+            return ydl.extract_info(link.url, download=False)
+    
+    async def resolve():
+        async with scheduler.slot(SEARCH):
+            with STAGE_SECONDS.time(source=f"{link.platform}_song", stage='search'):
+                info = await run_blocking(sync_info)
+        return song_query_from_info(info) if info else None
+    
+    try:
+        async with song_flights.join(link.key, resolve) as result:
+            song_query = result
+    except Exception as e:
+        logger.error(f"{link.platform} metadata xatolik: {e}")
+        song_query = None
+    REQUESTS.inc(source=f"{link.platform}_song", result='success' if song_query else 'failure')
+    return song_query
+
+
+async def _download_video_content(url: str, output_dir: str, source: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Haqiqiy yuklab olish (download_video_content uchun)
+    """
     try:
         # Papkani yaratish
         os.makedirs(output_dir, exist_ok=True)
         
-        # Umumiy sozlamalar (info olish uchun)
-        base_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'format': 'best',
-            'ignoreerrors': True,
-            'nocheckcertificate': True,
-            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
-            'http_headers': {
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9',
-            }
-        }
-        
         video_path = None
         audio_path = None
         song_query = None
         
-        # 1. Ma'lumotlarni bir marta olish
-        with yt_dlp.YoutubeDL(base_opts) as ydl:
-            logger.info(f"Instagram ma'lumotlari olinmoqda: {url}")
-            try:
-                info = ydl.extract_info(url, download=False)
-            except Exception as ie:
-                logger.error(f"Extract info error: {ie}")
-                info = None
-            
-            if not info:
-                return None, None, None
-
-            # Qo'shiq ma'lumotlarini qidirish (Agressiv usul)
-            track = info.get('track')
-            artist = info.get('artist')
-            creator = info.get('creator')
-            uploader = info.get('uploader')
-            alt_title = info.get('alt_title')
-            description = info.get('description', '')
-            title = info.get('title', '')
-            
-            # Instagram maxsus metadata maydonlari
-            music_info = info.get('music_info', {})
-            if music_info:
-                track = music_info.get('title', track)
-                artist = music_info.get('artist', artist)
-            
-            # To'g'ridan-to'g'ri metadata bo'lsa (Eng ishonchli)
-            if track and artist:
-                song_query = f"{artist} - {track}"
-            elif track:
-                song_query = track
-            elif alt_title:
-                if artist: song_query = f"{artist} - {alt_title}"
-                else: song_query = alt_title
-            
-            # Tavsifdan regex orqali qidirish
-            if not song_query and description:
-                patterns = [
-                    r'(?:Music|Song|Musiqa|Trek|Nomi):\s*([^\n|]+)',
-                    r'🎵\s*([^\n|]+)',
-                    r'🎧\s*([^\n|]+)',
-                    r'🎤\s*([^\n|]+)'
-                ]
-                for pattern in patterns:
-                    match = re.search(pattern, description, re.IGNORECASE)
-                    if match:
-                        song_query = match.group(1).strip()
-                        break
-            
-            # Keraksiz generic nomlarni filtrlash
-            is_original_audio = False
-            for forbidden in ["original audio", "original music", "originalniy zvuk", "asl audio"]:
-                if song_query and forbidden in song_query.lower():
-                    is_original_audio = True
-                    break
-            
-            if is_original_audio:
-                # Agar faqat "Original audio" bo'lsa, uni qidirish foydasiz
-                # Lekin foydalanuvchi uploader orqali topishni xohlashi mumkin
-                if uploader:
-                    song_query = f"{uploader} yangi klip"
-                else:
-                    song_query = None
-
-            # Sarlavhani tahlil qilish (Agar hali ham yo'q bo'lsa)
-            if not song_query and title:
-                clean_title = re.sub(r'Instagram (?:video|reel|reels|post|TV).*', '', title, flags=re.IGNORECASE).strip()
-                clean_title = re.sub(r'#\w+|@\w+|https?://\S+|www\.\S+', '', clean_title).strip()
-                if clean_title and len(clean_title) > 5:
-                    song_query = clean_title
-            
-            # Agar juda qisqa bo'lsa yoki topilmasa, uploader fallback
-            if not song_query and uploader:
-                clean_uploader = re.sub(r'[\._]', ' ', uploader).strip()
-                song_query = f"{clean_uploader} qo'shiq"
+        # 1. Ma'lumotlarni bir marta olish (media hali yuklanmaydi).
+        # YoutubeDL pool'dan faqat yt-dlp thread'i ichida olinadi: slot kutayotgan
+        # yoki transcode qilayotgan so'rovlar obyektni band qilib turmaydi.
+        report = progress_hook()
+        ydl_params = {
+            'outtmpl': os.path.join(output_dir, '%(id)s_video.%(ext)s'),
+            'progress_hooks': [report] if report else [],
+        }
 
-            logger.info(f"ANALIZ: track={track}, artist={artist}, title={title}, query={song_query}")
+        def sync_extract():
+            with video_pool.checkout(**ydl_params) as ydl:
+                return ydl.extract_info(url, download=False)
 
-            # PARALLEL EXECUTION: Instagram downloads + YouTube search
-            tasks = []
-            
-            # 2. Video yuklab olish funksiyasi
-            async def dl_video():
-                v_opts = {**base_opts, 'outtmpl': os.path.join(output_dir, '%(id)s_video.%(ext)s')}
-                with yt_dlp.YoutubeDL(v_opts) as ydl_v:
-                    await asyncio.to_thread(ydl_v.download, [url])
-                    v_filename = ydl_v.prepare_filename(info)
-                    if not os.path.exists(v_filename):
-                        for f in os.listdir(output_dir):
-                            if f.startswith(info['id']) and (f.endswith(".mp4") or f.endswith(".webm")):
-                                return os.path.join(output_dir, f)
-                    return v_filename if os.path.exists(v_filename) else None
-
-            # 3. Audio yuklab olish funksiyasi
-            async def dl_audio():
-                a_opts = {
-                    **base_opts, 'format': 'bestaudio/best',
-                    'outtmpl': os.path.join(output_dir, '%(id)s_audio.%(ext)s'),
-                    'postprocessors': [{'key': 'FFmpegExtractAudio', 'preferredcodec': 'mp3', 'preferredquality': '192'}]
-                }
-                expected_a = os.path.join(output_dir, f"{info['id']}_audio.mp3")
-                with yt_dlp.YoutubeDL(a_opts) as ydl_a:
-                    await asyncio.to_thread(ydl_a.download, [url])
-                return expected_a if os.path.exists(expected_a) else None
-
-            # Barcha vazifalarni ishga tushiramiz
-            video_task = asyncio.create_task(dl_video())
-            audio_task = asyncio.create_task(dl_audio())
-            
-            # Natijalarni kutamiz
-            video_path = await video_task
-            audio_path = await audio_task
-
-            # Agar audio bo'lmasa, videodan ajratamiz (bu tez ishlaydi)
-            if not audio_path or not os.path.exists(audio_path):
-                if video_path and os.path.exists(video_path):
-                    logger.info("Extracting audio from video...")
-                    audio_path = os.path.join(output_dir, f"{info['id']}_extracted.mp3")
-                    try:
-                        subprocess.run(['ffmpeg', '-i', video_path, '-vn', '-ar', '44100', '-ac', '2', '-b:a', '192k', audio_path, '-y'], capture_output=True, check=True)
-                    except: audio_path = None
+        def sync_process(info):
+            with video_pool.checkout(**ydl_params) as ydl:
+                result = ydl.process_ie_result(info, download=True)
+                return _downloaded_filepath(ydl, result or info, output_dir)
+
+        logger.info(f"{source} ma'lumotlari olinmoqda: {url}")
+        try:
+            async with scheduler.slot(SEARCH):
+                with STAGE_SECONDS.time(source=source, stage='search'):
+                    info = await run_blocking(sync_extract)
+        except Exception as ie:
+            logger.error(f"Extract info error: {ie}")
+            info = None
+        
+        if not info:
+            return None, None, None
+
+        # Qo'shiq ma'lumotlarini qidirish (Agressiv usul)
+        song_query = song_query_from_info(info)
+
+        # 2. Media'ni bir marta yuklab olish.
+        # extract_info natijasi qayta ishlatiladi (yt-dlp --load-info-json kabi),
+        # shuning uchun platformaga qayta so'rov yuborilmaydi.
+        logger.info(f"{source} media yuklab olinmoqda: {info.get('id')}")
+        async with scheduler.slot(DOWNLOAD):
+            with STAGE_SECONDS.time(source=source, stage='download'):
+                video_path = await run_blocking(sync_process, info)
+        if video_path:
+            BYTES.inc(os.path.getsize(video_path), direction='download')
+
+        # 3. Audio'ni yuklab olingan videodan lokal ajratamiz
+        # (kodek mos bo'lsa qayta kodlashsiz, stream copy orqali)
+        if video_path:
+            audio_path = await _transcode(
+                source, extract_audio, video_path, os.path.join(output_dir, f"{info['id']}_audio")
+            )
             
         return video_path, audio_path, song_query
         
     except Exception as e:
-        logger.error(f"Instagram yuklab olishda xatolik: {e}")
+        logger.error(f"{source} yuklab olishda xatolik: {e}")
         return None, None, None
 
 
 async def download_youtube_audio(query: str, output_dir: str = "downloads") -> Tuple[Optional[str], Optional[str], Optional[str]]:
     """
-    YouTube'dan qidiruv bo'yicha audio faylni yuklab olish (100% natija uchun)
+    YouTube'dan qidiruv bo'yicha audio faylni yuklab olish (100% natija uchun).
+    Bir xil so'rov bir vaqtda bir necha marta kelsa, qidiruv va yuklash bir marta bajariladi.
+    """
+    key = f"query:{normalize_query(query)}"
+    staging = _flight_dir(key)
+    
+    def cleanup(_):
+        shutil.rmtree(staging, ignore_errors=True)
+    
+    with STAGE_SECONDS.time(source='youtube', stage='total'):
+        async with search_flights.join(key, lambda: _download_youtube_audio(query, staging), cleanup=cleanup) as result:
+            path, title, artist = result
+            if path:
+                path = _link_into(path, output_dir, os.path.splitext(os.path.basename(path))[0])
+    REQUESTS.inc(source='youtube', result='success' if path else 'failure')
+    return path, title, artist
+
+
+async def search_youtube(query: str, count: int) -> list:
+    """
+    YouTube'da qidirish (flat natijalar). Natijalar normallashtirilgan so'rov
+    bo'yicha keshlanadi, shuning uchun qayta qidiruv tarmoqsiz bajariladi.
+    
+    Args:
+        query: Qidiruv matni
+        count: Natijalar soni (ytsearchN)
+        
+    Returns:
+        Yozuvlar ro'yxati (id, title, uploader, duration, ...)
+    """
+    key = f"{count}:{normalize_query(query)}"
+    entries = search_cache.get(key)
+    if entries is not None:
+        logger.info(f"Qidiruv keshdan olindi: {query}")
+        return entries
+    
+    # yt-dlp async emas, shuning uchun yt-dlp thread pool'ida bajaramiz
+    def sync_extract():
+        with search_pool.checkout() as ydl:
+            return ydl.extract_info(f"ytsearch{count}:{query}", download=False)
+    
+    async with scheduler.slot(SEARCH):
+        with STAGE_SECONDS.time(source='youtube', stage='search'):
+            info = await run_blocking(sync_extract)
+    if not info or 'entries' not in info:
+        return []
+    
+    entries = [e for e in info['entries'] if e]
+    search_cache.put(key, entries)
+    return entries
+
+
+async def fetch_youtube_track(video_id: str, output_dir: str, suffix: str,
+                              started: Optional[asyncio.Event] = None) -> Optional[str]:
+    """
+    YouTube video ID bo'yicha audio yuklab olish. Bir xil video uchun bir vaqtdagi
+    yuklashlar (yakka qidiruv, ijrochi qidiruvi) bitta yuklashga birlashtiriladi.
+    
+    Args:
+        video_id: YouTube video ID
+        output_dir: Natija fayli joylashadigan papka
+        suffix: Fayl nomi qo'shimchasi ({video_id}_{suffix}.ext)
+        started: Birinchi baytlar yuklanganda o'rnatiladigan event
+            (yuklash boshqa so'rov bilan birlashtirilsa o'rnatilmaydi)
+        
+    Returns:
+        Audio fayl yo'li yoki None
+    """
+    key = f"yt:{video_id}"
+    
+    # Diskdagi media keshda bo'lsa, yuklamasdan hardlink qilamiz
+    cached = media_cache.get(key, audio_ext())
+    if cached:
+        try:
+            path = _link_into(cached, output_dir, f"{video_id}_{suffix}")
+        except OSError as e:
+            logger.warning(f"Media keshdan olishda xatolik {key}: {e}")
+        else:
+            if started is not None:
+                started.set()
+            return path
+    
+    staging = _flight_dir(key)
+    
+    def cleanup(_):
+        shutil.rmtree(staging, ignore_errors=True)
+    
+    async with track_flights.join(key, lambda: _download_youtube_track(video_id, staging, started), cleanup=cleanup) as staged:
+        path = _link_into(staged, output_dir, f"{video_id}_{suffix}") if staged else None
+    return path
+
+
+async def download_youtube_link(video_id: str, output_dir: str = "downloads") -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    YouTube havolasidagi videoning audiosini yuklab olish (qidiruvsiz).
+    Sarlavha va kanal nomi yuklash bilan parallel olinadi.
+    
+    Args:
+        video_id: YouTube video ID
+        output_dir: Natija fayli joylashadigan papka
+        
+    Returns:
+        Tuple: (path, title, artist) yoki (None, None, None)
+    """
+    with STAGE_SECONDS.time(source='youtube_link', stage='total'):
+        try:
+            info, path = await asyncio.gather(
+                _youtube_video_info(video_id),
+                fetch_youtube_track(video_id, output_dir, 'yt')
+            )
+        except Exception as e:
+            logger.error(f"YouTube link download error for {video_id}: {e}")
+            path = None
+    REQUESTS.inc(source='youtube_link', result='success' if path else 'failure')
+    if not path:
+        return None, None, None
+    title, artist = clean_track(info.get('title') or video_id, info.get('uploader') or 'YouTube', strip_year=True)
+    return path, title, artist
+
+
+async def _youtube_video_info(video_id: str) -> dict:
+    """Bitta video metadata'si (xatolikda bo'sh lug'at)"""
+    def sync_info():
+        with search_pool.checkout() as ydl:
+            return ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=False) or {}
+
+    try:
+        async with scheduler.slot(SEARCH):
+            with STAGE_SECONDS.time(source='youtube_link', stage='search'):
+                return await run_blocking(sync_info)
+    except Exception as e:
+        logger.error(f"YouTube info error for {video_id}: {e}")
+        return {}
+
+
+async def _transcode(source: str, convert, src: str, output_base: str) -> Optional[str]:
+    """
+    Audio ajratish/kodlash bosqichi: ffmpeg jarayonlari soni TRANSCODE slotlari
+    bilan cheklanadi, shuning uchun ijrochi qidiruvidagi 10 ta qo'shiq CPU'ni
+    bo'lib olmaydi. Har bir fayl uchun navbat va kodlash vaqti alohida log qilinadi
+    (metrikalar: bot_queue_wait_seconds{kind="transcode"}, bot_audio_extract_seconds).
+
+    Args:
+        source: Metrika manbasi (instagram, tiktok, youtube)
+        convert: media.extract_audio yoki media.transcode_audio
+        src: Kiruvchi media fayl
+        output_base: Chiqish fayl yo'li (kengaytmasiz)
+    """
+    queued = time.perf_counter()
+    async with scheduler.slot(TRANSCODE):
+        waited = time.perf_counter() - queued
+        started = time.perf_counter()
+        with STAGE_SECONDS.time(source=source, stage='transcode'):
+            path = await convert(src, output_base)
+    logger.info(
+        f"{os.path.basename(output_base)}: transcode navbati {waited:.2f}s, "
+        f"ajratish {time.perf_counter() - started:.2f}s"
+    )
+    return path
+
+
+async def _download_youtube_track(video_id: str, output_dir: str,
+                                  started: Optional[asyncio.Event] = None) -> Optional[str]:
+    """
+    Bitta YouTube videoning audiosini yuklab olish (fetch_youtube_track uchun).
+    Xom audio DOWNLOAD slotida yuklanadi, kodlash esa slot bo'shagandan keyin
+    TRANSCODE navbatida bajariladi (tarmoq va CPU bosqichlari bir-birini kutmaydi).
+    Task bekor qilinsa, yt-dlp thread'idagi yuklash ham keyingi progress
+    hook'da to'xtatiladi; DOWNLOAD sloti thread tugagandan keyin bo'shatiladi.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    video_url = f"https://www.youtube.com/watch?v={video_id}"
+    loop = asyncio.get_running_loop()
+    cancelled = threading.Event()
+    report = progress_hook()
+    
+    def on_progress(d):
+        if cancelled.is_set():
+            raise _DownloadCancelled(video_id)
+        if started is not None and d.get('status') == 'downloading' and not started.is_set():
+            loop.call_soon_threadsafe(started.set)
+        if report is not None:
+            report(d)
+    
+    logger.info(f"Downloading found song: {video_url}")
+    def sync_download():
+        with audio_pool.checkout(
+            outtmpl=os.path.join(output_dir, f'{video_id}_raw.%(ext)s'),
+            progress_hooks=[on_progress]
+        ) as ydl_final:
+            info = ydl_final.extract_info(video_url, download=True)
+            return _downloaded_filepath(ydl_final, info, output_dir) if info else None
+    
+    async with scheduler.slot(DOWNLOAD):
+        with STAGE_SECONDS.time(source='youtube', stage='download'):
+            download = asyncio.ensure_future(run_blocking(sync_download))
+            try:
+                raw_path = await asyncio.shield(download)
+            except asyncio.CancelledError:
+                cancelled.set()
+                # Slot yt-dlp thread'i haqiqatan to'xtaguncha band turadi:
+                # aks holda hedging paytida DOWNLOAD limitidan ko'p yuklash ketadi
+                while not download.done():
+                    try:
+                        await asyncio.wait({download})
+                    except asyncio.CancelledError:
+                        pass
+                if not download.cancelled():
+                    download.exception()
+                raise
+    if not raw_path:
+        return None
+    BYTES.inc(os.path.getsize(raw_path), direction='download')
+    
+    try:
+        path = await _transcode('youtube', transcode_audio, raw_path, os.path.join(output_dir, video_id))
+    finally:
+        os.remove(raw_path)
+    
+    # Faylni tekshirish
+    if path and os.path.getsize(path) > 1000:
+        media_cache.put(f"yt:{video_id}", audio_ext(), path)
+        return path
+    return None
+
+
+async def _download_youtube_audio(query: str, output_dir: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    YouTube qidiruvi va eng mos natijani yuklab olish (download_youtube_audio uchun)
     """
     try:
         os.makedirs(output_dir, exist_ok=True)
@@ -211,26 +580,10 @@ async def download_youtube_audio(query: str, output_dir: str = "downloads") -> T
         
         # Qidiruv variantlarini yig'amiz
         all_entries = []
-        ydl_opts = {
-            'quiet': True, 
-            'no_warnings': True, 
-            'nocheckcertificate': True,
-            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
-            'extract_flat': True, # Faqat metadata olish uchun tezroq
-        }
         
         async def fetch_search_results(variant):
             try:
-                # Loop ichida yangi event loop yoki thread safety bilan ishlash uchun 
-                # run_in_executor ishlatish ham mumkin, lekin yt-dlp extracting info async emas
-                # Shuning uchun asyncio.to_thread ishlatamiz (Python 3.9+)
-                def sync_extract():
-                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                        return ydl.extract_info(f"ytsearch3:{variant}", download=False)
-                
-                info = await asyncio.to_thread(sync_extract)
-                if info and 'entries' in info:
-                    return [e for e in info['entries'] if e]
+                return await search_youtube(variant, 3)
             except Exception as e:
                 logger.error(f"Search error for {variant}: {e}")
             return []
@@ -245,96 +598,23 @@ async def download_youtube_audio(query: str, output_dir: str = "downloads") -> T
         # unique entries
         unique_entries = {e['id']: e for e in all_entries}.values()
         
-        def rate_entry(e):
-            score = 0
-            title = e.get('title', '').lower()
-            uploader = e.get('uploader', '').lower()
-            duration = e.get('duration', 0)
-            
-            # Duration score - SHARPLY prioritize 2-6 mins (Avoid clips)
-            if 150 <= duration <= 360: 
-                score += 150 # Ideal song length
-            elif 120 <= duration <= 600: 
-                score += 80  # Acceptable length
-            elif duration < 60: 
-                score -= 200 # Too short (definitely not a full song)
-            elif duration > 600: 
-                score -= 50  # Too long (mix/album)
-            
-            # Title keywords score
-            if any(k in title for k in ['official', 'original', 'full', 'audio']): score += 60
-            if any(k in title for k in ['clip', 'klip', 'music video']): score += 30
-            if 'mix' in title or 'remix' in title: score -= 100
-            if 'live' in title: score -= 30
-            if 'short' in title or 'reel' in title: score -= 150
-            
-            # Channel keywords score (Handasa uchun juda muhim)
-            if any(k in uploader for k in ['official', 'vevo', 'topic', 'music', 'handasa']): score += 100
-            
-            # Query match score (Artist name match is crucial)
-            q_clean = q.lower().replace('official', '').replace('audio', '').strip()
-            q_words = q_clean.split()
-            match_count = sum(1 for w in q_words if w in title or w in uploader)
-            if q_words:
-                score += (match_count / len(q_words)) * 150 # Boosted weight
-            
-            # Exact match for Handasa or similar
-            if 'handasa' in q_clean and 'handasa' in uploader:
-                score += 200
-            
-            return score
-
-        sorted_entries = sorted(unique_entries, key=rate_entry, reverse=True)
+        ranked = rank(list(unique_entries), q, 'song')
         
         # LOG sorted results for debugging in console
-        for i, entry in enumerate(list(sorted_entries)[:5]):
-            logger.info(f"Top {i+1}: {entry.get('title')} | Score: {rate_entry(entry)} | Dur: {entry.get('duration')}s")
+        for i, (score, entry) in enumerate(ranked[:5]):
+            logger.info(f"Top {i+1}: {entry.get('title')} | Score: {score} | Dur: {entry.get('duration')}s")
 
-        for entry in list(sorted_entries)[:10]: # 10 tagacha sinab ko'ramiz (limit oshirildi)
-            video_id = entry['id']
-            video_url = f"https://www.youtube.com/watch?v={video_id}"
-            
-            final_opts = {
-                'format': 'bestaudio/best',
-                'outtmpl': os.path.join(output_dir, f'{video_id}_yt.%(ext)s'),
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
-                'quiet': True,
-                'no_warnings': True,
-                'nocheckcertificate': True,
-                'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
-            }
-            
-            try:
-                logger.info(f"Downloading found song: {video_url}")
-                with yt_dlp.YoutubeDL(final_opts) as ydl_final:
-                    ydl_final.download([video_url])
-
-                # Faylni tekshirish
-                expected_mp3 = os.path.join(output_dir, f"{video_id}_yt.mp3")
-                if os.path.exists(expected_mp3) and os.path.getsize(expected_mp3) > 1000:
-                    raw_title = entry.get('title', 'Unknown')
-                    uploader = entry.get('uploader', 'Unknown')
-                    
-                    # Metadata tozalash
-                    artist = uploader.replace(' - Topic', '').replace('Official', '').replace('VEVO', '').strip()
-                    title = raw_title
-                    
-                    if " - " in raw_title:
-                        p = raw_title.split(" - ", 1)
-                        artist, title = p[0].strip(), p[1].strip()
-                    
-                    for junk in [r'\(official.*?\)', r'\[official.*?\]', r'audio', r'video', r'clip', r'klip', r'full', r'original', r'\d{4}']:
-                        title = re.sub(junk, '', title, flags=re.IGNORECASE).strip()
-                        artist = re.sub(junk, '', artist, flags=re.IGNORECASE).strip()
-                    
-                    return expected_mp3, title, artist
-            except Exception as e:
-                logger.warning(f"Failed download {video_id}: {e}")
-                continue
+        # 10 tagacha nomzod: hedged rejimda sekin yoki xatolik bergan nomzod
+        # kutilmasdan keyingisi parallel boshlanadi
+        winner = await _race_candidates([entry for _, entry in ranked[:10]], output_dir)
+        if winner:
+            entry, expected_mp3 = winner
+            raw_title = entry.get('title', 'Unknown')
+            uploader = entry.get('uploader', 'Unknown')
+
+            # Metadata tozalash
+            title, artist = clean_track(raw_title, uploader, strip_year=True)
+            return expected_mp3, title, artist
                 
         return None, None, None
     except Exception as e:
@@ -342,6 +622,64 @@ async def download_youtube_audio(query: str, output_dir: str = "downloads") -> T
         return None, None, None
 
 
+async def _race_candidates(entries: List[dict], output_dir: str) -> Optional[Tuple[dict, str]]:
+    """
+    Reyting bo'yicha tartiblangan nomzodlarni hedged usulda yuklab olish.
+
+    Eng yaxshi nomzod boshlanadi; u HEDGE_DELAY ichida bayt bermasa (geo-blok,
+    yosh cheklovi, sekin server) keyingisi parallel boshlanadi, xatolik bersa
+    darhol keyingisi boshlanadi. Birinchi tugagan natija olinadi, qolganlari
+    bekor qilinadi. Bir vaqtda HEDGE_MAX_PARALLEL tadan ko'p nomzod yuklanmaydi.
+
+    Returns:
+        (entry, path) yoki None - hech bir nomzod yuklanmadi
+    """
+    candidates = iter(entries)
+    running = {}
+
+    def launch() -> bool:
+        entry = next(candidates, None)
+        if entry is None:
+            return False
+        started = asyncio.Event()
+        task = asyncio.create_task(fetch_youtube_track(entry['id'], output_dir, 'yt', started=started))
+        running[task] = (entry, started)
+        return True
+
+    launch()
+    try:
+        while running:
+            can_hedge = len(running) < HEDGE_MAX_PARALLEL
+            done, _ = await asyncio.wait(
+                running,
+                timeout=HEDGE_DELAY if can_hedge else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                # Hech bir nomzod hali bayt bermadi - keyingisini ham boshlaymiz
+                if not any(started.is_set() for _, started in running.values()) and launch():
+                    logger.info(f"Hedged yuklash: {len(running)} ta nomzod parallel yuklanmoqda")
+                continue
+
+            for task in done:
+                entry, _ = running.pop(task)
+                if task.cancelled():
+                    continue
+                if task.exception() is None and task.result():
+                    return entry, task.result()
+                if task.exception() is not None:
+                    logger.warning(f"Failed download {entry['id']}: {task.exception()}")
+                # Muvaffaqiyatsiz nomzod o'rniga keyingisi
+                launch()
+        return None
+    finally:
+        # Yutqazgan nomzodlarni to'xtatish va ulgurgan fayllarni o'chirish
+        for task in running:
+            task.cancel()
+        results = await asyncio.gather(*running, return_exceptions=True)
+        cleanup_files(*[r for r in results if isinstance(r, str)])
+
+
 def cleanup_files(*file_paths: str) -> None:
     """
     Vaqtinchalik fayllarni o'chirish
@@ -386,106 +724,80 @@ async def download_batch_youtube_audio(query: str, limit: int = 10, output_dir:
     Returns:
         list: [(path, title, artist), ...]
     """
+    return [r async for r in iter_batch_youtube_audio(query, limit=limit, output_dir=output_dir)]
+
+
+async def iter_batch_youtube_audio(query: str, limit: int = 10, output_dir: str = "downloads"):
+    """
+    download_batch_youtube_audio ning oqimli varianti: har bir qo'shiq yuklanib
+    bo'lishi bilan (tugash tartibida) qaytariladi, shuning uchun birinchi qo'shiqni
+    yuborish eng sekin yuklashni kutmaydi.
+    
+    Misol:
+        async for path, title, artist in iter_batch_youtube_audio("Sherali Jo'rayev"):
+            ...
+    
+    Args:
+        query: Qidiruv matni
+        limit: Max qancha qo'shiq yuklab olish
+        output_dir: Fayllar saqlanadigan joy
+        
+    Yields:
+        (path, title, artist)
+    """
+    started = time.perf_counter()
     try:
         os.makedirs(output_dir, exist_ok=True)
         q = query.strip()
         
-        # Qidiruv variantini tuzamiz
-        search_query = f"ytsearch{limit * 2}:{q}" # Ko'proq natija olamizki, filtrdan so'ng yetarli bo'lsin
-        
-        ydl_opts = {
-            'quiet': True, 
-            'no_warnings': True, 
-            'nocheckcertificate': True,
-            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
-            'extract_flat': True,
-        }
-        
-        def sync_extract():
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                return ydl.extract_info(search_query, download=False)
-        
-        info = await asyncio.to_thread(sync_extract)
-        if not info or 'entries' not in info:
-            return []
+        # Ko'proq natija olamizki, filtrdan so'ng yetarli bo'lsin
+        entries = await search_youtube(q, limit * 2)
+        if not entries:
+            return
 
-        # Unique va sifatli natijalarni tanlash
-        entries = [e for e in info['entries'] if e]
-        
-        def rate_entry(e):
-            score = 0
-            title = e.get('title', '').lower()
-            duration = e.get('duration', 0)
-            # Qo'shiq uzunligi 2-7 daqiqa bo'lsa yaxshi
-            if 120 <= duration <= 420: score += 100
-            if any(k in title for k in ['official', 'audio', 'original']): score += 50
-            if any(k in title for k in ['mix', 'remix', 'live', 'short', 'reel']): score -= 150
-            return score
-
-        sorted_entries = sorted(entries, key=rate_entry, reverse=True)
-        
-        # Faqat limit miqdoridagisini olamiz
-        selected_entries = sorted_entries[:limit]
-        
-        results = []
-        
-        # Parallel yuklab olish (Semaphore bilan limitlangan)
-        semaphore = asyncio.Semaphore(5) # Bir vaqtda 5 ta yuklab olish
-        
-        async def download_one(entry):
-            async with semaphore:
-                video_id = entry['id']
-                video_url = f"https://www.youtube.com/watch?v={video_id}"
-                
-                final_opts = {
-                    'format': 'bestaudio/best',
-                    'outtmpl': os.path.join(output_dir, f'{video_id}_batch.%(ext)s'),
-                    'postprocessors': [{
-                        'key': 'FFmpegExtractAudio',
-                        'preferredcodec': 'mp3',
-                        'preferredquality': '192',
-                    }],
-                    'quiet': True,
-                    'no_warnings': True,
-                    'nocheckcertificate': True,
-                }
-                
-                try:
-                    def sync_download():
-                        with yt_dlp.YoutubeDL(final_opts) as ydl:
-                            ydl.download([video_url])
-                    
-                    await asyncio.to_thread(sync_download)
-                    
-                    path = os.path.join(output_dir, f"{video_id}_batch.mp3")
-                    if os.path.exists(path) and os.path.getsize(path) > 1000:
-                        raw_title = entry.get('title', 'Unknown')
-                        uploader = entry.get('uploader', 'Unknown')
-                        
-                        # Metadata tozalash
-                        artist = uploader.replace(' - Topic', '').replace('Official', '').strip()
-                        title = raw_title
-                        
-                        if " - " in raw_title:
-                            p = raw_title.split(" - ", 1)
-                            artist, title = p[0].strip(), p[1].strip()
-                        
-                        for junk in [r'\(official.*?\)', r'\[official.*?\]', r'audio', r'video', r'clip', r'klip', r'full', r'original']:
-                            title = re.sub(junk, '', title, flags=re.IGNORECASE).strip()
-                            artist = re.sub(junk, '', artist, flags=re.IGNORECASE).strip()
-                            
-                        return (path, title, artist)
-                except Exception as e:
-                    logger.error(f"Batch download error for {video_id}: {e}")
-                return None
-
-        # Tasklarni yaratish
-        tasks = [download_one(e) for e in selected_entries]
-        downloaded = await asyncio.gather(*tasks)
-        
-        # None natijalarni olib tashlaymiz
-        return [r for r in downloaded if r]
-        
+        # Sifatli natijalarni tanlash: faqat limit miqdoridagisini olamiz
+        selected_entries = [entry for _, entry in rank(entries, q, 'batch')[:limit]]
     except Exception as e:
-        logger.error(f"Batch download global error: {e}")
-        return []
+        logger.error(f"Batch search global error: {e}")
+        return
+    
+    # Parallel yuklab olish (global scheduler DOWNLOAD limiti va foydalanuvchi limiti bilan)
+    tasks = [asyncio.create_task(_download_batch_entry(e, output_dir)) for e in selected_entries]
+    yielded = set()
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            if result:
+                yielded.add(result[0])
+                yield result
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, source='youtube_batch', stage='total')
+        # Iste'molchi to'xtasa (yoki xatolik bo'lsa) qolgan yuklashlarni bekor qilamiz,
+        # tugashini kutamiz (cancel()dan keyin ham tugab qolishi mumkin) va hech
+        # kimga berilmagan fayllarni o'chiramiz
+        for task in tasks:
+            task.cancel()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        cleanup_files(*[r[0] for r in results if isinstance(r, tuple) and r[0] not in yielded])
+
+
+async def _download_batch_entry(entry: dict, output_dir: str) -> Optional[Tuple[str, str, str]]:
+    """
+    Ijrochi qidiruvidagi bitta qo'shiqni yuklab olish va metadata'sini tozalash
+    """
+    video_id = entry['id']
+    
+    try:
+        path = await fetch_youtube_track(video_id, output_dir, 'batch')
+        if path:
+            raw_title = entry.get('title', 'Unknown')
+            uploader = entry.get('uploader', 'Unknown')
+
+            # Metadata tozalash
+            title, artist = clean_track(raw_title, uploader)
+            REQUESTS.inc(source='youtube_batch', result='success')
+            return (path, title, artist)
+    except Exception as e:
+        logger.error(f"Batch download error for {video_id}: {e}")
+    REQUESTS.inc(source='youtube_batch', result='failure')
+    return None
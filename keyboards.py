@@ -21,16 +21,32 @@ from aiogram.types import (
 # tugma matni xabar sifatida yuboriladi.
 
 
+# Menyu tugmalari matni (run.py'dagi F.text filtrlari ham shularni ishlatadi)
+HELP_BUTTON = "ℹ️ Yordam"
+SONG_MODE_BUTTON = "🎵 Faqat qo'shiq"
+VIDEO_MODE_BUTTON = "📹 Video + qo'shiq"
+
+
 # --- 1.1 Oddiy Reply Keyboard ---
 # Eng sodda ko'rinish - bir qatorli tugmalar
 main_menu_keyboard = ReplyKeyboardMarkup(
     keyboard=[
-        [KeyboardButton(text="ℹ️ Yordam")],
+        [KeyboardButton(text=HELP_BUTTON), KeyboardButton(text=SONG_MODE_BUTTON)],
     ],
     resize_keyboard=True,
     input_field_placeholder="Link yuboring yoki qo'shiq qidiring..."
 )
 
+# "Faqat qo'shiq" rejimidagi asosiy menyu: Instagram/TikTok havolasidan
+# video yuklanmaydi, faqat qo'shiq aniqlanib YouTube'dan yuboriladi
+song_mode_keyboard = ReplyKeyboardMarkup(
+    keyboard=[
+        [KeyboardButton(text=HELP_BUTTON), KeyboardButton(text=VIDEO_MODE_BUTTON)],
+    ],
+    resize_keyboard=True,
+    input_field_placeholder="Instagram/TikTok link yuboring - faqat qo'shiq..."
+)
+
 # --- 1.2 Bir ustunli (vertikal) Reply Keyboard ---
 # Har bir tugma alohida qatorda
 settings_keyboard = ReplyKeyboardMarkup(
@@ -131,6 +147,19 @@ product_keyboard = InlineKeyboardMarkup(
 # kelgan ma'lumotlar asosida tugmalar yaratish
 
 
+def menu_keyboard(song_only: bool) -> ReplyKeyboardMarkup:
+    """
+    Foydalanuvchi rejimiga mos asosiy menyu.
+
+    Args:
+        song_only: "Faqat qo'shiq" rejimi yoqilganmi
+
+    Returns:
+        ReplyKeyboardMarkup obyekti
+    """
+    return song_mode_keyboard if song_only else main_menu_keyboard
+
+
 def create_category_keyboard(categories: list) -> InlineKeyboardMarkup:
     """
     Kategoriyalar ro'yxatidan inline keyboard yaratadi.
@@ -0,0 +1,180 @@
+"""
+Media Module
+Yuklab olingan fayllardan audio ajratish uchun yordamchi funksiyalar
+"""
+
+import os
+import time
+import logging
+from typing import Optional
+
+from executor import run_ffmpeg, run_ffprobe
+from metrics import AUDIO_EXTRACT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Kodek -> konteyner: bu kodeklar qayta kodlashsiz (stream copy) ajratiladi.
+# Telegram answer_audio faqat MP3 va M4A ni audio pleerda ko'rsatadi.
+COPYABLE_AUDIO_CODECS = {
+    'aac': 'm4a',
+    'mp3': 'mp3',
+}
+
+# Tez audio rejimi: manba AAC/M4A bo'lsa remux qilinadi, faqat kerak bo'lganda kodlanadi.
+# O'chirilsa, har doim MP3 192 kbps ga qayta kodlanadi (eski xatti-harakat).
+FAST_AUDIO = True
+
+# Bitta ffmpeg jarayoni uchun thread'lar soni (-threads). TRANSCODE slotlari
+# soni bilan birga CPU yadrolariga moslanadi: slotlar x thread'lar ~ yadrolar.
+TRANSCODE_THREADS = 1
+
+# Kodlash sozlamalari (chiqish kengaytmasi bo'yicha)
+ENCODE_ARGS = {
+    'mp3': ('-c:a', 'libmp3lame', '-ar', '44100', '-ac', '2', '-b:a', '192k'),
+    'm4a': ('-c:a', 'aac', '-ac', '2', '-b:a', '192k'),
+}
+
+# Qayta kodlash tezligi: audio davomiyligining har sekundiga ketadigan CPU vaqti.
+# Haqiqiy kodlashlar o'lchanganda yangilanadi, tejalgan vaqtni taxmin qilish uchun.
+_transcode_rate = 0.05
+
+
+def configure(fast_audio: bool, transcode_threads: Optional[int] = None) -> None:
+    """Tez audio rejimini yoqish/o'chirish va ffmpeg thread'lari sonini o'rnatish"""
+    global FAST_AUDIO, TRANSCODE_THREADS
+    FAST_AUDIO = fast_audio
+    if transcode_threads is not None:
+        TRANSCODE_THREADS = max(1, transcode_threads)
+
+
+def audio_format() -> str:
+    """YouTube audio uchun yt-dlp format selektori"""
+    if FAST_AUDIO:
+        # m4a (AAC) oqimi Telegram'ga to'g'ridan-to'g'ri mos keladi
+        return 'bestaudio[ext=m4a]/bestaudio/best'
+    return 'bestaudio/best'
+
+
+def audio_ext() -> str:
+    """transcode_audio natijasining kengaytmasi (media kesh profili ham shu)"""
+    return 'm4a' if FAST_AUDIO else 'mp3'
+
+
+def _record_timing(label: str, elapsed: float, duration: Optional[float], copied: bool) -> None:
+    """
+    Audio ajratish vaqtini log qilish va kodlash tezligi taxminini yangilash
+    """
+    global _transcode_rate
+    AUDIO_EXTRACT_SECONDS.observe(elapsed, mode='copy' if copied else 'encode')
+    if copied:
+        saved = (duration or 0) * _transcode_rate - elapsed
+        logger.info(f"{label}: audio remux {elapsed:.2f}s (qayta kodlash o'tkazib yuborildi, ~{max(saved, 0):.2f}s tejaldi)")
+    else:
+        if duration:
+            _transcode_rate = 0.8 * _transcode_rate + 0.2 * (elapsed / duration)
+        logger.info(f"{label}: audio qayta kodlandi {elapsed:.2f}s")
+
+
+async def probe_audio_codec(path: str) -> Optional[str]:
+    """
+    Fayldagi birinchi audio oqimning kodek nomini aniqlash
+
+    Args:
+        path: Media fayl yo'li
+
+    Returns:
+        Kodek nomi (masalan: 'aac', 'opus') yoki None
+    """
+    try:
+        out = await run_ffprobe(
+            '-select_streams', 'a:0',
+            '-show_entries', 'stream=codec_name',
+            '-of', 'default=noprint_wrappers=1:nokey=1',
+            path
+        )
+    except Exception as e:
+        logger.warning(f"ffprobe xatolik {path}: {e}")
+        return None
+    codec = out.strip().splitlines()
+    return codec[0] if codec else None
+
+
+async def probe_duration(path: str) -> Optional[float]:
+    """
+    Media fayl davomiyligini sekundlarda aniqlash
+    """
+    try:
+        out = await run_ffprobe('-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', path)
+        return float(out.strip())
+    except Exception:
+        return None
+
+
+async def _convert(src: str, output_base: str, copy_ext: Optional[str], encode_ext: str) -> Optional[str]:
+    """
+    Audio oqimni alohida faylga yozish: copy_ext berilsa avval stream copy
+    sinaladi, bo'lmasa (yoki muvaffaqiyatsiz bo'lsa) encode_ext ga kodlanadi.
+    """
+    label = os.path.basename(output_base)
+
+    if copy_ext:
+        audio_path = f"{output_base}.{copy_ext}"
+        started = time.monotonic()
+        try:
+            await run_ffmpeg('-i', src, '-vn', '-map', '0:a:0', '-c:a', 'copy', audio_path, '-y')
+            if os.path.exists(audio_path) and os.path.getsize(audio_path) > 0:
+                _record_timing(label, time.monotonic() - started, await probe_duration(src), True)
+                return audio_path
+        except Exception as e:
+            logger.warning(f"Stream copy muvaffaqiyatsiz ({src}), qayta kodlanadi: {e}")
+
+    audio_path = f"{output_base}.{encode_ext}"
+    started = time.monotonic()
+    try:
+        await run_ffmpeg(
+            '-i', src, '-vn', '-map', '0:a:0', *ENCODE_ARGS[encode_ext],
+            '-threads', str(TRANSCODE_THREADS), audio_path, '-y'
+        )
+    except Exception as e:
+        logger.error(f"Audio ajratishda xatolik {src}: {e}")
+        return None
+    if not os.path.exists(audio_path):
+        return None
+    _record_timing(label, time.monotonic() - started, await probe_duration(audio_path), False)
+    return audio_path
+
+
+async def extract_audio(video_path: str, output_base: str) -> Optional[str]:
+    """
+    Videodan audio oqimni ajratish.
+
+    Tez audio rejimida kodek Telegram qo'llab-quvvatlaydigan konteynerga mos kelsa
+    (AAC -> m4a), oqim qayta kodlanmasdan nusxalanadi (-c:a copy). Aks holda MP3 ga kodlanadi.
+
+    Args:
+        video_path: Video fayl yo'li
+        output_base: Chiqish fayl yo'li (kengaytmasiz)
+
+    Returns:
+        Audio fayl yo'li yoki None
+    """
+    codec = await probe_audio_codec(video_path) if FAST_AUDIO else None
+    return await _convert(video_path, output_base, COPYABLE_AUDIO_CODECS.get(codec), 'mp3')
+
+
+async def transcode_audio(raw_path: str, output_base: str) -> Optional[str]:
+    """
+    yt-dlp yuklagan xom audioni Telegram formatiga keltirish (audio_ext()).
+
+    Tez audio rejimida AAC manba remux qilinadi, boshqa kodeklar (masalan,
+    Opus) AAC ga kodlanadi; aks holda har doim MP3 192 kbps.
+
+    Args:
+        raw_path: Xom audio fayl (m4a, webm, ...)
+        output_base: Chiqish fayl yo'li (kengaytmasiz)
+
+    Returns:
+        Audio fayl yo'li yoki None
+    """
+    codec = await probe_audio_codec(raw_path) if FAST_AUDIO else None
+    return await _convert(raw_path, output_base, 'm4a' if codec == 'aac' else None, audio_ext())
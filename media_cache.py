@@ -0,0 +1,247 @@
+"""
+Media Cache Module
+Yuklab olingan media fayllarning diskdagi doimiy keshi
+
+file_id keshi har doim ham yordam bermaydi (boshqa bot tokeni, lokal Bot API
+server), fayllar esa yuborilgandan keyin o'chiriladi. Shu sababli bir xil
+YouTube audio qayta-qayta yuklanardi. Bu kesh fayllarni manba ID + format
+profili (masalan, `yt:dQw4w9WgXcQ` + `m4a`) bo'yicha saqlaydi.
+
+Tuzilma (WORK_DIR dan tashqarida - ishga tushishda tozalanmaydi):
+    media_cache/
+        ab/abcdef...0123.m4a   - sha256(kalit|profil) nomli fayl
+        .tmp/                  - yozilayotgan fayllar
+
+- Yozish atomik: fayl avval .tmp/ ga yoziladi (hardlink yoki nusxa) va
+  os.replace bilan joyiga qo'yiladi, shuning uchun o'quvchilar hech qachon
+  chala faylni ko'rmaydi.
+- Hajm chegarasi LRU bo'yicha: ishlatilgan fayl mtime'i yangilanadi, limitdan
+  oshganda eng eski fayllar o'chiriladi. Hardlink qilingan nusxalar (ish
+  papkalarida) o'chirishdan ta'sirlanmaydi.
+- Ish papkasiga fayl hardlink orqali beriladi (nusxalanmaydi); hardlink
+  bo'lmasa reflink (FICLONE: btrfs, xfs), oxirgi chora - oddiy nusxa.
+
+Misol:
+    cached = media_cache.get("yt:dQw4w9WgXcQ", "m4a")
+    if cached is None:
+        path = download(...)
+        media_cache.put("yt:dQw4w9WgXcQ", "m4a", path)
+"""
+
+import os
+import sys
+import shutil
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Linux ioctl: faylni copy-on-write klonlash (reflink)
+_FICLONE = 0x40049409
+
+
+def link_file(src: str, dest: str) -> None:
+    """
+    Faylni nusxalamasdan dest ga joylash: hardlink -> reflink -> nusxa
+
+    Raises:
+        OSError: dest band bo'lsa yoki nusxalab ham bo'lmasa
+    """
+    try:
+        os.link(src, dest)
+        return
+    except FileExistsError:
+        raise
+    except OSError:
+        pass
+    if sys.platform.startswith('linux'):
+        import fcntl
+        try:
+            with open(src, 'rb') as fsrc, open(dest, 'xb') as fdst:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+            return
+        except FileExistsError:
+            raise
+        except OSError:
+            try:
+                os.remove(dest)
+            except OSError:
+                pass
+    shutil.copy2(src, dest)
+
+
+class MediaCache:
+    """
+    Kalit bo'yicha adreslanadigan, hajmi cheklangan fayl keshi (LRU).
+
+    Indeks xotirada saqlanadi va birinchi ishlatishda papkani skanerlash
+    orqali tiklanadi (fayllarning mtime'i - oxirgi ishlatilgan vaqt).
+    """
+
+    def __init__(self, root: str = "media_cache", max_bytes: int = 1024 * 1024 * 1024):
+        """
+        Args:
+            root: Kesh papkasi
+            max_bytes: Umumiy hajm chegarasi (0 - kesh o'chirilgan)
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()   # fayl yo'li -> hajm
+        self._size = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def configure(self, root: Optional[str] = None, max_bytes: Optional[int] = None) -> None:
+        """Sozlamalarni o'zgartirish (birinchi ishlatishdan oldin)"""
+        if root is not None:
+            self.root = root
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        self._entries.clear()
+        self._size = 0
+        self._loaded = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def path_for(self, key: str, profile: str) -> str:
+        """Kalit va profil uchun fayl yo'li (profil fayl kengaytmasi sifatida ham ishlatiladi)"""
+        digest = hashlib.sha256(f"{key}|{profile}".encode()).hexdigest()
+        return os.path.join(self.root, digest[:2], f"{digest}.{profile}")
+
+    def get(self, key: str, profile: str) -> Optional[str]:
+        """
+        Keshdagi fayl yo'li
+
+        Qaytarilgan fayl darhol hardlink qilinishi kerak: keyingi put()
+        uni LRU bo'yicha o'chirib yuborishi mumkin.
+
+        Returns:
+            Fayl yo'li yoki None
+        """
+        if not self.enabled:
+            return None
+        path = self.path_for(key, profile)
+        with self._lock:
+            self._load()
+            if path not in self._entries:
+                self.misses += 1
+                return None
+            if not os.path.exists(path):
+                # Tashqaridan o'chirilgan
+                self._size -= self._entries.pop(path)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(path)
+            self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def put(self, key: str, profile: str, src: str) -> Optional[str]:
+        """
+        Faylni keshga qo'shish (src o'zgarmaydi)
+
+        Args:
+            key: Manba kaliti (masalan, yt:<video_id>)
+            profile: Format profili (masalan, m4a yoki mp3)
+            src: Yuklab olingan fayl
+
+        Returns:
+            Keshdagi fayl yo'li yoki None (kesh o'chirilgan, fayl limitdan katta yoki xatolik)
+        """
+        if not self.enabled:
+            return None
+        try:
+            size = os.path.getsize(src)
+        except OSError:
+            return None
+        if size > self.max_bytes:
+            return None
+
+        path = self.path_for(key, profile)
+        tmp_dir = os.path.join(self.root, ".tmp")
+        tmp = os.path.join(tmp_dir, f"{os.path.basename(path)}.{os.urandom(4).hex()}")
+        try:
+            os.makedirs(tmp_dir, exist_ok=True)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            link_file(src, tmp)
+            os.utime(tmp)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.error(f"Media keshga yozishda xatolik {key}: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return None
+
+        with self._lock:
+            self._load()
+            self._size -= self._entries.pop(path, 0)
+            self._entries[path] = size
+            self._size += size
+            self._evict()
+        return path
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'files': len(self._entries),
+            'size_mb': round(self._size / 1024 / 1024, 1),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evicted': self.evicted,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def _load(self) -> None:
+        """Papkadagi fayllardan indeksni tiklash (lock ichida, bir marta)"""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.isdir(self.root):
+            return
+        found = []
+        for sub in os.scandir(self.root):
+            if not sub.is_dir(follow_symlinks=False):
+                continue
+            if sub.name == ".tmp":
+                # To'satdan to'xtagan yozishlar qoldig'i
+                shutil.rmtree(sub.path, ignore_errors=True)
+                continue
+            for entry in os.scandir(sub.path):
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                found.append((st.st_mtime, entry.path, st.st_size))
+        for _, path, size in sorted(found):
+            self._entries[path] = size
+            self._size += size
+        self._evict()
+        logger.info(f"Media kesh: {len(self._entries)} ta fayl, {self._size / 1024 / 1024:.1f} MB")
+
+    def _evict(self) -> None:
+        """Limitdan oshsa eng uzoq ishlatilmagan fayllarni o'chirish (lock ichida)"""
+        while self._size > self.max_bytes and self._entries:
+            path, size = self._entries.popitem(last=False)
+            self._size -= size
+            self.evicted += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# Jarayon uchun yagona media kesh
+media_cache = MediaCache()
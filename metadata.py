@@ -0,0 +1,131 @@
+"""
+Metadata Module
+Qo'shiq nomini aniqlash va sarlavhalarni tozalash uchun yordamchi funksiyalar
+
+Barcha regex'lar import vaqtida bir marta kompilyatsiya qilinadi. Keraksiz
+so'zlar (official, audio, klip, yil...) bitta birlashgan alternation orqali
+bir o'tishda olib tashlanadi, tozalangan (sarlavha, kanal) juftliklari esa
+keshlanadi: ijrochi qidiruvida bir xil natijalar qayta-qayta keladi.
+"""
+
+import re
+import logging
+from functools import lru_cache
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Instagram tavsifidagi qo'shiq nomi (birinchi mos kelgan shablon olinadi)
+_DESCRIPTION_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'(?:Music|Song|Musiqa|Trek|Nomi):\s*([^\n|]+)',
+    r'🎵\s*([^\n|]+)',
+    r'🎧\s*([^\n|]+)',
+    r'🎤\s*([^\n|]+)',
+))
+
+# Qidirish foydasiz bo'lgan umumiy nomlar (qisqa matnda substring regex'dan tezroq)
+_GENERIC_AUDIO = ('original audio', 'original music', 'originalniy zvuk', 'asl audio')
+
+# Instagram sarlavhasidagi keraksiz qismlar
+_INSTAGRAM_SUFFIX = re.compile(r'Instagram (?:video|reel|reels|post|TV).*', re.IGNORECASE)
+_TAGS_AND_LINKS = re.compile(r'#\w+|@\w+|https?://\S+|www\.\S+')
+_USERNAME_SEPARATORS = re.compile(r'[\._]')
+
+# YouTube sarlavhasidagi keraksiz so'zlar (bitta o'tishda olib tashlanadi)
+_JUNK_WORDS = r'\(official.*?\)|\[official.*?\]|audio|video|clip|klip|full|original'
+_JUNK = re.compile(_JUNK_WORDS, re.IGNORECASE)
+_JUNK_WITH_YEAR = re.compile(_JUNK_WORDS + r'|\d{4}', re.IGNORECASE)
+
+# Kanal nomidagi qo'shimchalar
+_CHANNEL_SUFFIXES = (' - Topic', 'Official', 'VEVO')
+
+
+def song_query_from_info(info: dict) -> Optional[str]:
+    """
+    Instagram post/reel ma'lumotlaridan YouTube'da qidirish uchun qo'shiq nomini aniqlash
+
+    Tartib: music_info/track/artist -> alt_title -> tavsifdagi "Music: ..." kabi
+    yozuvlar -> sarlavha -> uploader nomi.
+
+    Args:
+        info: yt-dlp extract_info natijasi
+
+    Returns:
+        Qidiruv matni yoki None
+    """
+    track = info.get('track')
+    artist = info.get('artist')
+    uploader = info.get('uploader')
+    alt_title = info.get('alt_title')
+    description = info.get('description', '')
+    title = info.get('title', '')
+    song_query = None
+
+    # Instagram maxsus metadata maydonlari
+    music_info = info.get('music_info', {})
+    if music_info:
+        track = music_info.get('title', track)
+        artist = music_info.get('artist', artist)
+
+    # To'g'ridan-to'g'ri metadata bo'lsa (Eng ishonchli)
+    if track and artist:
+        song_query = f"{artist} - {track}"
+    elif track:
+        song_query = track
+    elif alt_title:
+        song_query = f"{artist} - {alt_title}" if artist else alt_title
+
+    # Tavsifdan regex orqali qidirish
+    if not song_query and description:
+        for pattern in _DESCRIPTION_PATTERNS:
+            match = pattern.search(description)
+            if match:
+                song_query = match.group(1).strip()
+                break
+
+    # "Original audio" bo'lsa, uni qidirish foydasiz - uploader orqali topishga urinamiz
+    if song_query and any(name in song_query.lower() for name in _GENERIC_AUDIO):
+        song_query = f"{uploader} yangi klip" if uploader else None
+
+    # Sarlavhani tahlil qilish (Agar hali ham yo'q bo'lsa)
+    if not song_query and title:
+        clean_title = _INSTAGRAM_SUFFIX.sub('', title).strip()
+        clean_title = _TAGS_AND_LINKS.sub('', clean_title).strip()
+        if clean_title and len(clean_title) > 5:
+            song_query = clean_title
+
+    # Agar juda qisqa bo'lsa yoki topilmasa, uploader fallback
+    if not song_query and uploader:
+        song_query = f"{_USERNAME_SEPARATORS.sub(' ', uploader).strip()} qo'shiq"
+
+    logger.info(f"ANALIZ: track={track}, artist={artist}, title={title}, query={song_query}")
+    return song_query
+
+
+@lru_cache(maxsize=4096)
+def clean_track(raw_title: str, uploader: str, strip_year: bool = False) -> Tuple[str, str]:
+    """
+    YouTube sarlavhasi va kanal nomidan (title, artist) ajratish
+
+    "Ijrochi - Qo'shiq (Official Audio)" -> ("Qo'shiq", "Ijrochi"); sarlavhada
+    " - " bo'lmasa, ijrochi kanal nomidan olinadi.
+
+    Args:
+        raw_title: YouTube sarlavhasi
+        uploader: Kanal nomi
+        strip_year: Yillarni (2024 kabi) ham olib tashlash
+
+    Returns:
+        (title, artist)
+    """
+    artist = uploader
+    for suffix in _CHANNEL_SUFFIXES:
+        artist = artist.replace(suffix, '')
+    artist = artist.strip()
+    title = raw_title
+
+    if " - " in raw_title:
+        artist, title = (part.strip() for part in raw_title.split(" - ", 1))
+
+    junk = _JUNK_WITH_YEAR if strip_year else _JUNK
+    return junk.sub('', title).strip(), junk.sub('', artist).strip()
@@ -0,0 +1,269 @@
+"""
+Metrics Module
+Yuklash pipeline'i uchun Prometheus formatidagi metrikalar
+
+Tashqi kutubxona yoki servis talab qilinmaydi: metrikalar xotirada yig'iladi va
+lokal HTTP `/metrics` endpoint orqali Prometheus text formatida beriladi.
+
+Misol:
+    with STAGE_SECONDS.time(source='youtube', stage='download'):
+        await run_blocking(sync_download)
+    REQUESTS.inc(source='youtube', result='success')
+
+    curl http://127.0.0.1:9100/metrics
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Sekundlarda: qidiruv ~0.5-3s, yuklash 1-60s, Telegram'ga yuborish 0.1-30s
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Barcha metrikalar uchun umumiy qism: nom, tavsif va label'lar"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: label'lar {self.labelnames} bo'lishi kerak, berilgan: {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Faqat o'sadigan hisoblagich"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """
+    Joriy qiymat. Qiymat `set` orqali yoki har bir o'qishda chaqiriladigan
+    funksiya (`set_function`) orqali beriladi, masalan navbat uzunligi uchun.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, fn: Callable[[], float], **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = fn
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, fn in functions.items():
+            try:
+                values[key] = fn()
+            except Exception as e:
+                logger.error(f"{self.name}: qiymatni hisoblashda xatolik: {e}")
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    """Qiymatlar taqsimoti (bucket'lar bo'yicha), masalan bosqich davomiyligi"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # label'lar -> [bucket hisoblagichlari, yig'indi, soni]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Blok bajarilish vaqtini o'lchash (xatolik bo'lsa ham yoziladi)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def totals(self) -> Dict[Tuple[str, ...], Tuple[int, float]]:
+        """Label'lar bo'yicha (soni, yig'indi) - o'rtacha qiymatni hisoblash uchun"""
+        with self._lock:
+            return {k: (s[2], s[1]) for k, s in self._values.items()}
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, ([*s[0]], s[1], s[2])) for k, s in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+# Ro'yxatdan o'tgan barcha metrikalar
+REGISTRY: List[_Metric] = []
+
+
+def render() -> str:
+    """Barcha metrikalarni Prometheus text formatida qaytarish"""
+    return "\n".join(m.render() for m in REGISTRY) + "\n"
+
+
+
+# PIPELINE METRIKALARI
+
+
+# Bosqichlar: search, download, transcode, upload (navbatda kutishsiz)
+# va total (so'rovning boshidan oxirigacha, navbat bilan)
+STAGE_SECONDS = Histogram(
+    "bot_stage_duration_seconds",
+    "Pipeline bosqichlarining davomiyligi",
+    ("source", "stage")
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "bot_queue_wait_seconds",
+    "Scheduler navbatida slot kutish vaqti",
+    ("kind",)
+)
+AUDIO_EXTRACT_SECONDS = Histogram(
+    "bot_audio_extract_seconds",
+    "Audio ajratish vaqti (mode: copy - remux, encode - qayta kodlash)",
+    ("mode",)
+)
+YDL_FIRST_BYTE_SECONDS = Histogram(
+    "bot_ydl_first_byte_seconds",
+    "YoutubeDL checkout'idan birinchi yuklangan baytgacha vaqt (warm: qayta ishlatilgan obyekt)",
+    ("profile", "warm")
+)
+REQUESTS = Counter(
+    "bot_requests_total",
+    "Manba bo'yicha yakunlangan so'rovlar (result: success/failure)",
+    ("source", "result")
+)
+BYTES = Counter(
+    "bot_bytes_total",
+    "Yuklab olingan (download) va Telegram'ga yuborilgan (upload) baytlar",
+    ("direction",)
+)
+QUEUE_DEPTH = Gauge(
+    "bot_queue_depth",
+    "Scheduler navbatida kutayotgan ishlar soni",
+    ("kind",)
+)
+ACTIVE_JOBS = Gauge(
+    "bot_active_jobs",
+    "Hozir bajarilayotgan ishlar soni",
+    ("kind",)
+)
+CACHE_HIT_RATIO = Gauge(
+    "bot_cache_hit_ratio",
+    "Kesh hit ulushi (0..1)",
+    ("cache",)
+)
+
+
+
+# HTTP ENDPOINT
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    """GET /metrics"""
+    return web.Response(text=render(), content_type="text/plain", charset="utf-8",
+                        headers={"Cache-Control": "no-cache"})
+
+
+async def start_metrics_server(host: str = "127.0.0.1", port: int = 9100) -> web.AppRunner:
+    """
+    /metrics endpoint uchun alohida lokal HTTP serverni ishga tushirish
+
+    Returns:
+        AppRunner (to'xtatish uchun `await runner.cleanup()`)
+    """
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Metrikalar: http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,132 @@
+"""
+Middlewares Module
+Dispatcher uchun umumiy middleware'lar
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from metrics import REQUESTS
+from uploader import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    """
+    Bir vaqtda qayta ishlanadigan update'lar sonini cheklash.
+
+    Polling ham, webhook ham har bir update uchun alohida task yaratadi;
+    bu middleware ulardan faqat `limit` tasigacha bir vaqtda ishlashiga ruxsat beradi,
+    qolganlari navbatda kutadi.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        async with self._semaphore:
+            return await handler(event, data)
+
+
+class UserRateLimitMiddleware(BaseMiddleware):
+    """
+    Foydalanuvchi bo'yicha xabarlar tezligi va bir vaqtdagi so'rovlarini cheklash.
+
+    ConcurrencyLimitMiddleware butun bot uchun umumiy: bitta foydalanuvchi
+    ketma-ket o'nlab xabar yuborsa, ular barcha slotlarni egallab, boshqalarni
+    kutishga majbur qiladi. Bu middleware undan oldin ishlaydi:
+    - har bir foydalanuvchiga token bucket (sekundiga `rate`, ketma-ket `burst` ta);
+    - bir vaqtda `max_active` tadan ko'p yuklash boshlovchi xabari qayta
+      ishlanmaydi (/help, menyu tugmalari kabi yengil xabarlar bu chegaraga kirmaydi).
+    Limitdan oshgan xabarlar tashlab yuboriladi; foydalanuvchiga bir marta
+    qisqa ogohlantirish yuboriladi (keyingi qabul qilingan xabargacha).
+    """
+
+    def __init__(self, rate: float, burst: float, max_active: int = 0, max_users: int = 10000,
+                 starts_job: Optional[Callable[[TelegramObject], bool]] = None):
+        """
+        Args:
+            rate: Bitta foydalanuvchidan sekundiga qabul qilinadigan xabarlar (0 - cheklanmagan)
+            burst: Kutmasdan ketma-ket qabul qilinadigan xabarlar
+            max_active: Bir vaqtda qayta ishlanadigan yuklash so'rovlari (0 - cheklanmagan)
+            max_users: Xotirada saqlanadigan foydalanuvchilar (LRU)
+            starts_job: Update yuklash boshlaydimi (None - barcha update'lar max_active'ga kiradi)
+        """
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_active = max_active
+        self.starts_job = starts_job
+        self.max_users = max_users
+        self.dropped = 0
+        self._buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self._active: Dict[int, int] = {}
+        self._warned: set = set()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get('event_from_user')
+        if user is None:
+            return await handler(event, data)
+
+        counted = bool(self.max_active) and (self.starts_job is None or self.starts_job(event))
+        if not self._admit(user.id, counted):
+            self.dropped += 1
+            REQUESTS.inc(source='rate_limit', result='dropped')
+            await self._warn(user.id, data)
+            return None
+
+        self._warned.discard(user.id)
+        if not counted:
+            return await handler(event, data)
+        self._active[user.id] = self._active.get(user.id, 0) + 1
+        try:
+            return await handler(event, data)
+        finally:
+            self._active[user.id] -= 1
+            if not self._active[user.id]:
+                del self._active[user.id]
+
+    def _admit(self, user_id: int, counted: bool) -> bool:
+        if counted and self._active.get(user_id, 0) >= self.max_active:
+            return False
+        if not self.rate:
+            return True
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = TokenBucket(self.rate, self.burst)
+            if len(self._buckets) > self.max_users:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(user_id)
+        return bucket.try_acquire()
+
+    async def _warn(self, user_id: int, data: Dict[str, Any]) -> None:
+        chat = data.get('event_chat')
+        if chat is None or user_id in self._warned:
+            return
+        self._warned.add(user_id)
+        if len(self._warned) > self.max_users:
+            self._warned.clear()
+        try:
+            await data['bot'].send_message(
+                chat.id,
+                "⏳ Juda ko'p so'rov yubordingiz. Oldingi so'rovlaringiz tugashini kuting va birozdan so'ng qayta urinib ko'ring."
+            )
+        except Exception as e:
+            logger.debug(f"Limit ogohlantirishini yuborib bo'lmadi: {e}")
@@ -0,0 +1,194 @@
+"""
+Progress Module
+Yuklash jarayonini status xabarida ko'rsatish (yt-dlp progress_hooks orqali)
+
+Status xabari "⏳ ... yuklab olinmoqda" holatida uzoq turib qolsa, foydalanuvchi
+havolani qayta yuboradi va yuklama ikki barobar oshadi. yt-dlp progress
+hook'lari yuklash thread'idan sekundiga o'nlab marta chaqiriladi, Telegram esa
+xabarni tez-tez tahrirlashni cheklaydi. Shuning uchun:
+
+- hook faqat oxirgi holatni event loop'ga uzatadi (call_soon_threadsafe);
+- bitta chatda xabar `interval` sekundda ko'pi bilan bir marta tahrirlanadi,
+  oraliqdagi yangilanishlar bitta tahrirga birlashtiriladi;
+- matn o'zgarmagan bo'lsa xabar tahrirlanmaydi.
+
+Reporter joriy so'rovga (scheduler.Job.on_progress) ulanadi, shuning uchun
+downloader funksiyalari uni parametr sifatida olmaydi (navbat xabari kabi).
+
+Misol:
+    async with ProgressReporter(status_msg.edit_text, chat_id, "YouTube'dan yuklab olinmoqda"):
+        path = await download_youtube_link(video_id, output_dir)
+
+    # Downloader tomonida (coroutine ichida, thread'ga o'tishdan oldin):
+    hook = progress_hook()
+    opts = {'progress_hooks': [hook] if hook else []}
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+from scheduler import current_job
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Chat -> oxirgi progress tahriri vaqti (loop.time); eng ko'pi _MAX_CHATS ta
+_last_edit: "OrderedDict[int, float]" = OrderedDict()
+_MAX_CHATS = 10000
+
+
+def snapshot(d: dict) -> Optional[dict]:
+    """
+    yt-dlp progress lug'atidan kerakli maydonlar (JSON'ga mos, broker orqali ham uzatiladi)
+
+    Returns:
+        {'id', 'downloaded', 'total', 'speed'} yoki None (yuklash holati emas)
+    """
+    if d.get('status') != 'downloading':
+        return None
+    return {
+        'id': (d.get('info_dict') or {}).get('id') or '',
+        'downloaded': d.get('downloaded_bytes') or 0,
+        'total': d.get('total_bytes') or d.get('total_bytes_estimate') or 0,
+        'speed': d.get('speed') or 0,
+    }
+
+
+def progress_hook() -> Optional[Callable[[dict], None]]:
+    """
+    Joriy so'rov progress callback'i uchun yt-dlp hook'i
+
+    Coroutine ichida (run_blocking'dan oldin) chaqirilishi kerak: executor
+    thread'ida job_context ko'rinmaydi.
+
+    Returns:
+        Hook yoki None (so'rov progress kuzatmayapti)
+    """
+    job = current_job()
+    callback = job.on_progress if job is not None else None
+    if callback is None:
+        return None
+
+    def hook(d: dict) -> None:
+        snap = snapshot(d)
+        if snap is not None:
+            callback(snap)
+    return hook
+
+
+def format_progress(label: str, snap: dict) -> str:
+    """Status xabari matni: ⏳ label: ▰▰▰▱▱▱▱▱▱▱ 34% · 1.2 MB/s"""
+    total = snap.get('total') or 0
+    if total:
+        percent = min(100.0, snap.get('downloaded', 0) * 100 / total)
+        filled = int(percent // 10)
+        text = f"⏳ {label}: {'▰' * filled}{'▱' * (10 - filled)} {percent:.0f}%"
+    else:
+        text = f"⏳ {label}: {snap.get('downloaded', 0) / MB:.1f} MB"
+    if snap.get('speed'):
+        text += f" · {snap['speed'] / MB:.1f} MB/s"
+    return text
+
+
+def _fraction(snap: dict) -> float:
+    return snap['downloaded'] / snap['total'] if snap.get('total') else 0.0
+
+
+class ProgressReporter:
+    """
+    Joriy so'rovning yuklash progressini status xabariga yozuvchi
+    (async context manager). Chiqishda kutilayotgan tahrir bekor qilinadi,
+    ketayotgani esa tugatiladi - handler'ning keyingi matni ustidan yozilmaydi.
+    """
+
+    def __init__(self, edit: Callable[[str], Awaitable], chat_id: int, label: str,
+                 interval: float = 3.0, allow: Optional[Callable[[], bool]] = None):
+        """
+        Args:
+            edit: Status xabarini tahrirlovchi coroutine funksiya (message.edit_text)
+            chat_id: Chat (tahrirlar chat bo'yicha siyraklashtiriladi)
+            label: Matn boshi (masalan, "Instagram'dan yuklab olinmoqda")
+            interval: Bitta chatdagi tahrirlar orasidagi eng kam vaqt (sekund)
+            allow: Tahrirdan oldin chaqiriladi; False bo'lsa tahrir keyinga qoldiriladi
+                (masalan, uploader.try_send_now - flood-limit band bo'lsa)
+        """
+        self.edit = edit
+        self.chat_id = chat_id
+        self.label = label
+        self.interval = interval
+        self.allow = allow
+        self.edits = 0
+        self._latest: Dict[str, dict] = {}
+        self._shown: Optional[str] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._task: Optional[asyncio.Task] = None
+        self._job = None
+        self._previous = None
+        self._closed = False
+
+    async def __aenter__(self) -> "ProgressReporter":
+        self._loop = asyncio.get_running_loop()
+        self._job = current_job()
+        if self._job is not None:
+            self._previous = self._job.on_progress
+            self._job.on_progress = self.update
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._closed = True
+        if self._job is not None:
+            self._job.on_progress = self._previous
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def update(self, snap: dict) -> None:
+        """Yangi holat (istalgan thread'dan chaqirish mumkin)"""
+        if self._closed:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._on_update, snap)
+        except RuntimeError:
+            # Event loop yopilgan (bot to'xtamoqda)
+            pass
+
+    def _on_update(self, snap: dict) -> None:
+        if self._closed:
+            return
+        # Hedged yuklashda bir nechta nomzod bo'lishi mumkin: har biri alohida saqlanadi
+        self._latest[snap.get('id') or ''] = snap
+        if self._timer is None:
+            due = _last_edit.get(self.chat_id, float('-inf')) + self.interval
+            self._timer = self._loop.call_later(max(0.0, due - self._loop.time()), self._flush)
+
+    def _flush(self) -> None:
+        self._timer = None
+        if self._closed or not self._latest:
+            return
+        busy = self._task is not None and not self._task.done()
+        if busy or (self.allow is not None and not self.allow()):
+            self._timer = self._loop.call_later(self.interval, self._flush)
+            return
+        _last_edit[self.chat_id] = self._loop.time()
+        _last_edit.move_to_end(self.chat_id)
+        if len(_last_edit) > _MAX_CHATS:
+            _last_edit.popitem(last=False)
+
+        # Eng oldinda ketayotgan yuklash ko'rsatiladi (foiz orqaga sakramasin)
+        text = format_progress(self.label, max(self._latest.values(), key=_fraction))
+        if text != self._shown:
+            self._shown = text
+            self._task = self._loop.create_task(self._edit(text))
+
+    async def _edit(self, text: str) -> None:
+        try:
+            await self.edit(text)
+            self.edits += 1
+        except Exception as e:
+            logger.debug(f"Progress xabarini yangilab bo'lmadi: {e}")
@@ -0,0 +1,196 @@
+"""
+Ranking Module
+YouTube qidiruv natijalarini (nomzodlarni) reyting bo'yicha tartiblash
+
+Yakka qo'shiq qidiruvi ('song') va ijrochi qidiruvi ('batch') uchun umumiy.
+Kalit so'zlar jadvali bir marta kichik harfli kortejlarga kompilyatsiya qilinadi
+(qisqa sarlavhalarda substring tekshiruvi regex'dan tezroq), so'rov so'zlari har
+bir qidiruv uchun bir marta, har bir nomzod bahosi ham bir marta hisoblanadi.
+
+Og'irliklar jadvalini kod o'zgartirmasdan JSON fayl orqali sozlash mumkin
+(RANKING_WEIGHTS). Faylda faqat o'zgartiriladigan maydonlar yoziladi:
+
+    {
+        "song": {"query_match": 200, "title": [[["official", "audio"], 80]]},
+        "batch": {"duration": [[120, 480, 100]]}
+    }
+
+Qoidalar:
+    duration     - [[min, max, ball], ...]: birinchi mos oraliq. Ikki tomonli oraliq
+                   yopiq (min <= d <= max); bir tomoni null bo'lsa chegara qat'iy:
+                   [null, 60] - d < 60, [600, null] - d > 600 (yt-dlp davomiyligi
+                   kasr bo'lishi mumkin, 59.5 ham "60 dan qisqa")
+    title        - [[[so'zlar], ball], ...]: sarlavhada so'zlardan biri bo'lsa
+    uploader     - title bilan bir xil, kanal nomi uchun
+    query_match  - so'rov so'zlarining sarlavha/kanalda uchragan ulushi x ball
+    query_ignore - so'rov so'zlaridan olib tashlanadigan qismlar
+    channel_boost - {"so'z": ball}: so'z so'rovda ham, kanal nomida ham bo'lsa
+"""
+
+import re
+import json
+import logging
+from operator import itemgetter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEIGHTS = {
+    'song': {
+        'duration': [
+            [150, 360, 150],     # Ideal qo'shiq uzunligi (2.5-6 daqiqa)
+            [120, 600, 80],      # Qabul qilinadigan uzunlik
+            [None, 60, -200],    # Juda qisqa: 60 sekunddan kam (to'liq qo'shiq emas)
+            [600, None, -50],    # Juda uzun: 10 daqiqadan ko'p (mix/albom)
+        ],
+        'title': [
+            [['official', 'original', 'full', 'audio'], 60],
+            [['clip', 'klip', 'music video'], 30],
+            [['mix'], -100],     # remix ham shu yerga tushadi
+            [['live'], -30],
+            [['short', 'reel'], -150],
+        ],
+        'uploader': [
+            [['official', 'vevo', 'topic', 'music', 'handasa'], 100],
+        ],
+        'query_match': 150,
+        'query_ignore': ['official', 'audio'],
+        'channel_boost': {'handasa': 200},
+    },
+    'batch': {
+        'duration': [
+            [120, 420, 100],     # 2-7 daqiqa
+        ],
+        'title': [
+            [['official', 'audio', 'original'], 50],
+            [['mix', 'remix', 'live', 'short', 'reel'], -150],
+        ],
+        'uploader': [],
+        'query_match': 0,
+        'query_ignore': [],
+        'channel_boost': {},
+    },
+}
+
+
+def _keywords(words: Sequence[str]) -> Tuple[str, ...]:
+    """Kalit so'zlar (substring bo'yicha tekshiriladi)"""
+    return tuple(w.lower() for w in words)
+
+
+def _in_range(d: float, lo: Optional[float], hi: Optional[float]) -> bool:
+    """Ikki tomonli oraliq yopiq; bir tomonli chegara qat'iy (d < max yoki d > min)"""
+    if lo is None:
+        return hi is None or d < hi
+    if hi is None:
+        return d > lo
+    return lo <= d <= hi
+
+
+class _Profile:
+    """Og'irliklar jadvalining kompilyatsiya qilingan ko'rinishi"""
+
+    def __init__(self, table: dict):
+        self.duration = tuple((lo, hi, score) for lo, hi, score in table.get('duration', []))
+        self.title = tuple((_keywords(words), score) for words, score in table.get('title', []) if words)
+        self.uploader = tuple((_keywords(words), score) for words, score in table.get('uploader', []) if words)
+        self.query_match = table.get('query_match', 0)
+        ignore = table.get('query_ignore', [])
+        self.query_ignore = re.compile('|'.join(re.escape(w.lower()) for w in ignore)) if ignore else None
+        self.channel_boost = tuple((w.lower(), score) for w, score in table.get('channel_boost', {}).items())
+
+    def duration_scores(self, durations: Sequence[float]) -> List[float]:
+        """Davomiyliklar massivi uchun ballar (birinchi mos oraliq)"""
+        rules = self.duration
+        scores = []
+        for d in durations:
+            for lo, hi, score in rules:
+                if _in_range(d, lo, hi):
+                    scores.append(score)
+                    break
+            else:
+                scores.append(0)
+        return scores
+
+
+class _Query:
+    """So'rovdan bir marta hisoblanadigan qismlar"""
+
+    def __init__(self, query: str, profile: _Profile):
+        q_clean = query.lower()
+        if profile.query_ignore is not None:
+            q_clean = profile.query_ignore.sub('', q_clean)
+        self.clean = q_clean.strip()
+        self.words = tuple(self.clean.split())
+        self.boosts = tuple((w, score) for w, score in profile.channel_boost if w in self.clean)
+
+
+_profiles: Dict[str, _Profile] = {}
+
+
+def configure(path: Optional[str] = None) -> None:
+    """
+    Og'irliklar jadvalini o'rnatish: standart jadval + JSON fayldagi o'zgarishlar
+
+    Args:
+        path: JSON fayl yo'li (None - faqat standart jadval)
+    """
+    tables = {name: dict(table) for name, table in DEFAULT_WEIGHTS.items()}
+    if path:
+        with open(path, encoding='utf-8') as f:
+            overrides = json.load(f)
+        for name, table in overrides.items():
+            tables.setdefault(name, {}).update(table)
+        logger.info(f"Reyting og'irliklari yuklandi: {path}")
+    _profiles.clear()
+    _profiles.update({name: _Profile(table) for name, table in tables.items()})
+
+
+def rank(entries: Sequence[dict], query: str, profile: str = 'song') -> List[Tuple[float, dict]]:
+    """
+    Nomzodlarni baholash va kamayish tartibida saralash (teng ballar asl tartibda)
+
+    Args:
+        entries: Qidiruv natijalari (title, uploader, duration)
+        query: Foydalanuvchi so'rovi
+        profile: 'song' yoki 'batch'
+
+    Returns:
+        [(ball, entry), ...]
+    """
+    if not _profiles:
+        configure()
+    p = _profiles[profile]
+    q = _Query(query, p)
+
+    scores = p.duration_scores([e.get('duration') or 0 for e in entries])
+    title_rules, uploader_rules = p.title, p.uploader
+    words = q.words if p.query_match else ()
+    match_weight = p.query_match / len(words) if words else 0
+
+    for i, e in enumerate(entries):
+        title = (e.get('title') or '').lower()
+        uploader = (e.get('uploader') or '').lower()
+        score = scores[i]
+        for keywords, weight in title_rules:
+            for k in keywords:
+                if k in title:
+                    score += weight
+                    break
+        for keywords, weight in uploader_rules:
+            for k in keywords:
+                if k in uploader:
+                    score += weight
+                    break
+        if words:
+            matched = 0
+            for w in words:
+                if w in title or w in uploader:
+                    matched += 1
+            score += matched * match_weight
+        for word, weight in q.boosts:
+            if word in uploader:
+                score += weight
+        scores[i] = score
+
+    return sorted(zip(scores, entries), key=itemgetter(0), reverse=True)
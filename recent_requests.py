@@ -0,0 +1,111 @@
+"""
+Recent Requests Module
+Foydalanuvchining yaqinda yuborgan so'rovlari indeksi (takroriy so'rovlarni aniqlash)
+
+Sabrsiz foydalanuvchilar bir xil havola yoki qo'shiq nomini ketma-ket 3-5
+marta yuboradi. SingleFlight yuklashni birlashtiradi, lekin har bir nusxa
+baribir qidiruv, status xabarlari va Telegram'ga yuborishni qaytadan bajaradi.
+Bu indeks har bir foydalanuvchi uchun so'rov kalitlarini (ig:..., yt:...,
+query:..., artist:...) saqlaydi: bajarilayotgan yoki `window` sekund ichida
+tugagan so'rov takroriy hisoblanadi.
+
+Indeks chegaralangan: eng ko'pi `max_users` ta foydalanuvchi (LRU) va har
+biri uchun `max_per_user` ta kalit; muddati o'tgan yozuvlar o'qishda tozalanadi.
+
+Misol:
+    previous = recent_requests.lookup(user_id, key)
+    if previous is None:
+        with recent_requests.track(user_id, key, message.message_id):
+            ...
+"""
+
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional
+
+
+class Request:
+    """Indeksdagi bitta so'rov"""
+
+    __slots__ = ('key', 'message_id', 'started', 'finished')
+
+    def __init__(self, key: str, message_id: Optional[int]):
+        self.key = key
+        self.message_id = message_id   # Asl xabar (takroriyga javob shu xabarga bog'lanadi)
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self.finished is None
+
+
+class RecentRequests:
+    """
+    Foydalanuvchi -> so'rov kaliti -> Request (xotirada, jarayon bo'yicha).
+    """
+
+    def __init__(self, window: float = 60.0, max_users: int = 10000, max_per_user: int = 20):
+        """
+        Args:
+            window: Tugagan so'rov shuncha sekund takroriy hisoblanadi (0 - faqat bajarilayotganlar)
+            max_users: Indeksdagi foydalanuvchilar soni chegarasi
+            max_per_user: Bitta foydalanuvchi uchun saqlanadigan kalitlar soni
+        """
+        self.window = window
+        self.max_users = max_users
+        self.max_per_user = max_per_user
+        self._users: "OrderedDict[int, OrderedDict[str, Request]]" = OrderedDict()
+
+    def configure(self, window: float) -> None:
+        """Takroriy so'rov oynasini o'rnatish (bot ishga tushishida)"""
+        self.window = window
+
+    def lookup(self, user_id: int, key: str) -> Optional[Request]:
+        """
+        Shu foydalanuvchining bajarilayotgan yoki yaqinda tugagan so'rovi
+
+        Returns:
+            Request yoki None (so'rov yangi)
+        """
+        requests = self._users.get(user_id)
+        if not requests:
+            return None
+        self._expire(requests)
+        return requests.get(key)
+
+    @contextmanager
+    def track(self, user_id: int, key: str, message_id: Optional[int] = None):
+        """
+        So'rovni blok davomida "bajarilmoqda" deb belgilash, chiqishda tugagan vaqtini yozish
+        """
+        request = Request(key, message_id)
+        requests = self._users.get(user_id)
+        if requests is None:
+            requests = self._users[user_id] = OrderedDict()
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        requests.pop(key, None)
+        requests[key] = request
+        while len(requests) > self.max_per_user:
+            requests.popitem(last=False)
+        try:
+            yield request
+        finally:
+            request.finished = time.monotonic()
+
+    def stats(self) -> dict:
+        return {'users': len(self._users), 'requests': sum(len(r) for r in self._users.values())}
+
+    def _expire(self, requests: "OrderedDict[str, Request]") -> None:
+        """Muddati o'tgan (tugaganiga window dan ko'p bo'lgan) yozuvlarni o'chirish"""
+        deadline = time.monotonic() - self.window
+        for key in [k for k, r in requests.items() if r.finished is not None and r.finished < deadline]:
+            del requests[key]
+
+
+# Jarayon uchun yagona indeks
+recent_requests = RecentRequests()
@@ -1,28 +1,364 @@
+import os
 import asyncio
 import logging
+from contextlib import asynccontextmanager, nullcontext
 from aiogram import Bot, Dispatcher, F
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.filters import CommandStart, Command
-from aiogram.types import Message, CallbackQuery, FSInputFile
-from config import TOKEN
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message, CallbackQuery, FSInputFile, InputMediaAudio, ReplyParameters, Update
+from config import (
+    TOKEN,
+    FILE_CACHE_PATH,
+    FILE_CACHE_TTL,
+    FILE_CACHE_MAX_KEYS,
+    LOOP_LAG_THRESHOLD_MS,
+    BOT_MODE,
+    WEBHOOK_BASE_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_REGISTER,
+    WEB_HOST,
+    PORT,
+    UPDATE_CONCURRENCY,
+    BOT_API_URL,
+    BOT_API_LOCAL,
+    MAX_UPLOAD_MB,
+    WORK_DIR,
+    METRICS_HOST,
+    METRICS_PORT,
+    MAX_LINKS_PER_MESSAGE,
+    UPLOAD_GLOBAL_RATE,
+    UPLOAD_CHAT_RATE,
+    UPLOAD_CHAT_BURST,
+    UPLOAD_PARALLEL,
+    UPLOAD_MEDIA_GROUP,
+    WORKER_MODE,
+    WORKER_BROKER,
+    WORKER_JOB_TIMEOUT,
+    PROGRESS_INTERVAL,
+    DUPLICATE_WINDOW,
+    USER_RATE_LIMIT,
+    USER_RATE_BURST,
+    USER_MAX_ACTIVE,
+)
 
 # Keyboards faylidan klaviaturalarni import qilamiz
 from keyboards import (
-    main_menu_keyboard,       # Asosiy menyu tugmalari
+    menu_keyboard,            # Asosiy menyu tugmalari (rejimga qarab)
+    HELP_BUTTON,              # Yordam
+    SONG_MODE_BUTTON,         # "Faqat qo'shiq" rejimini yoqish
+    VIDEO_MODE_BUTTON,        # Odatiy rejimga qaytish
 )
 
 # Instagram downloader modulini import qilamiz
+import instagram_downloader
 from instagram_downloader import (
-    is_instagram_url,
-    download_instagram_content,
-    download_youtube_audio,
-    download_batch_youtube_audio,
+    get_youtube_id,
     cleanup_files,
-    get_file_size_mb
+    get_file_size_mb,
 )
 
-bot = Bot(token=TOKEN)
+# Xabardagi havolalarni platforma bo'yicha yo'naltirish
+from url_router import Link, extract_links, route, dispatch, INSTAGRAM, TIKTOK, YOUTUBE
+
+# Telegram file_id keshi
+from file_cache import FileIdCache, CachedFile
+from search_cache import search_cache, normalize_query
+
+# Bloklovchi ishlar uchun executor va event loop kuzatuvchisi
+import executor
+
+# Yuklab olish modullarini sozlash (bot, worker.py va benchmark.py uchun umumiy)
+import runtime
+
+# Webhook server va middleware'lar
+from webhook import run_webhook
+from middlewares import ConcurrencyLimitMiddleware, UserRateLimitMiddleware
+
+# Umumiy ish navbati
+from scheduler import scheduler, job_context, current_job, SEARCH, DOWNLOAD, TRANSCODE, UPLOAD
+
+# Har bir so'rov uchun alohida ishchi papka
+import workspace
+from workspace import Workspace
+
+# Yuklab olingan fayllarning diskdagi keshi
+from media_cache import media_cache
+
+# Worker rejimi: yuklashlar broker orqali alohida jarayonlarda
+from broker import broker
+from worker import RemoteDownloads
+
+# Telegram flood-limitlariga mos yuborish
+from uploader import uploader
+
+# Yuklash progressini status xabarida ko'rsatish
+from progress import ProgressReporter
+
+# Takroriy so'rovlarni aniqlash
+from recent_requests import recent_requests
+
+# Prometheus metrikalari
+from metrics import STAGE_SECONDS, BYTES, REQUESTS, QUEUE_DEPTH, ACTIVE_JOBS, CACHE_HIT_RATIO, start_metrics_server
+
+if not TOKEN:
+    raise ValueError("BOT_TOKEN environment variable o'rnatilmagan! .env faylida BOT_TOKEN ni o'rnating.")
+
+# BOT_API_URL berilsa, o'zimizning telegram-bot-api serverimizdan foydalanamiz
+session = None
+if BOT_API_URL:
+    session = AiohttpSession(api=TelegramAPIServer.from_base(BOT_API_URL, is_local=BOT_API_LOCAL))
+bot = Bot(token=TOKEN, session=session)
 dp = Dispatcher()
+
+
+def starts_download(update: Update) -> bool:
+    """
+    Update yuklash boshlaydimi: havola/qidiruv matni yoki /song.
+    Boshqa buyruqlar, menyu tugmalari, kontakt va lokatsiya yengil -
+    USER_MAX_ACTIVE chegarasiga kirmaydi.
+    """
+    text = update.message.text if update.message else None
+    if not text or text in (HELP_BUTTON, SONG_MODE_BUTTON, VIDEO_MODE_BUTTON):
+        return False
+    if text.startswith('/'):
+        return text.split(maxsplit=1)[0].split('@')[0].lower() in ('/song', '/qoshiq')
+    return True
+
+
+# Avval foydalanuvchi limiti: spam xabarlar umumiy slotlarni egallamasin
+rate_limiter = UserRateLimitMiddleware(
+    USER_RATE_LIMIT, USER_RATE_BURST,
+    max_active=USER_MAX_ACTIVE, starts_job=starts_download
+)
+dp.update.outer_middleware(rate_limiter)
+dp.update.outer_middleware(ConcurrencyLimitMiddleware(UPDATE_CONCURRENCY))
 logger = logging.getLogger(__name__)
+file_cache = FileIdCache(FILE_CACHE_PATH, ttl=FILE_CACHE_TTL, max_keys=FILE_CACHE_MAX_KEYS)
+
+# "Faqat qo'shiq" rejimidagi foydalanuvchilar (xotirada; qayta ishga tushganda odatiy rejim)
+song_only_users: set = set()
+
+# Yuklab oluvchi funksiyalar: shu jarayonda (instagram_downloader) yoki
+# WORKER_MODE=1 da worker jarayonlarida (setup() almashtiradi)
+downloads = instagram_downloader
+
+
+
+# ISH NAVBATI YORDAMCHILARI
+
+
+@dp.message.middleware()
+async def job_context_middleware(handler, event: Message, data: dict):
+    """
+    Har bir xabar uchun job_context o'rnatadi, shunda downloader funksiyalari
+    navbatda qaysi foydalanuvchi uchun ishlayotganini biladi.
+    
+    Shuningdek so'rovga alohida ishchi papka beradi (handler'da `workspace`
+    argumenti): handler xatolik bilan tugasa ham papka o'chiriladi.
+    """
+    user_id = event.from_user.id if event.from_user else event.chat.id
+    with job_context(user_id):
+        async with Workspace() as ws:
+            data['workspace'] = ws
+            return await handler(event, data)
+
+
+def notify_queue_position(status_msg: Message) -> None:
+    """
+    Joriy so'rov navbatda kutib qolsa, status xabarida o'rnini ko'rsatish
+    """
+    async def on_wait(position: int):
+        await status_msg.edit_text(f"⏳ Navbatdasiz: #{position}. Iltimos, kuting...")
+
+    job = current_job()
+    if job is not None:
+        job.on_wait = on_wait
+
+
+@asynccontextmanager
+async def deduplicated(message: Message, key: str):
+    """
+    Foydalanuvchi bir xil so'rovni (havola, qo'shiq, ijrochi) ketma-ket yuborsa,
+    faqat birinchisi bajariladi. Takroriy nusxa asl xabarga bog'langan qisqa
+    javob oladi: so'rov hali bajarilayotgan bo'lsa natija o'sha yerga keladi,
+    yaqinda yuborilgan bo'lsa (file_id keshida bor) qayta yuborilmaydi.
+    Asl so'rov muvaffaqiyatsiz tugagan bo'lsa, takrorlash odatdagidek bajariladi.
+    
+    Yields:
+        True - so'rovni bajarish kerak, False - takroriy (javob berildi)
+    """
+    user_id = message.from_user.id if message.from_user else message.chat.id
+    previous = recent_requests.lookup(user_id, key)
+    if previous is not None and (previous.running or file_cache.contains(key)):
+        state = 'running' if previous.running else 'recent'
+        REQUESTS.inc(source='duplicate', result=state)
+        text = (
+            "⏳ Bu so'rov allaqachon bajarilmoqda, natija tayyor bo'lishi bilan yuboriladi."
+            if previous.running else
+            "✅ Bu so'rov natijasi hozirgina yuborilgan."
+        )
+        # Asl xabar o'chirilgan bo'lsa ham javob yuboriladi
+        await message.answer(
+            text,
+            reply_parameters=ReplyParameters(message_id=previous.message_id, allow_sending_without_reply=True)
+        )
+        yield False
+        return
+    with recent_requests.track(user_id, key, message.message_id):
+        yield True
+
+
+def report_progress(status_msg: Message, label: str):
+    """
+    Blok ichidagi yuklash progressini status xabarida ko'rsatish (async with).
+    Tahrirlar chat bo'yicha PROGRESS_INTERVAL da bir martadan oshmaydi va
+    flood-limit band bo'lsa keyinga qoldiriladi.
+    """
+    if PROGRESS_INTERVAL <= 0:
+        return nullcontext()
+    chat_id = status_msg.chat.id
+    return ProgressReporter(
+        status_msg.edit_text, chat_id, label,
+        interval=PROGRESS_INTERVAL,
+        allow=lambda: uploader.try_send_now(chat_id)
+    )
+
+
+
+# FAYL YUBORISH YORDAMCHILARI
+
+
+def input_file(path: str):
+    """
+    Yuboriladigan fayl: lokal Bot API serverda fayl yo'li (file://) orqali
+    uzatiladi va qayta yuklanmaydi, aks holda multipart orqali yuklanadi.
+    """
+    if BOT_API_LOCAL:
+        return f"file://{os.path.abspath(path)}"
+    return FSInputFile(path)
+
+
+@asynccontextmanager
+async def uploading(source: str, *paths: str):
+    """
+    Telegram'ga yuborish: UPLOAD slotini olish, vaqt va baytlarni metrikaga yozish.
+    paths bo'sh - fayl file_id orqali yuboriladi (qayta yuklanmaydi).
+    """
+    async with scheduler.slot(UPLOAD):
+        with STAGE_SECONDS.time(source=source, stage='upload'):
+            yield
+    for path in paths:
+        BYTES.inc(os.path.getsize(path), direction='upload')
+
+
+async def send_limited(message: Message, source: str, call, *paths: str):
+    """
+    Flood-limit (chat va global token bucket) ruxsatini olib, UPLOAD slotida yuborish.
+    Telegram 429 qaytarsa, uploader kutib qayta yuboradi.
+    
+    Args:
+        message: Javob beriladigan xabar (chat aniqlanadi)
+        source: Metrikalar uchun manba
+        call: Yuboruvchi coroutine'ni qaytaruvchi funksiya (har urinishda chaqiriladi)
+        paths: Yuklanayotgan fayllar (baytlar metrikasi uchun)
+    """
+    async def attempt():
+        async with uploading(source, *paths):
+            return await call()
+    return await uploader.send(message.chat.id, attempt)
+
+
+
+# FILE_ID KESH YORDAMCHILARI
+
+
+async def send_cached(message: Message, files: list) -> bool:
+    """
+    Keshdagi fayllarni file_id orqali yuborish (yuklab olishsiz).
+    
+    Returns:
+        True - hammasi yuborildi, False - Telegram file_id'ni rad etdi
+    """
+    for f in files:
+        try:
+            if f.kind == 'video':
+                await send_limited(message, 'cache', lambda: message.answer_video(f.file_id, caption=f.caption))
+            else:
+                await send_limited(message, 'cache', lambda: message.answer_audio(
+                    f.file_id,
+                    title=f.title,
+                    performer=f.performer,
+                    caption=f.caption
+                ))
+        except TelegramBadRequest as e:
+            # file_id eskirgan yoki boshqa bot tokeniga tegishli
+            logger.warning(f"Keshdagi file_id rad etildi: {e}")
+            file_cache.invalidate_file_id(f.file_id)
+            return False
+    return True
+
+
+async def answer_audio_cached(message: Message, path: str, title: str, performer: str, caption: str) -> CachedFile:
+    """
+    Audio yuborish. YouTube fayllari uchun avval yt:<video_id> keshini tekshiradi,
+    shunda boshqa so'rov orqali yuborilgan qo'shiq qayta yuklanmaydi.
+    """
+    video_id = get_youtube_id(path)
+    if video_id:
+        cached = file_cache.get(f"yt:{video_id}")
+        if cached:
+            entry = cached[0]._replace(title=title, performer=performer, caption=caption)
+            if await send_cached(message, [entry]):
+                return entry
+
+    sent = await send_limited(
+        message, 'youtube',
+        lambda: message.answer_audio(input_file(path), title=title, performer=performer, caption=caption),
+        path
+    )
+    entry = CachedFile('audio', sent.audio.file_id, title, performer, caption)
+    if video_id:
+        file_cache.put(f"yt:{video_id}", [entry])
+    return entry
+
+
+
+async def answer_audio_album(message: Message, tracks: list) -> list:
+    """
+    Audio'larni 10 tadan albom (send_media_group) qilib yuborish.
+    Oldin yuborilgan qo'shiqlar (yt:<video_id> keshi) albomga file_id orqali qo'shiladi.
+    
+    Args:
+        tracks: [(path, title, artist), ...]
+        
+    Returns:
+        CachedFile ro'yxati (tracks tartibida)
+    """
+    entries = []
+    for i in range(0, len(tracks), 10):
+        chunk = tracks[i:i + 10]
+        media, uploaded = [], []
+        for path, title, artist in chunk:
+            caption = f"✅ {artist} - {title}"
+            video_id = get_youtube_id(path)
+            cached = file_cache.get(f"yt:{video_id}") if video_id else None
+            if cached:
+                media.append(InputMediaAudio(media=cached[0].file_id, title=title, performer=artist, caption=caption))
+            else:
+                media.append(InputMediaAudio(media=input_file(path), title=title, performer=artist, caption=caption))
+                uploaded.append(path)
+        
+        sent = await send_limited(message, 'youtube', lambda: message.answer_media_group(media), *uploaded)
+        for msg, (path, title, artist) in zip(sent, chunk):
+            entry = CachedFile('audio', msg.audio.file_id, title, artist, f"✅ {artist} - {title}")
+            video_id = get_youtube_id(path)
+            if video_id:
+                file_cache.put(f"yt:{video_id}", [entry])
+            entries.append(entry)
+    return entries
 
 
 
@@ -39,14 +375,16 @@ async def cmd_start(message: Message):
         f"Assalomu alaykum, {message.from_user.full_name}!\n\n"
         "🤖 **Ushbu bot quyidagi imkoniyatlarga ega:**\n\n"
         "📹 **Instagram Downloader:**\n"
-        "Instagram'dan video, reel yoki TV linkini yuboring va men uni sizga yuklab beraman.\n\n"
+        "Instagram, TikTok yoki YouTube linkini yuboring va men uni sizga yuklab beraman.\n\n"
         "🎵 **Musiqa qidiruv:**\n"
-        "Istalgan qo'shiq nomini yoki ijrochini yozing, men uni YouTube'dan topib, MP3 formatida yuboraman.\n\n"
+        "Istalgan qo'shiq nomini yoki ijrochini yozing, men uni YouTube'dan topib, audio formatida yuboraman.\n\n"
+        f"🎧 **Faqat qo'shiq:** \"{SONG_MODE_BUTTON}\" tugmasini bosing yoki /song buyrug'i bilan "
+        "Instagram/TikTok linkidagi qo'shiqni videosiz tezroq oling.\n\n"
         "Shunchaki link yoki matn yuboring!"
     )
     await message.answer(
         welcome_text,
-        reply_markup=main_menu_keyboard,
+        reply_markup=menu_keyboard(message.from_user.id in song_only_users),
         parse_mode="Markdown"
     )
 
@@ -64,6 +402,20 @@ async def cmd_help(message: Message):
     await help_button_handler(message)
 
 
+@dp.message(Command('song', 'qoshiq'))
+async def cmd_song(message: Message, workspace: Workspace):
+    """
+    /song <havola> - Instagram/TikTok postidagi qo'shiqni videosiz yuborish
+    (rejimni o'zgartirmasdan, bir martalik).
+    """
+    links = extract_links(message.text)
+    if not links:
+        await message.answer("Ishlatish: /song <Instagram yoki TikTok havolasi>")
+        return
+    for link in links[:MAX_LINKS_PER_MESSAGE]:
+        await handle_link(link, message, workspace, song_only=True)
+
+
 
 # REPLY KEYBOARD HANDLERS (Tugma matnlariga javob)
 
@@ -71,18 +423,41 @@ async def cmd_help(message: Message):
 # Shuning uchun F.text filteri orqali ushlaymiz
 
 
-@dp.message(F.text == "ℹ️ Yordam")
+@dp.message(F.text == HELP_BUTTON)
 async def help_button_handler(message: Message):
     """'Yordam' tugmasi bosilganda"""
     help_text = (
         "❓ **Qanday foydalanish kerak?**\n\n"
-        "1. **Instagram video:** Shunchaki linkni nusxalab botga yuboring.\n"
-        "2. **Musiqa:** Qo'shiq nomini yozib yuboring (masalan: *Janob Rasul - Gulyuzim*).\n\n"
+        "1. **Instagram/TikTok/YouTube:** Shunchaki linkni nusxalab botga yuboring.\n"
+        "2. **Musiqa:** Qo'shiq nomini yozib yuboring (masalan: *Janob Rasul - Gulyuzim*).\n"
+        f"3. **Faqat qo'shiq:** \"{SONG_MODE_BUTTON}\" rejimida yoki `/song <link>` bilan "
+        "Instagram/TikTok videosi yuklanmaydi, faqat undagi qo'shiq yuboriladi.\n\n"
         "Bot avtomatik ravishda faylni yuklab beradi."
     )
     await message.answer(help_text, parse_mode="Markdown")
 
 
+@dp.message(F.text == SONG_MODE_BUTTON)
+async def song_mode_handler(message: Message):
+    """'Faqat qo'shiq' tugmasi: Instagram/TikTok havolalaridan faqat qo'shiq yuboriladi"""
+    song_only_users.add(message.from_user.id)
+    await message.answer(
+        "🎵 Faqat qo'shiq rejimi yoqildi: Instagram/TikTok linkidan video yuklanmaydi, "
+        "undagi qo'shiq YouTube'dan topib yuboriladi.",
+        reply_markup=menu_keyboard(True)
+    )
+
+
+@dp.message(F.text == VIDEO_MODE_BUTTON)
+async def video_mode_handler(message: Message):
+    """'Video + qo'shiq' tugmasi: odatiy rejimga qaytish"""
+    song_only_users.discard(message.from_user.id)
+    await message.answer(
+        "📹 Odatiy rejim: video, audio va qo'shiqning to'liq versiyasi yuboriladi.",
+        reply_markup=menu_keyboard(False)
+    )
+
+
 
 # CONTENT TYPE HANDLERS (Maxsus kontent turlari)
 
@@ -97,7 +472,7 @@ async def handle_contact(message: Message):
     await message.answer(
         f"Rahmat! Telefon raqamingiz: {phone}\n"
         f"Tez orada siz bilan bog'lanamiz.",
-        reply_markup=main_menu_keyboard
+        reply_markup=menu_keyboard(message.from_user.id in song_only_users)
     )
 
 
@@ -113,172 +488,362 @@ async def handle_location(message: Message):
         f"Rahmat! Joylashuvingiz:\n"
         f"Kenglik: {lat}\n"
         f"Uzunlik: {lon}",
-        reply_markup=main_menu_keyboard
+        reply_markup=menu_keyboard(message.from_user.id in song_only_users)
     )
 
 
-@dp.message(F.text)
-async def handle_text_messages(message: Message):
+# HAVOLA HANDLERLARI (url_router orqali chaqiriladi)
+
+
+PLATFORM_NAMES = {INSTAGRAM: "Instagram", TIKTOK: "TikTok", YOUTUBE: "YouTube"}
+
+
+@route(INSTAGRAM, TIKTOK)
+async def handle_video_link(link: Link, message: Message, workspace: Workspace):
     """
-    Instagram linki yoki qo'shiq qidirish uchun matnli xabarlarni qayta ishlash.
+    Instagram/TikTok havolasi: video, undan ajratilgan audio va (qo'shiq
+    aniqlansa) YouTube'dagi to'liq versiyasini yuborish.
     """
-    text = message.text
+    name = PLATFORM_NAMES[link.platform]
+    
+    # Yuklab olish jarayoni boshlandi
+    status_msg = await message.answer(f"⏳ {name}'dan yuklab olinmoqda...")
+    notify_queue_position(status_msg)
     
-    # Instagram link ekanligini tekshirish
-    if is_instagram_url(text):
-        # Yuklab olish jarayoni boshlandi
-        status_msg = await message.answer("⏳ Instagram'dan yuklab olinmoqda...")
+    # Avval keshni tekshiramiz (shu post oldin yuborilgan bo'lsa)
+    cached = file_cache.get(link.key)
+    if cached and await send_cached(message, cached):
+        await status_msg.edit_text("✅ Tayyor! Sizga kerakli barcha fayllar yuborildi.")
+        return
+    
+    try:
+        sent_files = []
         
-        try:
-            # Video, audio va qo'shiq metadata yuklab olish
-            video_path, audio_path, song_query = await download_instagram_content(text)
-            
-            if not video_path and not audio_path:
-                await status_msg.edit_text(
-                    "❌ Yuklab olishda xatolik yuz berdi.\n"
-                    "Iltimos, linkni tekshiring va qayta urinib ko'ring."
+        # Video, audio va qo'shiq metadata yuklab olish
+        async with report_progress(status_msg, f"{name}'dan yuklab olinmoqda"):
+            video_path, audio_path, song_query = await downloads.download_video_content(link, output_dir=workspace.path)
+        
+        if not video_path and not audio_path:
+            await status_msg.edit_text(
+                "❌ Yuklab olishda xatolik yuz berdi.\n"
+                "Iltimos, linkni tekshiring va qayta urinib ko'ring."
+            )
+            return
+        
+        # Video yuborish
+        if video_path:
+            video_size = get_file_size_mb(video_path)
+            if video_size <= MAX_UPLOAD_MB:
+                await status_msg.edit_text("📹 Video yuborilmoqda...")
+                sent = await send_limited(
+                    message, link.platform,
+                    lambda: message.answer_video(input_file(video_path), caption=f"✅ {name} video"),
+                    video_path
                 )
-                return
-            
-            # Fayl hajmlarini tekshirish (Telegram Bot API 100 MB limit)
-            MAX_SIZE_MB = 100
-            
-            # Video yuborish
-            if video_path:
-                video_size = get_file_size_mb(video_path)
-                if video_size <= MAX_SIZE_MB:
-                    await status_msg.edit_text("📹 Video yuborilmoqda...")
-                    await message.answer_video(FSInputFile(video_path), caption="✅ Instagram video")
-            
-            # Audio yuborish (Instagram'dan olingan variant)
-            if audio_path:
-                audio_size = get_file_size_mb(audio_path)
-                if audio_size <= MAX_SIZE_MB:
-                    await status_msg.edit_text("🎵 Audio yuborilmoqda...")
-                    ig_title = song_query if song_query else "Instagram Audio"
-                    await message.answer_audio(
-                        FSInputFile(audio_path),
-                        title=ig_title,
-                        performer="Instagram",
-                        caption=f"✅ Instagram audio"
-                    )
-            
-            # ORIGINAL VARIANT qidiruv (agar metadata topilgan bo'lsa)
-            yt_path = None
-            if song_query:
-                await status_msg.edit_text(f"🔍 '{song_query}' qo'shig'ining to'liq versiyasini YouTube'dan qidiryapman...")
-                yt_path, yt_title, yt_artist = await download_youtube_audio(song_query)
-                
-                if yt_path:
-                    yt_size = get_file_size_mb(yt_path)
-                    if yt_size <= MAX_SIZE_MB:
-                        await message.answer_audio(
-                            FSInputFile(yt_path),
-                            title=yt_title,
-                            performer=yt_artist,
-                            caption=f"🎧 '{song_query}'ning to'liq versiyasi."
-                        )
-            
-            # Muvaffaqiyatli xabar
-            await status_msg.edit_text("✅ Tayyor! Sizga kerakli barcha fayllar yuborildi.")
-            
-            # Vaqtinchalik fayllarni o'chirish
-            cleanup_files(video_path, audio_path, yt_path)
-            
-        except Exception as e:
-            logger.error(f"Instagram handler xatolik: {e}")
-            await status_msg.edit_text("❌ Xatolik yuz berdi.")
+                sent_files.append(CachedFile('video', sent.video.file_id, caption=f"✅ {name} video"))
+        
+        # Audio yuborish (videodan olingan variant)
+        if audio_path:
+            audio_size = get_file_size_mb(audio_path)
+            if audio_size <= MAX_UPLOAD_MB:
+                await status_msg.edit_text("🎵 Audio yuborilmoqda...")
+                ig_title = song_query if song_query else f"{name} Audio"
+                sent = await send_limited(message, link.platform, lambda: message.answer_audio(
+                    input_file(audio_path),
+                    title=ig_title,
+                    performer=name,
+                    caption=f"✅ {name} audio"
+                ), audio_path)
+                sent_files.append(CachedFile('audio', sent.audio.file_id, ig_title, name, f"✅ {name} audio"))
+        
+        # ORIGINAL VARIANT qidiruv (agar metadata topilgan bo'lsa)
+        if song_query:
+            await status_msg.edit_text(f"🔍 '{song_query}' qo'shig'ining to'liq versiyasini YouTube'dan qidiryapman...")
+            async with report_progress(status_msg, f"'{song_query}' YouTube'dan yuklab olinmoqda"):
+                yt_path, yt_title, yt_artist = await downloads.download_youtube_audio(song_query, output_dir=workspace.path)
             
-    else:
-        # Menyu tugmalariga javob berishni to'xtatish
-        excluded_texts = ["ℹ️ Yordam", "Biz haqimizda", "Xizmatlar", "Bog'lanish", "Sozlamalar", "Orqaga", "Bekor qilish", "Assalomu alaykum"]
-        if text.strip() in excluded_texts:
+            if yt_path:
+                yt_size = get_file_size_mb(yt_path)
+                if yt_size <= MAX_UPLOAD_MB:
+                    sent_files.append(await answer_audio_cached(
+                        message,
+                        yt_path,
+                        title=yt_title,
+                        performer=yt_artist,
+                        caption=f"🎧 '{song_query}'ning to'liq versiyasi."
+                    ))
+        
+        file_cache.put(link.key, sent_files)
+        
+        # Muvaffaqiyatli xabar
+        await status_msg.edit_text("✅ Tayyor! Sizga kerakli barcha fayllar yuborildi.")
+        
+    except Exception as e:
+        logger.error(f"{name} handler xatolik: {e}")
+        await status_msg.edit_text("❌ Xatolik yuz berdi.")
+
+
+@route(YOUTUBE)
+async def handle_youtube_link(link: Link, message: Message, workspace: Workspace):
+    """
+    YouTube havolasi: qidiruvsiz, aynan shu videoning audiosini yuborish.
+    """
+    status_msg = await message.answer("⏳ YouTube'dan audio yuklab olinmoqda...")
+    notify_queue_position(status_msg)
+    
+    # answer_audio_cached ham shu yt:<video_id> kalitiga yozadi
+    cached = file_cache.get(link.key)
+    if cached and await send_cached(message, cached):
+        await status_msg.edit_text(f"✅ Tayyor! '{cached[0].title}' yuborildi.")
+        return
+    
+    try:
+        async with report_progress(status_msg, "YouTube'dan audio yuklab olinmoqda"):
+            path, title, artist = await downloads.download_youtube_link(link.id, output_dir=workspace.path)
+        if not path:
+            await status_msg.edit_text("❌ Yuklab olishda xatolik yuz berdi. Iltimos, linkni tekshiring.")
+            return
+        if get_file_size_mb(path) > MAX_UPLOAD_MB:
+            await status_msg.edit_text(f"❌ Fayl juda katta ({MAX_UPLOAD_MB} MB dan oshadi).")
             return
+        await status_msg.edit_text("🎵 Yuborilmoqda...")
+        await answer_audio_cached(message, path, title=title, performer=artist, caption=f"✅ {artist} - {title}")
+        await status_msg.edit_text(f"✅ Tayyor! '{title}' yuborildi.")
+    except Exception as e:
+        logger.error(f"YouTube link handler xatolik: {e}")
+        await status_msg.edit_text("❌ Xatolik yuz berdi.")
 
-        # =============================================
-        # AQLLI QIDIRUV: Ijrochi yoki Qo'shiq aniqlash
-        # =============================================
-        
-        # Qo'shiq nomi belgisi: "-" bor yoki taniqli qo'shiq so'zlari
-        song_indicators = [" - ", "qo'shiq", "song", "mp3", "audio", "track"]
-        is_song_name = any(ind in text.lower() for ind in song_indicators)
+
+async def handle_song_link(link: Link, message: Message, workspace: Workspace):
+    """
+    "Faqat qo'shiq" rejimi: Instagram/TikTok media'si yuklanmaydi, faqat
+    metadata'dan qo'shiq aniqlanadi va darhol YouTube'dan qidiriladi.
+    """
+    name = PLATFORM_NAMES[link.platform]
+    status_msg = await message.answer(f"🔍 {name} postidagi qo'shiq aniqlanmoqda...")
+    notify_queue_position(status_msg)
+    
+    cache_key = f"song:{link.key}"
+    cached = file_cache.get(cache_key)
+    if cached and await send_cached(message, cached):
+        await status_msg.edit_text(f"✅ Tayyor! '{cached[0].title}' yuborildi.")
+        return
+    
+    try:
+        song_query = await downloads.fetch_song_query(link)
+        if not song_query:
+            await status_msg.edit_text(
+                "❌ Bu postdagi qo'shiqni aniqlab bo'lmadi.\n"
+                f"Video va audioni olish uchun \"{VIDEO_MODE_BUTTON}\" rejimida yuboring."
+            )
+            return
         
-        # Agar matnda "-" bor bo'lsa (Masalan: "Yulduz Usmonova - Yig'lama") - bu qo'shiq
-        if " - " in text:
-            is_song_name = True
+        await status_msg.edit_text(f"🔍 '{song_query}' YouTube'dan qidirilmoqda...")
+        async with report_progress(status_msg, f"'{song_query}' yuklab olinmoqda"):
+            path, title, artist = await downloads.download_youtube_audio(song_query, output_dir=workspace.path)
+        if not path:
+            await status_msg.edit_text(f"❌ Kechirasiz, '{song_query}' qo'shig'i YouTube'da topilmadi.")
+            return
+        if get_file_size_mb(path) > MAX_UPLOAD_MB:
+            await status_msg.edit_text(f"❌ Fayl juda katta ({MAX_UPLOAD_MB} MB dan oshadi).")
+            return
         
+        await status_msg.edit_text("🎵 Topildi! Yuborilmoqda...")
+        entry = await answer_audio_cached(
+            message,
+            path,
+            title=title,
+            performer=artist,
+            caption=f"🎧 {name} postidagi qo'shiq: {artist} - {title}"
+        )
+        file_cache.put(cache_key, [entry])
+        await status_msg.edit_text(f"✅ Tayyor! '{title}' yuborildi.")
+    except Exception as e:
+        logger.error(f"{name} qo'shiq handler xatolik: {e}")
+        await status_msg.edit_text("❌ Xatolik yuz berdi.")
+
+
+async def handle_link(link: Link, message: Message, workspace: Workspace, song_only: bool = False):
+    """
+    Havolani takroriy so'rov tekshiruvi bilan bajarish.
+    song_only - Instagram/TikTok uchun faqat qo'shiq (YouTube havolasi baribir audio).
+    """
+    if song_only and link.platform in (INSTAGRAM, TIKTOK):
+        async with deduplicated(message, f"song:{link.key}") as fresh:
+            if fresh:
+                await handle_song_link(link, message, workspace)
+        return
+    async with deduplicated(message, link.key) as fresh:
+        if fresh:
+            await dispatch(link, message, workspace)
+
+
+@dp.message(F.text)
+async def handle_text_messages(message: Message, workspace: Workspace):
+    """
+    Havolalar (Instagram/TikTok/YouTube) yoki qo'shiq qidirish uchun matnli xabarlarni qayta ishlash.
+    Barcha fayllar so'rovning ishchi papkasiga yuklanadi va so'rov tugaganda o'chiriladi.
+    """
+    text = message.text
+    
+    # Instagram/TikTok/YouTube havolalari (matnning istalgan joyida)
+    links = extract_links(text)
+    if links:
+        song_only = message.from_user is not None and message.from_user.id in song_only_users
+        for link in links[:MAX_LINKS_PER_MESSAGE]:
+            await handle_link(link, message, workspace, song_only=song_only)
+        return
+    
+    # Menyu tugmalariga javob berishni to'xtatish
+    excluded_texts = ["ℹ️ Yordam", "Biz haqimizda", "Xizmatlar", "Bog'lanish", "Sozlamalar", "Orqaga", "Bekor qilish", "Assalomu alaykum"]
+    if text.strip() in excluded_texts:
+        return
+
+    # =============================================
+    # AQLLI QIDIRUV: Ijrochi yoki Qo'shiq aniqlash
+    # =============================================
+    
+    # Qo'shiq nomi belgisi: "-" bor yoki taniqli qo'shiq so'zlari
+    song_indicators = [" - ", "qo'shiq", "song", "mp3", "audio", "track"]
+    is_song_name = any(ind in text.lower() for ind in song_indicators)
+    
+    # Agar matnda "-" bor bo'lsa (Masalan: "Yulduz Usmonova - Yig'lama") - bu qo'shiq
+    if " - " in text:
+        is_song_name = True
+    
+    key = f"{'query' if is_song_name else 'artist'}:{normalize_query(text)}"
+    async with deduplicated(message, key) as fresh:
+        if not fresh:
+            return
         if is_song_name:
-            # ============================================
-            # QOSHIQ NOMI - Faqat 1 ta to'liq versiya
-            # ============================================
-            status_msg = await message.answer(f"🔍 '{text}' qo'shig'ining to'liq versiyasini qidirmoqdaman...")
-            
+            await search_song(message, text, workspace)
+        else:
+            await search_artist(message, text, workspace)
+
+
+async def search_song(message: Message, text: str, workspace: Workspace):
+    """
+    QO'SHIQ NOMI - faqat 1 ta to'liq versiya
+    """
+    status_msg = await message.answer(f"🔍 '{text}' qo'shig'ining to'liq versiyasini qidirmoqdaman...")
+    notify_queue_position(status_msg)
+    
+    cache_key = f"query:{normalize_query(text)}"
+    cached = file_cache.get(cache_key)
+    if cached and await send_cached(message, cached):
+        await status_msg.edit_text(f"✅ Tayyor! '{cached[0].title}' qo'shig'i yuborildi.")
+        return
+    
+    try:
+        async with report_progress(status_msg, f"'{text}' yuklab olinmoqda"):
+            path, title, artist = await downloads.download_youtube_audio(text, output_dir=workspace.path)
+        
+        if path:
+            audio_size = get_file_size_mb(path)
+            if audio_size <= MAX_UPLOAD_MB:
+                await status_msg.edit_text("🎵 Topildi! Yuborilmoqda...")
+                entry = await answer_audio_cached(
+                    message,
+                    path,
+                    title=title,
+                    performer=artist,
+                    caption=f"✅ {artist} - {title}"
+                )
+                file_cache.put(cache_key, [entry])
+                await status_msg.edit_text(f"✅ Tayyor! '{title}' qo'shig'i yuborildi.")
+            else:
+                await status_msg.edit_text(f"❌ Fayl juda katta ({MAX_UPLOAD_MB} MB dan oshadi).")
+        else:
+            await status_msg.edit_text(
+                f"❌ Kechirasiz, '{text}' qo'shig'i topilmadi.\n\n"
+                "💡 **Maslahat:** Qo'shiq nomini to'g'ri yozganingizga ishonch hosil qiling."
+            )
+    except Exception as e:
+        logger.error(f"Single song search error: {e}")
+        await status_msg.edit_text("❌ Xatolik yuz berdi. Iltimos, qayta urinib ko'ring.")
+
+
+async def search_artist(message: Message, text: str, workspace: Workspace):
+    """
+    IJROCHI NOMI - 10 ta qo'shiq
+    """
+    limit = 10
+    status_msg = await message.answer(f"🔍 '{text}' ijrochisining eng sara {limit} ta qo'shig'i qidirilmoqda...")
+    notify_queue_position(status_msg)
+    
+    cache_key = f"artist:{normalize_query(text)}"
+    cached = file_cache.get(cache_key)
+    if cached and await send_cached(message, cached):
+        await status_msg.edit_text(f"✅ Tayyor! {len(cached)} ta qo'shiq yuborildi.")
+        return
+    
+    try:
+        # YouTube'dan bir nechta audiolarni yuklash: har bir qo'shiq tayyor
+        # bo'lishi bilan darhol (UPLOAD_PARALLEL tagacha parallel) yuboriladi.
+        # UPLOAD_MEDIA_GROUP rejimida esa hammasi tayyor bo'lgach albom qilib yuboriladi.
+        sent = {}
+        album = []
+        tasks = []
+        upload_slots = asyncio.Semaphore(UPLOAD_PARALLEL)
+        
+        async def send_track(index: int, path: str, title: str, artist: str):
             try:
-                path, title, artist = await download_youtube_audio(text)
-                
-                if path:
+                async with upload_slots:
                     audio_size = get_file_size_mb(path)
-                    if audio_size <= 100:
-                        await status_msg.edit_text("🎵 Topildi! Yuborilmoqda...")
-                        await message.answer_audio(
-                            FSInputFile(path),
+                    if audio_size <= MAX_UPLOAD_MB:
+                        sent[index] = await answer_audio_cached(
+                            message,
+                            path,
                             title=title,
                             performer=artist,
                             caption=f"✅ {artist} - {title}"
                         )
-                        await status_msg.edit_text(f"✅ Tayyor! '{title}' qo'shig'i yuborildi.")
+                        # Progress xabari ixtiyoriy: limit band bo'lsa yuborilmaydi
+                        if uploader.try_send_now(message.chat.id):
+                            await status_msg.edit_text(f"🎵 {len(sent)}/{limit} ta qo'shiq yuborildi...")
+            except Exception as send_err:
+                logger.error(f"Error sending batch audio: {send_err}")
+            finally:
+                # Har bir faylni yuborgandan so'ng o'chirish (disk limitini tezroq bo'shatish uchun)
+                cleanup_files(path)
+        
+        found = 0
+        try:
+            async for path, title, artist in downloads.iter_batch_youtube_audio(text, limit=limit, output_dir=workspace.path):
+                if UPLOAD_MEDIA_GROUP:
+                    if get_file_size_mb(path) <= MAX_UPLOAD_MB:
+                        album.append((path, title, artist))
                     else:
-                        await status_msg.edit_text("❌ Fayl juda katta (100 MB dan oshadi).")
-                    cleanup_files(path)
+                        cleanup_files(path)
                 else:
-                    await status_msg.edit_text(
-                        f"❌ Kechirasiz, '{text}' qo'shig'i topilmadi.\n\n"
-                        "💡 **Maslahat:** Qo'shiq nomini to'g'ri yozganingizga ishonch hosil qiling."
-                    )
-            except Exception as e:
-                logger.error(f"Single song search error: {e}")
-                await status_msg.edit_text("❌ Xatolik yuz berdi. Iltimos, qayta urinib ko'ring.")
+                    tasks.append(asyncio.create_task(send_track(found, path, title, artist)))
+                found += 1
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
         
+        if album:
+            try:
+                sent.update(enumerate(await answer_audio_album(message, album)))
+            except Exception as send_err:
+                logger.error(f"Error sending batch album: {send_err}")
+            finally:
+                cleanup_files(*(path for path, _, _ in album))
+        sent_files = [sent[i] for i in sorted(sent)]
+        
+        if found:
+            file_cache.put(cache_key, sent_files)
+            await status_msg.edit_text(f"✅ Tayyor! {len(sent_files)} ta qo'shiq yuborildi.")
         else:
-            # ============================================
-            # IJROCHI NOMI - 10 ta qo'shiq
-            # ============================================
-            limit = 10
-            status_msg = await message.answer(f"🔍 '{text}' ijrochisining eng sara {limit} ta qo'shig'i qidirilmoqda...")
+            await status_msg.edit_text(
+                f"❌ Kechirasiz, '{text}' bo'yicha qo'shiqlar topilmadi.\n\n"
+                "💡 **Maslahat:** Ismni to'g'ri yozganingizga ishonch hosil qiling."
+            )
             
-            try:
-                # YouTube'dan bir nechta audiolarni yuklash
-                results = await download_batch_youtube_audio(text, limit=limit)
-                
-                if results:
-                    await status_msg.edit_text(f"🎵 {len(results)} ta qo'shiq topildi. Yuborilmoqda...")
-                    
-                    for path, title, artist in results:
-                        try:
-                            audio_size = get_file_size_mb(path)
-                            if audio_size <= 100:
-                                await message.answer_audio(
-                                    FSInputFile(path),
-                                    title=title,
-                                    performer=artist,
-                                    caption=f"✅ {artist} - {title}"
-                                )
-                        except Exception as send_err:
-                            logger.error(f"Error sending batch audio: {send_err}")
-                        
-                        # Har bir faylni yuborgandan so'ng o'chirish (joy tejash uchun)
-                        cleanup_files(path)
-                    
-                    await status_msg.edit_text(f"✅ Tayyor! {len(results)} ta qo'shiq yuborildi.")
-                else:
-                    await status_msg.edit_text(
-                        f"❌ Kechirasiz, '{text}' bo'yicha qo'shiqlar topilmadi.\n\n"
-                        "💡 **Maslahat:** Ismni to'g'ri yozganingizga ishonch hosil qiling."
-                    )
-                    
-            except Exception as e:
-                logger.error(f"Batch search handler error: {e}")
-                await status_msg.edit_text("❌ Xatolik yuz berdi. Iltimos, qayta urinib ko'ring.")
+    except Exception as e:
+        logger.error(f"Batch search handler error: {e}")
+        await status_msg.edit_text("❌ Xatolik yuz berdi. Iltimos, qayta urinib ko'ring.")
 
 
 
@@ -286,8 +851,67 @@ async def handle_text_messages(message: Message):
 # MAIN
 
 
+def setup():
+    """
+    Modul sozlamalarini config.py qiymatlari bilan o'rnatish
+    (bot va benchmark.py uchun umumiy)
+    """
+    global downloads
+    workspace.configure(root=WORK_DIR)
+    # WORKER_MODE'da .shared/ ni worker'lar ishlatadi (ular o'z papkasini o'zi tozalaydi)
+    workspace.sweep_leftovers(keep_shared=WORKER_MODE)
+    runtime.setup_downloads()
+    if WORKER_MODE:
+        downloads = RemoteDownloads(timeout=WORKER_JOB_TIMEOUT)
+        logger.info(f"Worker rejimi: yuklashlar {WORKER_BROKER} orqali worker.py jarayonlarida bajariladi")
+    uploader.configure(UPLOAD_GLOBAL_RATE, UPLOAD_CHAT_RATE, UPLOAD_CHAT_BURST)
+    recent_requests.configure(DUPLICATE_WINDOW)
+    for kind in (SEARCH, DOWNLOAD, TRANSCODE, UPLOAD):
+        QUEUE_DEPTH.set_function(lambda kind=kind: scheduler.queue_depth(kind), kind=kind)
+        ACTIVE_JOBS.set_function(lambda kind=kind: scheduler.active(kind), kind=kind)
+    CACHE_HIT_RATIO.set_function(lambda: file_cache.stats()['hit_rate'], cache='file_id')
+    CACHE_HIT_RATIO.set_function(lambda: search_cache.stats()['hit_rate'], cache='search')
+    CACHE_HIT_RATIO.set_function(lambda: media_cache.stats()['hit_rate'], cache='media')
+
+
+def teardown():
+    """Executor'ni to'xtatish, statistikani log qilish va keshlarni yopish"""
+    runtime.teardown_downloads()
+    logger.info(f"File_id kesh statistikasi: {file_cache.stats()}")
+    logger.info(f"Yuborish statistikasi: {uploader.stats()}")
+    logger.info(f"Takroriy so'rovlar indeksi: {recent_requests.stats()}, limitdan oshgan xabarlar: {rate_limiter.dropped}")
+    broker.close()
+    file_cache.close()
+
+
 async def main():
-    await dp.start_polling(bot)
+    setup()
+    metrics_runner = None
+    if METRICS_PORT:
+        metrics_runner = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+    watchdog = executor.LoopLagWatchdog(threshold=LOOP_LAG_THRESHOLD_MS / 1000)
+    watchdog.start()
+    try:
+        if BOT_MODE == 'webhook':
+            await run_webhook(
+                dp,
+                bot,
+                base_url=WEBHOOK_BASE_URL,
+                path=WEBHOOK_PATH,
+                secret=WEBHOOK_SECRET,
+                host=WEB_HOST,
+                port=PORT,
+                set_webhook=WEBHOOK_REGISTER
+            )
+        else:
+            # Avval o'rnatilgan webhook getUpdates bilan to'qnashmasligi uchun
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
+    finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await watchdog.stop()
+        teardown()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,98 @@
+"""
+Runtime Module
+Yuklab olish modullarini config.py qiymatlari bilan sozlash va yopish
+
+Bot (run.py), worker.py va benchmark.py uchun umumiy. aiogram, Bot/Dispatcher
+va file_id keshiga bog'liq emas: worker jarayonlari BOT_TOKEN'siz ishlaydi.
+
+Misol:
+    runtime.setup_downloads()
+    try:
+        ...
+    finally:
+        runtime.teardown_downloads()
+"""
+
+import logging
+
+from config import (
+    YTDLP_WORKERS,
+    FAST_AUDIO,
+    SEARCH_WORKERS,
+    DOWNLOAD_WORKERS,
+    TRANSCODE_WORKERS,
+    TRANSCODE_THREADS,
+    UPLOAD_WORKERS,
+    PER_USER_JOBS,
+    SEARCH_CACHE_TTL,
+    SEARCH_CACHE_MEMORY,
+    SEARCH_CACHE_DISK,
+    FILE_CACHE_PATH,
+    WORK_DIR,
+    DISK_BUDGET_MB,
+    HEDGE_DELAY,
+    HEDGE_MAX_PARALLEL,
+    RANKING_WEIGHTS,
+    MEDIA_CACHE_DIR,
+    MEDIA_CACHE_MB,
+    WORKER_BROKER,
+)
+
+import executor
+import media
+import ranking
+import workspace
+from workspace import disk_budget
+from instagram_downloader import coalescing_stats, configure_hedging, YDL_POOLS
+from search_cache import search_cache
+from media_cache import media_cache
+from broker import broker
+from scheduler import scheduler, SEARCH, DOWNLOAD, TRANSCODE, UPLOAD
+
+logger = logging.getLogger(__name__)
+
+
+def setup_downloads():
+    """
+    Yuklab olish modullarini config.py qiymatlari bilan sozlash
+    (ishchi papka tozalanmaydi)
+    """
+    workspace.configure(root=WORK_DIR, budget_bytes=DISK_BUDGET_MB * 1024 * 1024)
+    media_cache.configure(root=MEDIA_CACHE_DIR, max_bytes=MEDIA_CACHE_MB * 1024 * 1024)
+    broker.configure(path=WORKER_BROKER)
+    executor.configure(YTDLP_WORKERS)
+    for pool in YDL_POOLS:
+        # Har bir yt-dlp thread'i uchun bittadan bo'sh obyekt yetarli
+        pool.max_idle = YTDLP_WORKERS
+    media.configure(FAST_AUDIO, TRANSCODE_THREADS)
+    configure_hedging(HEDGE_DELAY, HEDGE_MAX_PARALLEL)
+    ranking.configure(RANKING_WEIGHTS)
+    search_cache.configure(
+        path=FILE_CACHE_PATH,
+        ttl=SEARCH_CACHE_TTL,
+        max_memory=SEARCH_CACHE_MEMORY,
+        max_disk=SEARCH_CACHE_DISK
+    )
+    scheduler.configure(
+        limits={
+            SEARCH: SEARCH_WORKERS,
+            DOWNLOAD: DOWNLOAD_WORKERS,
+            TRANSCODE: TRANSCODE_WORKERS,
+            UPLOAD: UPLOAD_WORKERS,
+        },
+        per_user=PER_USER_JOBS
+    )
+    # Disk to'lsa yangi yuklashlar joy bo'shashini kutadi
+    scheduler.set_admission(DOWNLOAD, disk_budget.wait_for_space)
+
+
+def teardown_downloads():
+    """Executor'ni to'xtatish, yuklash statistikasini log qilish va keshlarni yopish"""
+    executor.shutdown()
+    logger.info(f"Birlashtirilgan so'rovlar: {coalescing_stats()}")
+    logger.info(f"Qidiruv kesh statistikasi: {search_cache.stats()}")
+    logger.info(f"Media kesh statistikasi: {media_cache.stats()}")
+    for pool in YDL_POOLS:
+        logger.info(f"YoutubeDL pool ({pool.profile}): {pool.stats()}")
+        pool.close()
+    search_cache.close()
@@ -0,0 +1,264 @@
+"""
+Scheduler Module
+Barcha yuklab olish ishlari uchun umumiy navbat (job queue)
+
+Har bir ish turi (search, download, transcode, upload) uchun global limit bor.
+Bitta foydalanuvchi bir vaqtning o'zida faqat `per_user` ta slotni egallashi
+mumkin, navbatdagilar esa foydalanuvchilar bo'yicha navbatma-navbat
+(round-robin) xizmat qilinadi — shunda 10 ta qo'shiq so'ragan foydalanuvchi
+boshqalarni kutib qoldirmaydi.
+
+Misol:
+    with job_context(user_id) as job:
+        job.on_wait = notify
+        async with scheduler.slot('download'):
+            ...
+"""
+
+import time
+import asyncio
+import logging
+import contextvars
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Awaitable, Callable, Dict, Optional
+
+from metrics import QUEUE_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Ish turlari
+SEARCH = 'search'
+DOWNLOAD = 'download'
+TRANSCODE = 'transcode'
+UPLOAD = 'upload'
+
+DEFAULT_LIMITS = {
+    SEARCH: 4,
+    DOWNLOAD: 6,
+    TRANSCODE: 2,
+    UPLOAD: 8,
+}
+
+
+class Job:
+    """
+    Joriy so'rov: egasi, navbat holati va yuklash progressi haqida xabar beruvchi callback'lar.
+
+    Handler uni bir marta o'rnatadi, downloader funksiyalari esa
+    parametr sifatida uzatmasdan scheduler orqali ishlatadi.
+    """
+
+    def __init__(self, user_id: Optional[int], on_wait: Optional[Callable[[int], Awaitable[None]]] = None):
+        self.user_id = user_id
+        self.on_wait = on_wait
+        # Yuklash progressi (progress.snapshot lug'ati bilan, istalgan thread'dan chaqiriladi)
+        self.on_progress: Optional[Callable[[dict], None]] = None
+
+
+_current_job: contextvars.ContextVar[Optional[Job]] = contextvars.ContextVar('current_job', default=None)
+
+
+@contextmanager
+def job_context(user_id: Optional[int], on_wait: Optional[Callable[[int], Awaitable[None]]] = None):
+    """
+    Joriy so'rov uchun Job o'rnatish
+
+    Args:
+        user_id: Telegram foydalanuvchi ID si
+        on_wait: Navbatdagi o'rin o'zgarganda chaqiriladi (async, o'rin raqami bilan)
+    """
+    job = Job(user_id, on_wait)
+    token = _current_job.set(job)
+    try:
+        yield job
+    finally:
+        _current_job.reset(token)
+
+
+def current_job() -> Optional[Job]:
+    """Joriy so'rov (job_context tashqarisida None)"""
+    return _current_job.get()
+
+
+class _KindQueue:
+    """Bitta ish turi uchun slotlar va navbat"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.active_per_user: Dict[Optional[int], int] = {}
+        self.waiting: Dict[Optional[int], deque] = {}
+        self.rotation: deque = deque()
+
+    def depth(self) -> int:
+        return sum(len(q) for q in self.waiting.values())
+
+    def position(self, user_id: Optional[int], fut: asyncio.Future) -> int:
+        """
+        Round-robin tartibida kutayotgan ishning taxminiy o'rni (1 dan boshlanadi)
+        """
+        own = self.waiting.get(user_id)
+        if not own or fut not in own:
+            return 0
+        k = own.index(fut)
+        ahead = k + 1
+        users = list(self.rotation)
+        my_turn = users.index(user_id) if user_id in users else len(users)
+        for i, other in enumerate(users):
+            if other == user_id:
+                continue
+            # Rotatsiyada oldinda turgan foydalanuvchilar har aylanada bizdan oldin xizmat qilinadi
+            ahead += min(len(self.waiting[other]), k + 1 if i < my_turn else k)
+        return ahead
+
+
+class JobScheduler:
+    """
+    Jarayon bo'yicha yagona ish navbati: tur bo'yicha global limitlar,
+    foydalanuvchi bo'yicha limit va round-robin adolat.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None, per_user: int = 3, wait_update_interval: float = 5.0):
+        """
+        Args:
+            limits: Ish turi -> bir vaqtda bajariladigan ishlar soni
+            per_user: Bitta foydalanuvchi bir turda egallashi mumkin bo'lgan slotlar soni
+            wait_update_interval: Navbatdagi o'rin qanchalik tez-tez tekshiriladi (sekund)
+        """
+        self.per_user = per_user
+        self.wait_update_interval = wait_update_interval
+        self._queues: Dict[str, _KindQueue] = {}
+        self._admission: Dict[str, Callable[[], Awaitable[None]]] = {}
+        for kind, limit in {**DEFAULT_LIMITS, **(limits or {})}.items():
+            self._queues[kind] = _KindQueue(limit)
+
+    def configure(self, limits: Optional[Dict[str, int]] = None, per_user: Optional[int] = None) -> None:
+        """Limitlarni o'zgartirish (bot ishga tushishida)"""
+        if per_user is not None:
+            self.per_user = per_user
+        for kind, limit in (limits or {}).items():
+            self._queue(kind).limit = limit
+
+    def set_admission(self, kind: str, check: Optional[Callable[[], Awaitable[None]]]) -> None:
+        """
+        Slot olishdan oldin kutiladigan shart (masalan, disk limiti bo'yicha
+        backpressure). None - shartni olib tashlash.
+        """
+        if check is None:
+            self._admission.pop(kind, None)
+        else:
+            self._admission[kind] = check
+
+    def queue_depth(self, kind: Optional[str] = None) -> int:
+        """Navbatda kutayotgan ishlar soni (kind=None - barcha turlar)"""
+        if kind is not None:
+            return self._queue(kind).depth()
+        return sum(q.depth() for q in self._queues.values())
+
+    def active(self, kind: str) -> int:
+        """Hozir bajarilayotgan ishlar soni"""
+        return self._queue(kind).active
+
+    @asynccontextmanager
+    async def slot(self, kind: str, user_id: Optional[int] = None, on_wait: Optional[Callable[[int], Awaitable[None]]] = None):
+        """
+        Slot olish (kerak bo'lsa navbatda kutish) va blokdan chiqqanda bo'shatish.
+
+        Args:
+            kind: Ish turi (SEARCH, DOWNLOAD, TRANSCODE, UPLOAD)
+            user_id: Foydalanuvchi (berilmasa job_context'dan olinadi)
+            on_wait: Navbat callback'i (berilmasa job_context'dan olinadi)
+        """
+        job = _current_job.get()
+        if job is not None:
+            if user_id is None:
+                user_id = job.user_id
+            if on_wait is None:
+                on_wait = job.on_wait
+
+        started = time.perf_counter()
+        admission = self._admission.get(kind)
+        if admission is not None:
+            await admission()
+
+        await self._acquire(kind, user_id, on_wait)
+        QUEUE_WAIT_SECONDS.observe(time.perf_counter() - started, kind=kind)
+        try:
+            yield
+        finally:
+            self._release(kind, user_id)
+
+    def _queue(self, kind: str) -> _KindQueue:
+        if kind not in self._queues:
+            self._queues[kind] = _KindQueue(DEFAULT_LIMITS.get(kind, 4))
+        return self._queues[kind]
+
+    async def _acquire(self, kind: str, user_id: Optional[int], on_wait) -> None:
+        q = self._queue(kind)
+        fut = asyncio.get_running_loop().create_future()
+        if user_id not in q.waiting:
+            q.waiting[user_id] = deque()
+            q.rotation.append(user_id)
+        q.waiting[user_id].append(fut)
+        self._dispatch(q)
+
+        last_position = None
+        try:
+            while not fut.done():
+                position = q.position(user_id, fut)
+                if on_wait and position and position != last_position:
+                    last_position = position
+                    try:
+                        await on_wait(position)
+                    except Exception as e:
+                        logger.debug(f"Navbat xabarini yangilab bo'lmadi: {e}")
+                await asyncio.wait({fut}, timeout=self.wait_update_interval)
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Slot berilgan edi, lekin ish bekor qilindi
+                self._release(kind, user_id)
+            else:
+                fut.cancel()
+                self._forget(q, user_id, fut)
+                self._dispatch(q)
+            raise
+
+    def _release(self, kind: str, user_id: Optional[int]) -> None:
+        q = self._queue(kind)
+        q.active -= 1
+        q.active_per_user[user_id] -= 1
+        if not q.active_per_user[user_id]:
+            del q.active_per_user[user_id]
+        self._dispatch(q)
+
+    def _forget(self, q: _KindQueue, user_id: Optional[int], fut: asyncio.Future) -> None:
+        own = q.waiting.get(user_id)
+        if own and fut in own:
+            own.remove(fut)
+        if own is not None and not own:
+            del q.waiting[user_id]
+            q.rotation.remove(user_id)
+
+    def _dispatch(self, q: _KindQueue) -> None:
+        """Bo'sh slotlarni navbatdagilarga round-robin tartibida berish"""
+        skipped = 0
+        while q.active < q.limit and q.rotation and skipped < len(q.rotation):
+            user_id = q.rotation[0]
+            q.rotation.rotate(-1)
+            # Anonim ishlar (masalan, skriptlardan) uchun foydalanuvchi limiti yo'q
+            if user_id is not None and q.active_per_user.get(user_id, 0) >= self.per_user:
+                skipped += 1
+                continue
+            skipped = 0
+            fut = q.waiting[user_id].popleft()
+            if not q.waiting[user_id]:
+                del q.waiting[user_id]
+                q.rotation.remove(user_id)
+            q.active += 1
+            q.active_per_user[user_id] = q.active_per_user.get(user_id, 0) + 1
+            fut.set_result(None)
+
+
+# Jarayon uchun yagona scheduler
+scheduler = JobScheduler()
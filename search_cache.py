@@ -0,0 +1,186 @@
+"""
+Search Cache Module
+YouTube qidiruv (ytsearch) natijalarini keshlash uchun modul
+
+Bir xil ijrochi yoki qo'shiq bir necha daqiqa ichida qayta qidirilsa,
+tarmoqqa so'rov yuborilmaydi: natijalar xotirada (LRU) va diskda (SQLite)
+TTL bilan saqlanadi, reyting esa keshdagi yozuvlar ustida darhol ishlaydi.
+"""
+
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# O'zbek tilidagi apostrof variantlari: o‘, oʻ, o’, o` -> o'
+_APOSTROPHES = re.compile(r"[ʻʼ‘’`´]")
+# Qidiruvga qo'shiladigan keraksiz oxirgi so'zlar
+_SUFFIXES = re.compile(r"\s*\bofficial(?:\s+(?:audio|video))?$")
+_SPACES = re.compile(r"\s+")
+
+# Kesh yozuvida saqlanadigan maydonlar (flat qidiruv natijasidan)
+ENTRY_FIELDS = ('id', 'title', 'uploader', 'channel', 'duration', 'url')
+
+
+def normalize_query(text: str) -> str:
+    """
+    Qidiruv matnini kesh kaliti uchun normallashtirish:
+    kichik harflar, apostroflarni birxillashtirish, "official audio" kabi
+    qo'shimchalarni olib tashlash, ortiqcha bo'shliqlarni yig'ish.
+
+    Misol:
+        normalize_query("Janob Rasul – Gulyuzim Official Audio") == "janob rasul – gulyuzim"
+        normalize_query("Sherali Jo‘rayev") == normalize_query("sherali jo'rayev")
+
+    Args:
+        text: Foydalanuvchi yozgan matn
+
+    Returns:
+        Normallashtirilgan matn
+    """
+    text = _APOSTROPHES.sub("'", text.casefold())
+    text = _SPACES.sub(' ', text).strip()
+    return _SUFFIXES.sub('', text).strip()
+
+
+class SearchCache:
+    """
+    Ikki darajali qidiruv keshi: xotirada LRU + diskda SQLite.
+
+    Diskdagi ma'lumotlar bot qayta ishga tushganda ham saqlanib qoladi.
+    """
+
+    def __init__(self, path: str = "cache.db", ttl: float = 6 * 3600, max_memory: int = 2000, max_disk: int = 50000):
+        """
+        Args:
+            path: SQLite fayl yo'li (None - faqat xotirada)
+            ttl: Natijaning yashash muddati (sekund)
+            max_memory: Xotirada saqlanadigan so'rovlar soni
+            max_disk: Diskda saqlanadigan so'rovlar soni
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def configure(self, path: Optional[str] = None, ttl: Optional[float] = None,
+                  max_memory: Optional[int] = None, max_disk: Optional[int] = None) -> None:
+        """Sozlamalarni o'zgartirish (birinchi ishlatishdan oldin)"""
+        if path is not None:
+            self.path = path
+        if ttl is not None:
+            self.ttl = ttl
+        if max_memory is not None:
+            self.max_memory = max_memory
+        if max_disk is not None:
+            self.max_disk = max_disk
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        """
+        Kalit bo'yicha qidiruv natijalarini olish
+
+        Returns:
+            Yozuvlar ro'yxati yoki None (kesh miss)
+        """
+        now = time.time()
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None and now - item[0] <= self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return item[1]
+
+            db = self._connect()
+            row = None
+            if db is not None:
+                row = db.execute("SELECT entries, created_at FROM search_results WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] <= self.ttl:
+                entries = json.loads(row[0])
+                db.execute("UPDATE search_results SET last_used = ? WHERE key = ?", (now, key))
+                db.commit()
+                self._remember(key, row[1], entries)
+                self.hits += 1
+                return entries
+
+            self._memory.pop(key, None)
+            self.misses += 1
+            return None
+
+    def put(self, key: str, entries: List[dict]) -> None:
+        """
+        Qidiruv natijalarini saqlash (faqat reyting uchun kerakli maydonlar)
+        """
+        slim = [{f: e.get(f) for f in ENTRY_FIELDS if e.get(f) is not None} for e in entries if e and e.get('id')]
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, slim)
+            db = self._connect()
+            if db is None:
+                return
+            db.execute(
+                "INSERT OR REPLACE INTO search_results (key, entries, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(slim, ensure_ascii=False), now, now)
+            )
+            db.execute("DELETE FROM search_results WHERE created_at < ?", (now - self.ttl,))
+            db.execute(
+                "DELETE FROM search_results WHERE key NOT IN ("
+                "SELECT key FROM search_results ORDER BY last_used DESC LIMIT ?)",
+                (self.max_disk,)
+            )
+            db.commit()
+
+    def stats(self) -> dict:
+        """Kesh statistikasi"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'memory_keys': len(self._memory),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key: str, created_at: float, entries: List[dict]) -> None:
+        """Xotiradagi LRU ga qo'shish (lock ichida chaqiriladi)"""
+        self._memory[key] = (created_at, entries)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """SQLite ulanishini kerak bo'lganda ochish (lock ichida chaqiriladi)"""
+        if self._db is None and self.path:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS search_results (
+                    key TEXT PRIMARY KEY,
+                    entries TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            self._db.commit()
+        return self._db
+
+
+# Jarayon uchun yagona qidiruv keshi
+search_cache = SearchCache()
@@ -0,0 +1,112 @@
+"""
+Single-flight Module
+Bir vaqtda kelgan bir xil so'rovlarni bitta ishga birlashtirish (request coalescing)
+
+Qo'shiq mashhur bo'lib ketganda ko'p foydalanuvchi bir xil matn yoki reel
+linkini bir necha sekund ichida yuboradi. Bunday so'rovlar kalit bo'yicha
+birlashtiriladi: birinchisi (leader) ishni bajaradi, qolganlari o'sha
+natijani kutadi.
+
+Misol:
+    async with flights.join(key, lambda: download(...), cleanup=remove) as result:
+        # natijani (masalan, faylni) o'z papkangizga ko'chirib oling
+        ...
+    # oxirgi ishtirokchi chiqqanda cleanup(result) chaqiriladi
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """Bitta kalit bo'yicha bajarilayotgan ish"""
+
+    def __init__(self, task: asyncio.Task, cleanup: Optional[Callable[[Any], None]]):
+        self.task = task
+        self.cleanup = cleanup
+        self.refs = 0
+
+
+class SingleFlight:
+    """
+    Kalit bo'yicha bir vaqtdagi bir xil ishlarni birlashtiruvchi.
+
+    Ish alohida task sifatida bajariladi, shuning uchun leader bekor qilinsa ham
+    boshqa kutayotganlar natijani oladi. Barcha ishtirokchilar chiqib ketsa,
+    tugallanmagan ish bekor qilinadi.
+    """
+
+    def __init__(self, name: str = "flight"):
+        self.name = name
+        self.started = 0      # Haqiqatda bajarilgan ishlar soni
+        self.coalesced = 0    # Mavjud ishga qo'shilgan so'rovlar soni
+        self._flights: Dict[str, _Flight] = {}
+
+    @asynccontextmanager
+    async def join(self, key: str, fn: Callable[[], Awaitable[Any]], cleanup: Optional[Callable[[Any], None]] = None):
+        """
+        Kalit bo'yicha ishga qo'shilish (yo'q bo'lsa boshlash)
+
+        Args:
+            key: Birlashtirish kaliti (normallashtirilgan so'rov, video ID va h.k.)
+            fn: Ishni bajaruvchi coroutine funksiya
+            cleanup: Oxirgi ishtirokchi chiqqanda natija (xatolikda None) bilan chaqiriladi
+                (faqat ishni boshlagan so'rovning cleanup'i ishlatiladi)
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()), cleanup)
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _, f=flight: self._finish(key, f))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            logger.info(f"{self.name}: so'rov birlashtirildi ({key}), jami birlashtirilgan: {self.coalesced}")
+
+        flight.refs += 1
+        try:
+            result = await asyncio.shield(flight.task)
+            yield result
+        finally:
+            flight.refs -= 1
+            if flight.refs == 0:
+                if flight.task.done():
+                    self._cleanup(key, flight)
+                else:
+                    # Natijani hech kim kutmayapti - ishni to'xtatamiz
+                    flight.task.cancel()
+                    flight.task.add_done_callback(lambda _, f=flight: self._cleanup(key, f))
+
+    def in_flight(self) -> int:
+        """Hozir bajarilayotgan ishlar soni"""
+        return len(self._flights)
+
+    def stats(self) -> dict:
+        """Birlashtirish statistikasi"""
+        return {
+            'started': self.started,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._flights),
+        }
+
+    def _cleanup(self, key: str, flight: _Flight) -> None:
+        """cleanup'ni chaqirish (ish xatolik bilan tugagan bo'lsa natija o'rniga None)"""
+        if not flight.cleanup:
+            return
+        task = flight.task
+        result = task.result() if not task.cancelled() and task.exception() is None else None
+        try:
+            flight.cleanup(result)
+        except Exception as e:
+            logger.error(f"{self.name}: cleanup xatolik ({key}): {e}")
+
+    def _finish(self, key: str, flight: _Flight) -> None:
+        # Tugagan ishga yangi so'rovlar qo'shilmasin
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled() and flight.task.exception() is not None and flight.refs == 0:
+            logger.debug(f"{self.name}: kutuvchisiz xatolik ({key}): {flight.task.exception()}")
@@ -0,0 +1,78 @@
+"""
+metadata moduli uchun testlar
+
+Kutilgan natijalar metadata moduligacha bo'lgan (har chaqiruvda re.sub/re.search)
+tozalash kodidan olingan: clean_track va song_query_from_info xuddi shu
+natijalarni berishi kerak.
+
+Ishlatish:
+    python -m pytest -q test_metadata.py
+"""
+
+import pytest
+
+import metadata
+
+
+@pytest.mark.parametrize('raw_title, uploader, strip_year, expected', [
+    # "Ijrochi - Qo'shiq" - ijrochi sarlavhadan olinadi
+    ("Janob Rasul - Sevgi (Official Audio)", "Janob Rasul - Topic", True, ("Sevgi", "Janob Rasul")),
+    ("Janob Rasul - Sevgi (Official Audio)", "Janob Rasul - Topic", False, ("Sevgi", "Janob Rasul")),
+    ("Sherali Jo'rayev - Bahor [Official Music Video]", "Handasa Media", False, ("Bahor", "Sherali Jo'rayev")),
+    ("A - B - C", "X", False, ("B - C", "A")),
+    # Keraksiz qo'shimchalar
+    ("Yurak (Official Video)", "ShahzodaVEVO", True, ("Yurak", "Shahzoda")),
+    ("Kecha | Full Version", "Yulduz Usmonova Music", False, ("Kecha |  Version", "Yulduz Usmonova Music")),
+    ("Dunyo (Original Mix)", "Shahzoda", False, ("Dunyo ( Mix)", "Shahzoda")),
+    ("Baxt Official Clip", "Ulug'bek Rahmatullayev", False, ("Baxt Official", "Ulug'bek Rahmatullayev")),
+    ("Hayot (Lyric Video)", "Handasa Media", False, ("Hayot (Lyric )", "Handasa Media")),
+    ("Sevgi (Audio)", "Yulduz Usmonova - Topic", False, ("Sevgi ()", "Yulduz Usmonova")),
+    ("Yor-yor (Live)", "Janob Rasul Official", False, ("Yor-yor (Live)", "Janob Rasul")),
+    # Yillar faqat strip_year=True bo'lganda olib tashlanadi
+    ("Onajon klip 2024", "Ozoda Official", True, ("Onajon", "Ozoda")),
+    ("Onajon klip 2024", "Ozoda Official", False, ("Onajon  2024", "Ozoda")),
+    ("Ozoda - Sog'inch 2023", "Ozoda Official", True, ("Sog'inch", "Ozoda")),
+    ("Ozoda - Sog'inch 2023", "Ozoda Official", False, ("Sog'inch 2023", "Ozoda")),
+    ("Shahzoda - Bahor [Official Audio] 2022", "ShahzodaVEVO", True, ("Bahor", "Shahzoda")),
+    ("Shahzoda - Bahor [Official Audio] 2022", "ShahzodaVEVO", False, ("Bahor  2022", "Shahzoda")),
+    # Bo'sh sarlavha
+    ("", "Channel", True, ("", "Channel")),
+    ("", "", False, ("", "")),
+])
+def test_clean_track(raw_title, uploader, strip_year, expected):
+    assert metadata.clean_track(raw_title, uploader, strip_year) == expected
+
+
+def test_clean_track_strips_vevo_without_year():
+    # Eski batch yo'li VEVO'ni qoldirardi; clean_track ikkala yo'lda ham oladi
+    assert metadata.clean_track("Yurak (Official Video)", "ShahzodaVEVO") == ("Yurak", "Shahzoda")
+
+
+@pytest.mark.parametrize('info, expected', [
+    # To'g'ridan-to'g'ri metadata
+    ({'track': 'Sevgi', 'artist': 'Janob Rasul'}, 'Janob Rasul - Sevgi'),
+    ({'track': 'Sevgi'}, 'Sevgi'),
+    ({'alt_title': 'Bahor', 'artist': 'Ozoda'}, 'Ozoda - Bahor'),
+    ({'alt_title': 'Bahor'}, 'Bahor'),
+    ({'music_info': {'title': 'Yurak', 'artist': 'Shahzoda'}, 'track': 'X', 'artist': 'Y'}, 'Shahzoda - Yurak'),
+    # "Original audio" - uploader orqali
+    ({'music_info': {'title': 'Original audio', 'artist': 'user_1.uz'}, 'uploader': 'user_1.uz'},
+     'user_1.uz yangi klip'),
+    ({'music_info': {'title': 'Original audio', 'artist': 'user_1.uz'}}, None),
+    ({'description': 'Song: Original audio', 'uploader': 'dj_ali.uz'}, 'dj_ali.uz yangi klip'),
+    # Tavsifdagi yozuvlar
+    ({'description': 'Music: Ozoda - Sevgi | #music'}, 'Ozoda - Sevgi'),
+    ({'description': '🎵 Shahzoda - Yurak\nhttps://t.me/x'}, 'Shahzoda - Yurak'),
+    ({'description': '🎧 Onajon'}, 'Onajon'),
+    # Sarlavha va uploader fallback
+    ({'title': 'Janob Rasul - Sevgi #trend #uzbek'}, 'Janob Rasul - Sevgi'),
+    ({'title': 'Instagram reel by someone', 'uploader': 'some_user.uz'}, "some user uz qo'shiq"),
+    ({'title': '@user https://example.com', 'uploader': 'a.b_c'}, "a b c qo'shiq"),
+    ({'title': 'Bugun'}, None),
+    # Bo'sh yoki yo'q maydonlar
+    ({}, None),
+    ({'uploader': None, 'description': '', 'title': ''}, None),
+    ({'music_info': None, 'description': None, 'title': None}, None),
+])
+def test_song_query_from_info(info, expected):
+    assert metadata.song_query_from_info(info) == expected
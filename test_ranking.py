@@ -0,0 +1,59 @@
+"""
+ranking moduli uchun testlar
+
+Davomiylik ballari ranking modulidan oldingi if/elif zanjiri bilan bir xil
+bo'lishi kerak (yt-dlp davomiyligi kasr bo'lishi mumkin).
+
+Ishlatish:
+    python -m pytest -q test_ranking.py
+"""
+
+import pytest
+
+import ranking
+
+
+def legacy_song_duration(duration: float) -> int:
+    """download_youtube_audio dagi eski davomiylik bahosi"""
+    if 150 <= duration <= 360:
+        return 150
+    elif 120 <= duration <= 600:
+        return 80
+    elif duration < 60:
+        return -200
+    elif duration > 600:
+        return -50
+    return 0
+
+
+def legacy_batch_duration(duration: float) -> int:
+    """iter_batch_youtube_audio dagi eski davomiylik bahosi"""
+    return 100 if 120 <= duration <= 420 else 0
+
+
+@pytest.fixture(autouse=True)
+def default_weights():
+    ranking.configure()
+
+
+DURATIONS = [0, 30, 59, 59.5, 59.99, 60, 60.5, 119.5, 120, 149.5, 150, 360, 360.5,
+             420, 420.5, 599.5, 600, 600.5, 601, 3600]
+
+
+@pytest.mark.parametrize('duration', DURATIONS)
+def test_song_duration_scores(duration):
+    assert ranking._profiles['song'].duration_scores([duration]) == [legacy_song_duration(duration)]
+
+
+@pytest.mark.parametrize('duration', DURATIONS)
+def test_batch_duration_scores(duration):
+    assert ranking._profiles['batch'].duration_scores([duration]) == [legacy_batch_duration(duration)]
+
+
+def test_rank_prefers_song_length_over_short_clip():
+    entries = [
+        {'id': 'short', 'title': 'Sevgi', 'uploader': 'x', 'duration': 59.5},
+        {'id': 'song', 'title': 'Sevgi', 'uploader': 'x', 'duration': 200.0},
+        {'id': 'long', 'title': 'Sevgi', 'uploader': 'x', 'duration': 600.5},
+    ]
+    assert [e['id'] for _, e in ranking.rank(entries, 'Sevgi', 'song')] == ['song', 'long', 'short']
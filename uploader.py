@@ -0,0 +1,172 @@
+"""
+Uploader Module
+Telegram'ga yuborishni flood-limitlarga moslab boshqarish
+
+Telegram bitta chatga taxminan sekundiga 1 ta, barcha chatlarga jami
+sekundiga ~30 ta xabardan ko'pini yuborganda 429 (Too Many Requests) qaytaradi.
+Har bir yuborish avval chat va global token bucket'dan ruxsat oladi; shunga
+qaramay 429 kelsa (TelegramRetryAfter), chat `retry_after` sekundga
+to'xtatiladi va so'rov qayta yuboriladi.
+
+Misol:
+    sent = await uploader.send(message.chat.id, lambda: message.answer_audio(...))
+"""
+
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from metrics import REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket: sekundiga `rate` ta token, eng ko'pi `capacity` ta jamg'ariladi.
+    Token yetmasa acquire() kerakli vaqtgacha kutadi (navbat tartibida).
+    rate <= 0 - cheklanmagan (faqat pause() amal qiladi).
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        if self.rate <= 0:
+            self.tokens = self.capacity
+        else:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready(self) -> bool:
+        """Token hozir bormi (token olinmaydi)"""
+        now = time.monotonic()
+        if now < self.paused_until or self._lock.locked():
+            return False
+        self._refill(now)
+        return self.tokens >= 1
+
+    def try_acquire(self) -> bool:
+        """Kutmasdan token olish (bo'lmasa False)"""
+        if not self.ready():
+            return False
+        self.tokens -= 1
+        return True
+
+    async def acquire(self) -> None:
+        """Token olish (kerak bo'lsa kutib)"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Telegram 429 qaytarganda bucket'ni to'xtatib turish (jamg'arilgan tokenlar ham yo'qoladi)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class Uploader:
+    """
+    Chat va global limitlar bilan yuborish.
+
+    Chat bucket'lari LRU tartibida saqlanadi (eng ko'pi `max_chats` ta):
+    uzoq vaqt xabar olmagan chatning bucket'i baribir to'la bo'lar edi.
+    """
+
+    def __init__(self, global_rate: float = 25, chat_rate: float = 1, chat_burst: float = 3,
+                 max_retries: int = 3, max_chats: int = 10000):
+        self.configure(global_rate, chat_rate, chat_burst, max_retries)
+        self.max_chats = max_chats
+        self.retried = 0
+        self._chats: "OrderedDict[int, TokenBucket]" = OrderedDict()
+
+    def configure(self, global_rate: float, chat_rate: float, chat_burst: float, max_retries: int = 3) -> None:
+        """
+        Limitlarni o'rnatish (bot ishga tushishida)
+
+        Args:
+            global_rate: Barcha chatlar bo'yicha sekundiga yuborishlar (0 - cheklanmagan)
+            chat_rate: Bitta chatga sekundiga yuborishlar (0 - cheklanmagan)
+            chat_burst: Bitta chatga ketma-ket kutmasdan yuboriladigan xabarlar
+            max_retries: 429 dan keyin qayta urinishlar soni
+        """
+        self.global_bucket = TokenBucket(global_rate, max(1.0, global_rate))
+        self.chat_rate = chat_rate
+        self.chat_burst = max(1.0, chat_burst)
+        self.max_retries = max_retries
+        self._chats = OrderedDict()
+
+    def _chat(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            if len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        else:
+            self._chats.move_to_end(chat_id)
+        return bucket
+
+    async def send(self, chat_id: int, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Limitlarga rioya qilib Telegram so'rovini bajarish
+
+        Args:
+            chat_id: Qabul qiluvchi chat
+            call: So'rovni har safar yangidan yaratuvchi funksiya (qayta urinish uchun)
+
+        Returns:
+            So'rov natijasi
+
+        Raises:
+            TelegramRetryAfter: max_retries urinishdan keyin ham 429 kelsa
+        """
+        bucket = self._chat(chat_id)
+        attempt = 0
+        while True:
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                return await call()
+            except TelegramRetryAfter as e:
+                attempt += 1
+                self.retried += 1
+                REQUESTS.inc(source='telegram', result='retry_after')
+                if attempt > self.max_retries:
+                    raise
+                logger.warning(f"Flood limit: chat {chat_id}, {e.retry_after}s kutiladi ({attempt}/{self.max_retries})")
+                bucket.pause(e.retry_after)
+
+    def try_send_now(self, chat_id: int) -> bool:
+        """
+        Muhim bo'lmagan xabar (masalan, progress) uchun: token darhol bo'lsa True.
+        False bo'lsa xabarni tashlab yuborish kerak - yuklamalar kutib qolmasin.
+        Token faqat ikkala bucket'da ham bo'lsa olinadi: tashlangan xabar
+        chatning haqiqiy yuborishlari uchun tokenni sarflamaydi.
+        """
+        bucket = self._chat(chat_id)
+        if not (bucket.ready() and self.global_bucket.ready()):
+            return False
+        return bucket.try_acquire() and self.global_bucket.try_acquire()
+
+    def stats(self) -> dict:
+        return {'chats': len(self._chats), 'retried': self.retried}
+
+
+uploader = Uploader()
@@ -0,0 +1,132 @@
+"""
+URL Router Module
+Xabardagi havolalarni aniqlash va platforma bo'yicha yo'naltirish
+
+Barcha qo'llab-quvvatlanadigan havolalar (Instagram, TikTok, YouTube) bitta
+oldindan kompilyatsiya qilingan regex bilan bir o'tishda topiladi, shuning
+uchun tekshiruv har bir xabarda arzon. Havola matnning istalgan joyida
+bo'lishi mumkin ("Mana shu qo'shiq: https://...").
+
+Har bir havola kanonik ko'rinishga keltiriladi: URL faqat post/video ID'dan
+qayta quriladi, shuning uchun `igsh`, `utm_*`, `si`, `t` kabi kuzatuv
+parametrlari tushib qoladi va bir xil post uchun kesh kaliti bitta bo'ladi.
+
+Misol:
+    @route(INSTAGRAM, TIKTOK)
+    async def handle_video_link(link, message, workspace): ...
+
+    for link in extract_links(message.text):
+        await dispatch(link, message, workspace)
+"""
+
+import re
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+INSTAGRAM = 'instagram'
+TIKTOK = 'tiktok'
+YOUTUBE = 'youtube'
+
+# Havola chapdan so'z, nuqta, chiziqcha yoki "/" bilan yopishmagan bo'lishi kerak:
+# notinstagram.com/p/x, evilyoutube.com/watch?v=... va boshqa domen yo'lidagi
+# example.com/youtube.com/... havola hisoblanmaydi
+_LINK = re.compile(r"""
+    (?<![\w./-])
+    (?:https?://)?(?:www\.|m\.)?
+    (?:
+        instagram\.com/(?:[\w.-]+/)?(?:p|reel|reels|tv)/(?P<ig>[\w-]+)
+      | (?:vm|vt)\.tiktok\.com/(?P<tt_short>[\w-]+)
+      | tiktok\.com/t/(?P<tt_t>[\w-]+)
+      | tiktok\.com/@(?P<tt_user>[\w.-]*)/(?:video|photo)/(?P<tt>\d+)
+      | youtu\.be/(?P<yt_short>[\w-]{11})
+      | (?:music\.)?youtube\.com/
+        (?:watch\?(?:[^\s#]*?&)?v=|shorts/|embed/|live/)(?P<yt>[\w-]{11})
+    )
+""", re.VERBOSE | re.IGNORECASE)
+
+
+class Link(NamedTuple):
+    """Xabardan topilgan havola"""
+    platform: str   # INSTAGRAM, TIKTOK yoki YOUTUBE
+    id: str         # Post shortcode, TikTok/YouTube video ID yoki qisqa link kodi
+    url: str        # Kanonik URL (kuzatuv parametrlarisiz)
+    key: str        # Kesh va birlashtirish kaliti: ig:..., tt:..., yt:...
+
+
+def _link(match: re.Match) -> Link:
+    """Regex natijasidan kanonik havola yasash"""
+    group = match.lastgroup
+    value = match.group(group)
+    if group == 'ig':
+        return Link(INSTAGRAM, value, f"https://www.instagram.com/p/{value}/", f"ig:{value}")
+    if group == 'tt':
+        user = match.group('tt_user')
+        return Link(TIKTOK, value, f"https://www.tiktok.com/@{user}/video/{value}", f"tt:{value}")
+    if group in ('tt_short', 'tt_t'):
+        # Qisqa link: video ID faqat redirect'dan keyin ma'lum bo'ladi (yt-dlp o'zi ochadi)
+        return Link(TIKTOK, value, f"https://vm.tiktok.com/{value}/", f"tt:s:{value}")
+    return Link(YOUTUBE, value, f"https://www.youtube.com/watch?v={value}", f"yt:{value}")
+
+
+def extract_links(text: Optional[str]) -> List[Link]:
+    """
+    Matndagi barcha qo'llab-quvvatlanadigan havolalarni olish (takrorlarsiz, tartib saqlanadi)
+
+    Args:
+        text: Xabar matni
+
+    Returns:
+        Havolalar ro'yxati (havola bo'lmasa bo'sh)
+    """
+    if not text or '.' not in text:
+        return []
+    links = {}
+    for match in _LINK.finditer(text):
+        link = _link(match)
+        links.setdefault(link.key, link)
+    return list(links.values())
+
+
+def parse_link(url: str) -> Optional[Link]:
+    """Birinchi havola yoki None"""
+    match = _LINK.search(url or '')
+    return _link(match) if match else None
+
+
+def canonical_key(url: str) -> Optional[str]:
+    """
+    URL uchun kesh kaliti (ig:{shortcode}, tt:{id}, yt:{id})
+
+    Args:
+        url: Havola (kuzatuv parametrlari bilan ham bo'lishi mumkin)
+
+    Returns:
+        Kalit yoki None (qo'llab-quvvatlanmaydigan havola)
+    """
+    link = parse_link(url)
+    return link.key if link else None
+
+
+# Platforma -> handler (run.py'da @route bilan ro'yxatga olinadi)
+_routes: Dict[str, Callable[..., Awaitable]] = {}
+
+
+def route(*platforms: str):
+    """Handler'ni bir yoki bir nechta platforma uchun ro'yxatga olish (dekorator)"""
+    def decorator(handler):
+        for platform in platforms:
+            _routes[platform] = handler
+        return handler
+    return decorator
+
+
+async def dispatch(link: Link, *args, **kwargs):
+    """
+    Havolani o'z platformasi handler'iga yuborish
+
+    Raises:
+        LookupError: Platforma uchun handler ro'yxatga olinmagan bo'lsa
+    """
+    handler = _routes.get(link.platform)
+    if handler is None:
+        raise LookupError(f"{link.platform} uchun handler yo'q")
+    return await handler(link, *args, **kwargs)
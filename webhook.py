@@ -0,0 +1,71 @@
+"""
+Webhook Module
+Long polling o'rniga aiohttp webhook server orqali update'larni qabul qilish
+
+Telegram update'larni to'g'ridan-to'g'ri shu serverga POST qiladi, shuning uchun
+getUpdates tsikli kechikishi va bitta ulanish cheklovi bo'lmaydi.
+X-Telegram-Bot-Api-Secret-Token sarlavhasi WEBHOOK_SECRET bilan tekshiriladi.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+logger = logging.getLogger(__name__)
+
+
+async def run_webhook(
+    dp: Dispatcher,
+    bot: Bot,
+    base_url: str,
+    path: str = "/webhook",
+    secret: Optional[str] = None,
+    host: str = "0.0.0.0",
+    port: int = 8080,
+    set_webhook: bool = True
+) -> None:
+    """
+    Webhook serverni ishga tushirish (to'xtatilguncha ishlaydi)
+
+    Args:
+        dp: Dispatcher
+        bot: Bot
+        base_url: Tashqi HTTPS manzil (masalan: https://mybot.herokuapp.com)
+        path: Webhook yo'li
+        secret: Telegram yuboradigan maxfiy token (None - tekshirilmaydi)
+        host: Tinglanadigan interfeys
+        port: Tinglanadigan port
+        set_webhook: Ishga tushganda Telegram'da webhook'ni o'rnatish
+    """
+    async def on_startup(bot: Bot):
+        if set_webhook:
+            await bot.set_webhook(f"{base_url.rstrip('/')}{path}", secret_token=secret)
+            logger.info(f"Webhook o'rnatildi: {base_url.rstrip('/')}{path}")
+
+    dp.startup.register(on_startup)
+
+    app = web.Application()
+    # handle_in_background=True: Telegram'ga darhol 200 javob qaytariladi,
+    # update esa alohida task'da qayta ishlanadi
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=secret,
+        handle_in_background=True
+    ).register(app, path=path)
+    setup_application(app, dp, bot=bot)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info(f"Webhook server ishga tushdi: http://{host}:{port}{path}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
@@ -0,0 +1,119 @@
+"""
+Webhook Replay
+Yozib olingan update'larni lokal webhook serverga yuborib, o'tkazuvchanlikni o'lchash
+
+Ishlatish:
+    # Bot: BOT_MODE=webhook WEBHOOK_REGISTER=0 WEBHOOK_SECRET=test python run.py
+    python webhook_replay.py updates.jsonl --secret test --concurrency 50 --repeat 10
+    python webhook_replay.py --synthetic 1000 --text /salom --secret test
+
+updates.jsonl - har bir qatorda bitta Telegram Update JSON obyekti.
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+import aiohttp
+
+
+def synthetic_updates(count: int, text: str) -> list:
+    """Har xil foydalanuvchilardan matnli xabarlar (update) yaratish"""
+    now = int(time.time())
+    updates = []
+    for i in range(count):
+        user = {'id': 100000 + i, 'is_bot': False, 'first_name': f"User{i}"}
+        updates.append({
+            'update_id': i + 1,
+            'message': {
+                'message_id': i + 1,
+                'date': now,
+                'chat': {'id': user['id'], 'type': 'private', 'first_name': user['first_name']},
+                'from': user,
+                'text': text,
+            }
+        })
+    return updates
+
+
+def load_updates(path: str) -> list:
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+
+async def replay(url: str, updates: list, secret: str, concurrency: int) -> None:
+    headers = {'Content-Type': 'application/json'}
+    if secret:
+        headers['X-Telegram-Bot-Api-Secret-Token'] = secret
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async with aiohttp.ClientSession(headers=headers) as session:
+        async def post(update):
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    async with session.post(url, data=json.dumps(update)) as resp:
+                        await resp.read()
+                        if resp.status != 200:
+                            errors += 1
+                except aiohttp.ClientError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[post(u) for u in updates])
+        elapsed = time.perf_counter() - started
+
+    print(f"Yuborildi: {len(updates)} ta update, xatolar: {errors}")
+    print(f"Vaqt: {elapsed:.2f}s, o'tkazuvchanlik: {len(updates) / elapsed:.1f} update/s")
+    print(
+        f"Kechikish: p50={percentile(latencies, 50) * 1000:.1f}ms "
+        f"p95={percentile(latencies, 95) * 1000:.1f}ms "
+        f"p99={percentile(latencies, 99) * 1000:.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update'larni lokal webhook'ga qayta yuborish")
+    parser.add_argument('file', nargs='?', help="Update'lar JSONL fayli")
+    parser.add_argument('--url', default='http://127.0.0.1:8080/webhook')
+    parser.add_argument('--secret', default='')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--synthetic', type=int, default=0, help="Fayl o'rniga N ta sun'iy update")
+    parser.add_argument('--text', default='/salom', help="Sun'iy update matni")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        updates = synthetic_updates(args.synthetic, args.text)
+    elif args.file:
+        updates = load_updates(args.file)
+    else:
+        parser.error("Update'lar fayli yoki --synthetic N kerak")
+        return
+
+    # update_id takrorlanmasligi kerak
+    batch = []
+    for r in range(args.repeat):
+        for u in updates:
+            batch.append({**u, 'update_id': len(batch) + 1})
+
+    asyncio.run(replay(args.url, batch, args.secret, args.concurrency))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,379 @@
+"""
+Worker Module
+Yuklab olish ishlarini bot jarayonidan alohida worker jarayonlarida bajarish
+
+Bitta jarayonda aiogram Dispatcher ham, yt-dlp/ffmpeg ishlari ham ishlasa,
+CPU'ga og'ir ishlar (yt-dlp parsing, audio kodlash) update'larni qayta
+ishlashni sekinlashtiradi va bot faqat bitta yadrodan foydalanadi.
+WORKER_MODE=1 bo'lsa bot faqat Telegram bilan ishlaydi, yuklashlar esa
+broker (SQLite navbat) orqali shu jarayonlarga yuboriladi.
+
+Ishga tushirish (bot bilan bitta mashinada, umumiy disk bilan):
+    WORKER_MODE=1 python run.py
+    WORKER_MODE=1 python worker.py                # WORKER_PROCESSES ta jarayon
+    WORKER_MODE=1 python worker.py --processes 4
+
+Bot natijani kutmay qo'ysa (timeout yoki handler bekor qilindi), ish
+keyingi heartbeat'da to'xtatiladi; bot olmagan natija fayllari o'chiriladi.
+
+Broker'ga yozishlar (claim, heartbeat, hodisalar) jarayonning broker
+thread'ida bajariladi: boshqa jarayonlar SQLite qulfini ushlab turganda
+event loop va yt-dlp thread'lari kutib qolmaydi. yt-dlp progress hook'i
+faqat oxirgi holatni eslab qoladi, uni PROGRESS_INTERVAL da bir marta
+broker thread'i yozadi.
+
+SIGTERM/SIGINT kelganda worker'lar yangi ish olmaydi, bajarilayotgan
+ishlarni tugatadi (WORKER_DRAIN_TIMEOUT gacha) va keyin to'xtaydi.
+
+Har bir jarayon birlashtirilgan yuklashlarni WORK_DIR/.shared/worker-<n>/
+papkasida tayyorlaydi va ishga tushganda faqat shu papkani tozalaydi (bot
+qayta ishga tushsa ham .shared/ ga tegmaydi). Bitta WORK_DIR uchun bitta
+worker.py ishga tushiriladi.
+"""
+
+import os
+import sys
+import time
+import signal
+import socket
+import asyncio
+import logging
+import argparse
+import multiprocessing
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+import instagram_downloader
+from broker import broker, ITEM, PROGRESS, RESULT, ERROR
+from scheduler import scheduler, current_job, job_context, TRANSCODE
+from url_router import Link
+
+logger = logging.getLogger(__name__)
+
+# Worker tirikligini bildirish oralig'i va "yetim" ish chegarasi (sekund)
+HEARTBEAT_INTERVAL = 5.0
+STALE_AFTER = 60.0
+
+# Progress hodisalari orasidagi eng kam vaqt (bot baribir siyraklashtiradi,
+# bu esa SQLite'ga yozishlar sonini cheklaydi)
+PROGRESS_INTERVAL = 1.0
+
+
+# ISH TURLARI (worker tomonida bajariladi)
+
+
+async def _video_content(payload: dict, emit: Callable[[Any], Awaitable[None]]) -> Any:
+    return await instagram_downloader.download_video_content(Link(*payload['link']), payload['output_dir'])
+
+
+async def _song_query(payload: dict, emit: Callable[[Any], Awaitable[None]]) -> Any:
+    return await instagram_downloader.fetch_song_query(Link(*payload['link']))
+
+
+async def _youtube_audio(payload: dict, emit: Callable[[Any], Awaitable[None]]) -> Any:
+    return await instagram_downloader.download_youtube_audio(payload['query'], payload['output_dir'])
+
+
+async def _youtube_link(payload: dict, emit: Callable[[Any], Awaitable[None]]) -> Any:
+    return await instagram_downloader.download_youtube_link(payload['video_id'], payload['output_dir'])
+
+
+async def _youtube_batch(payload: dict, emit: Callable[[Any], Awaitable[None]]) -> Any:
+    async for item in instagram_downloader.iter_batch_youtube_audio(
+        payload['query'], limit=payload['limit'], output_dir=payload['output_dir']
+    ):
+        await emit(item)
+    return None
+
+
+HANDLERS: Dict[str, Callable[[dict, Callable[[Any], Awaitable[None]]], Awaitable[Any]]] = {
+    'video_content': _video_content,
+    'song_query': _song_query,
+    'youtube_audio': _youtube_audio,
+    'youtube_link': _youtube_link,
+    'youtube_batch': _youtube_batch,
+}
+
+
+# BOT TOMONI: instagram_downloader funksiyalari bilan bir xil imzo
+
+
+class RemoteDownloads:
+    """
+    instagram_downloader o'rniga ishlatiladigan obyekt: har bir chaqiruv
+    broker orqali worker'ga yuboriladi. Navbatdagi o'rin (scheduler) worker
+    jarayonida hisoblanadi, shuning uchun user_id ham birga yuboriladi.
+    """
+
+    def __init__(self, timeout: float = 900):
+        self.timeout = timeout
+
+    @staticmethod
+    def _user_id() -> Optional[int]:
+        job = current_job()
+        return job.user_id if job is not None else None
+
+    @staticmethod
+    def _on_progress():
+        job = current_job()
+        return job.on_progress if job is not None else None
+
+    async def _call(self, kind: str, **payload) -> Any:
+        on_progress = self._on_progress()
+        return await broker.call(
+            kind, {**payload, 'user_id': self._user_id(), 'progress': on_progress is not None},
+            timeout=self.timeout, on_progress=on_progress
+        )
+
+    async def download_video_content(self, link: Link, output_dir: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        return tuple(await self._call('video_content', link=list(link), output_dir=output_dir))
+
+    async def fetch_song_query(self, link: Link) -> Optional[str]:
+        return await self._call('song_query', link=list(link))
+
+    async def download_youtube_audio(self, query: str, output_dir: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        return tuple(await self._call('youtube_audio', query=query, output_dir=output_dir))
+
+    async def download_youtube_link(self, video_id: str, output_dir: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        return tuple(await self._call('youtube_link', video_id=video_id, output_dir=output_dir))
+
+    async def iter_batch_youtube_audio(self, query: str, limit: int, output_dir: str) -> AsyncIterator[Tuple[str, str, str]]:
+        payload = {'query': query, 'limit': limit, 'output_dir': output_dir, 'user_id': self._user_id()}
+        async for item in broker.stream('youtube_batch', payload, timeout=self.timeout):
+            yield tuple(item)
+
+
+# WORKER JARAYONI
+
+
+class Worker:
+    """
+    Bitta worker jarayoni: navbatdan `concurrency` tagacha ishni parallel bajaradi.
+    """
+
+    def __init__(self, name: str, concurrency: int = 4):
+        self.name = name
+        self.concurrency = concurrency
+        self.draining = False
+        self.done = 0
+        self.failed = 0
+        self.cancelled = 0
+        self._tasks: set = set()
+        # Bajarilayotgan ishlar: job_id -> task; bot bekor qilganlari
+        self._running: Dict[int, asyncio.Task] = {}
+        self._abandoned: set = set()
+        # Yuborilmagan progress: job_id -> oxirgi holat (faqat event loop'da o'zgartiriladi)
+        self._progress: Dict[int, dict] = {}
+
+    async def run(self, drain_timeout: float = 300) -> None:
+        """Navbatdan ish olish (drain() chaqirilguncha), so'ng ishlarni tugatish"""
+        heartbeat = asyncio.create_task(self._heartbeat())
+        progress = asyncio.create_task(self._flush_progress())
+        try:
+            while not self.draining:
+                if len(self._tasks) >= self.concurrency:
+                    await asyncio.wait(self._tasks, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                job = await broker.in_thread(broker.claim, self.name)
+                if job is None:
+                    await asyncio.sleep(broker.poll_interval)
+                    continue
+                task = asyncio.create_task(self._execute(*job))
+                self._tasks.add(task)
+                self._running[job[0]] = task
+                task.add_done_callback(self._tasks.discard)
+                task.add_done_callback(lambda _, job_id=job[0]: self._running.pop(job_id, None))
+
+            if self._tasks:
+                logger.info(f"{self.name}: {len(self._tasks)} ta ish tugashi kutilmoqda (drain)")
+                _, pending = await asyncio.wait(self._tasks, timeout=drain_timeout)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    # Bekor qilingan ishlar boshqa worker'ga o'tadi (heartbeat to'xtagach)
+                    logger.warning(f"{self.name}: {len(pending)} ta ish drain vaqtida tugamadi")
+                    await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            heartbeat.cancel()
+            progress.cancel()
+        logger.info(
+            f"{self.name} to'xtadi: bajarildi={self.done}, xatolik={self.failed}, bekor qilindi={self.cancelled}"
+        )
+
+    def drain(self) -> None:
+        """Yangi ish olmaslik (bajarilayotganlari tugatiladi)"""
+        if not self.draining:
+            logger.info(f"{self.name}: to'xtatish signali, yangi ishlar olinmaydi")
+        self.draining = True
+
+    async def _execute(self, job_id: int, kind: str, payload: dict) -> None:
+        handler = HANDLERS.get(kind)
+        output_dir = payload.get('output_dir')
+
+        async def deliver(event: str, data: Any) -> None:
+            # Bot ishni bekor qilgan bo'lsa natija fayllari hech kimga kerak emas
+            if not await broker.in_thread(broker.emit, job_id, event, data):
+                _remove_outputs(data, output_dir)
+
+        try:
+            if handler is None:
+                raise LookupError(f"Noma'lum ish turi: {kind}")
+            with job_context(payload.get('user_id')) as job:
+                if payload.get('progress'):
+                    job.on_progress = self._progress_forwarder(job_id)
+                result = await handler(payload, lambda item: deliver(ITEM, item))
+            await deliver(RESULT, result)
+            self.done += 1
+        except asyncio.CancelledError:
+            if job_id not in self._abandoned:
+                raise
+            # Bot bekor qilgan: ish to'xtatildi, drain'dagi kabi qayta ko'tarilmaydi
+            logger.info(f"{self.name}: {kind} #{job_id} bot tomonidan bekor qilindi")
+            _remove_outputs(None, output_dir)
+            self.cancelled += 1
+        except Exception as e:
+            logger.error(f"{self.name}: {kind} #{job_id} xatolik: {e}")
+            await broker.in_thread(broker.emit, job_id, ERROR, str(e))
+            self.failed += 1
+        finally:
+            self._progress.pop(job_id, None)
+            if job_id in self._abandoned:
+                self._abandoned.discard(job_id)
+                await broker.in_thread(broker.discard, job_id)
+
+    async def _cancel_abandoned(self) -> None:
+        """Bot bekor qilgan ishlarni to'xtatish"""
+        for job_id in await broker.in_thread(broker.cancelled, self.name):
+            task = self._running.get(job_id)
+            if task is None:
+                # Ish allaqachon tugagan (natija fayllari deliver() da o'chirilgan)
+                await broker.in_thread(broker.discard, job_id)
+            elif job_id not in self._abandoned:
+                self._abandoned.add(job_id)
+                task.cancel()
+
+    async def _heartbeat(self) -> None:
+        while True:
+            try:
+                await broker.in_thread(broker.heartbeat, self.name)
+                await self._cancel_abandoned()
+                await broker.in_thread(broker.requeue_stale, STALE_AFTER)
+            except Exception as e:
+                logger.error(f"{self.name}: heartbeat xatolik: {e}")
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    def _progress_forwarder(self, job_id: int) -> Callable[[dict], None]:
+        """
+        yt-dlp thread'idan kelgan progressni navbatga qo'yish (PROGRESS_INTERVAL da
+        bir marta, oxirgi holat eskisining o'rnini egallaydi). SQLite'ga yozmaydi.
+        """
+        loop = asyncio.get_running_loop()
+        last = 0.0
+
+        def forward(snap: dict) -> None:
+            nonlocal last
+            now = time.monotonic()
+            if now - last >= PROGRESS_INTERVAL:
+                last = now
+                loop.call_soon_threadsafe(self._queue_progress, job_id, snap)
+        return forward
+
+    def _queue_progress(self, job_id: int, snap: dict) -> None:
+        self._progress[job_id] = snap
+
+    async def _flush_progress(self) -> None:
+        """Navbatdagi progress hodisalarini broker thread'ida yozish"""
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            pending, self._progress = self._progress, {}
+            for job_id, snap in pending.items():
+                try:
+                    # Ish tugagan yoki bekor qilingan bo'lsa emit() hodisani yozmaydi
+                    await broker.in_thread(broker.emit, job_id, PROGRESS, snap)
+                except Exception as e:
+                    logger.debug(f"{self.name}: progress #{job_id} yozilmadi: {e}")
+
+
+def _remove_outputs(data: Any, output_dir: Optional[str]) -> None:
+    """Natijadagi so'rov papkasiga tegishli fayllarni o'chirish (bot olmagan natija)"""
+    if not output_dir:
+        return
+    root = os.path.abspath(output_dir)
+    for value in data if isinstance(data, (list, tuple)) else ():
+        if isinstance(value, str) and os.path.abspath(value).startswith(root + os.sep):
+            try:
+                os.remove(value)
+            except OSError:
+                pass
+    # Bot so'rov papkasini allaqachon o'chirgan bo'lsa, worker uni qayta yaratgan bo'ladi
+    try:
+        os.rmdir(root)
+    except OSError:
+        pass
+
+
+async def _worker_main(name: str, staging: str, concurrency: int, drain_timeout: float,
+                       transcode_workers: int) -> None:
+    import runtime
+    import workspace
+    # Bot jarayonining ishchi papkalari tozalanmaydi (sweep'siz sozlash),
+    # faqat shu worker'ning oldingi ishga tushirishdan qolgan .shared/ papkasi
+    runtime.setup_downloads()
+    workspace.configure(staging=staging)
+    workspace.sweep_staging()
+    # TRANSCODE_WORKERS butun mashina uchun: jarayonlar o'rtasida bo'linadi
+    scheduler.configure(limits={TRANSCODE: transcode_workers})
+    worker = Worker(name, concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.drain)
+    try:
+        await worker.run(drain_timeout)
+    finally:
+        broker.close()
+        runtime.teardown_downloads()
+
+
+def _process_entry(name: str, staging: str, concurrency: int, drain_timeout: float, transcode_workers: int) -> None:
+    logging.basicConfig(level=logging.INFO, format=f"%(asctime)s [{name}] %(name)s: %(message)s")
+    asyncio.run(_worker_main(name, staging, concurrency, drain_timeout, transcode_workers))
+
+
+def main() -> int:
+    from config import WORKER_PROCESSES, WORKER_CONCURRENCY, WORKER_DRAIN_TIMEOUT, TRANSCODE_WORKERS
+
+    parser = argparse.ArgumentParser(description="Yuklab olish worker jarayonlari")
+    parser.add_argument('--processes', type=int, default=WORKER_PROCESSES, help="Jarayonlar soni (standart: CPU yadrolari)")
+    parser.add_argument('--concurrency', type=int, default=WORKER_CONCURRENCY, help="Bitta jarayondagi parallel ishlar")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    host = socket.gethostname()
+    count = max(1, args.processes)
+    transcode_workers = max(1, TRANSCODE_WORKERS // count)
+    processes = []
+    for i in range(count):
+        p = multiprocessing.Process(
+            target=_process_entry,
+            # Staging papka nomi qayta ishga tushganda o'zgarmaydi: qolib ketgan fayllar tozalanadi
+            args=(f"{host}-{os.getpid()}-{i}", f"worker-{i}", args.concurrency, WORKER_DRAIN_TIMEOUT, transcode_workers),
+            daemon=False
+        )
+        p.start()
+        processes.append(p)
+    logger.info(f"{len(processes)} ta worker ishga tushdi (har biri {args.concurrency} tagacha parallel ish)")
+
+    def forward(signum, _frame):
+        # Har bir worker o'z ishlarini tugatib to'xtaydi
+        for p in processes:
+            if p.is_alive():
+                os.kill(p.pid, signum)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for p in processes:
+        p.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Workspace Module
+Har bir so'rov uchun alohida vaqtinchalik papka va disk hajmi nazorati
+
+Tuzilma:
+    downloads/
+        jobs/<id>/     - bitta so'rovning fayllari (so'rov tugaganda o'chiriladi)
+        .shared/<key>/ - birlashtirilgan (single-flight) yuklashlar natijasi
+        .shared/<worker>/<key>/ - WORKER_MODE'da har bir worker jarayonining o'z papkasi
+
+Handler xatolik bilan tugasa ham papka `finally` ichida o'chiriladi, bot ishga
+tushganda esa oldingi ishdan qolgan fayllar tozalanadi. WORKER_MODE'da bot
+.shared/ ga tegmaydi (worker'lar ishlashda davom etayotgan bo'lishi mumkin):
+har bir worker ishga tushganda faqat o'z papkasini tozalaydi.
+"""
+
+import os
+import time
+import uuid
+import shutil
+import asyncio
+import logging
+from typing import Optional
+
+from scheduler import scheduler, DOWNLOAD, TRANSCODE, UPLOAD
+
+logger = logging.getLogger(__name__)
+
+# Barcha vaqtinchalik fayllar shu papkada
+WORK_ROOT = "downloads"
+
+# Disk limiti (bayt): undan oshsa yangi yuklashlar joy bo'shashini kutadi
+DISK_BUDGET_BYTES = 2 * 1024 * 1024 * 1024
+
+# Birlashtirilgan yuklashlar papkasi nomi (WORK_ROOT ichida)
+SHARED = ".shared"
+
+# .shared/ ichidagi jarayon papkasi (worker.py o'rnatadi; bo'sh - to'g'ridan-to'g'ri .shared/)
+STAGING = ""
+
+
+def configure(root: Optional[str] = None, budget_bytes: Optional[int] = None,
+              staging: Optional[str] = None) -> None:
+    """Ishchi papka, disk limiti va jarayon papkasini o'rnatish (ishga tushishda)"""
+    global WORK_ROOT, DISK_BUDGET_BYTES, STAGING
+    if root is not None:
+        WORK_ROOT = root
+    if budget_bytes is not None:
+        DISK_BUDGET_BYTES = budget_bytes
+    if staging is not None:
+        STAGING = staging
+
+
+def jobs_dir() -> str:
+    return os.path.join(WORK_ROOT, "jobs")
+
+
+def shared_dir() -> str:
+    return os.path.join(WORK_ROOT, SHARED, STAGING) if STAGING else os.path.join(WORK_ROOT, SHARED)
+
+
+class Workspace:
+    """
+    Bitta so'rovning vaqtinchalik papkasi.
+
+    Papka birinchi marta `path` so'ralganda yaratiladi, shuning uchun fayl
+    yuklamaydigan so'rovlar (masalan, /start) diskka tegmaydi.
+
+    Misol:
+        async with Workspace() as ws:
+            path, title, artist = await download_youtube_audio(text, output_dir=ws.path)
+    """
+
+    def __init__(self):
+        self._path = os.path.join(jobs_dir(), uuid.uuid4().hex)
+        self._created = False
+
+    @property
+    def path(self) -> str:
+        if not self._created:
+            os.makedirs(self._path, exist_ok=True)
+            self._created = True
+        return self._path
+
+    def cleanup(self) -> None:
+        """Papkani barcha fayllari bilan o'chirish"""
+        if self._created:
+            shutil.rmtree(self._path, ignore_errors=True)
+            self._created = False
+
+    async def __aenter__(self) -> "Workspace":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.cleanup()
+
+
+def sweep_leftovers(keep_shared: bool = False) -> None:
+    """
+    Oldingi ishga tushirishdan qolgan vaqtinchalik fayllarni o'chirish
+    (bot to'satdan to'xtaganda jobs/ va .shared/ da fayllar qolib ketadi)
+
+    Args:
+        keep_shared: .shared/ ni qoldirish (WORKER_MODE: uni worker'lar ishlatadi)
+    """
+    removed = _remove_contents(WORK_ROOT, skip=(SHARED,) if keep_shared else ())
+    if removed:
+        logger.info(f"Ishga tushishda {removed} ta qolib ketgan fayl/papka o'chirildi")
+
+
+def sweep_staging() -> None:
+    """Shu jarayonning .shared/ papkasini tozalash (worker ishga tushganda)"""
+    removed = _remove_contents(shared_dir())
+    if removed:
+        logger.info(f"{shared_dir()}: {removed} ta qolib ketgan papka o'chirildi")
+
+
+def _remove_contents(path: str, skip: tuple = ()) -> int:
+    """Papka ichidagi barcha fayl/papkalarni o'chirish (skip'dagi nomlardan tashqari)"""
+    if not os.path.isdir(path):
+        return 0
+    removed = 0
+    for entry in os.scandir(path):
+        if entry.name in skip:
+            continue
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.remove(entry.path)
+            removed += 1
+        except OSError as e:
+            logger.error(f"Qolib ketgan faylni o'chirishda xatolik {entry.path}: {e}")
+    return removed
+
+
+def disk_usage() -> int:
+    """
+    Ishchi papkadagi fayllarning umumiy hajmi (bayt)
+
+    Bir faylga bir nechta hardlink bo'lsa (.shared/ yoki media keshdan jobs/ ga),
+    u bir marta hisoblanadi.
+    """
+    total = 0
+    seen = set()
+    stack = [WORK_ROOT]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if st.st_nlink > 1:
+                inode = (st.st_dev, st.st_ino)
+                if inode in seen:
+                    continue
+                seen.add(inode)
+            total += st.st_size
+    return total
+
+
+def _pipeline_idle() -> bool:
+    """Jarayonda fayl yozayotgan yoki ushlab turgan ish (yuklash/transcode/yuborish) yo'qmi"""
+    return not any(scheduler.active(kind) for kind in (DOWNLOAD, TRANSCODE, UPLOAD))
+
+
+class DiskBudget:
+    """
+    Disk limiti bo'yicha backpressure: limitdan oshganda yangi yuklashlar
+    boshqa so'rovlar tugab, joy bo'shashini kutadi.
+
+    Papka hajmi event loop'dan tashqarida (default executor'da) hisoblanadi:
+    yt-dlp pool'i band bo'lsa ham hisoblash uning navbatida turmaydi.
+    Hech qanday ish bajarilmayotgan bo'lsa, joy bo'shatadigan hech kim yo'q -
+    limitdan katta bitta so'rov (masalan, artist batch) abadiy kutib qolmasligi
+    uchun yuklash o'tkaziladi.
+    """
+
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self._usage = 0
+        self._checked_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def usage(self) -> int:
+        """Disk hajmi (natija `check_interval` davomida keshlanadi, bir vaqtda bitta hisoblash)"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if time.monotonic() - self._checked_at >= self.check_interval:
+                loop = asyncio.get_running_loop()
+                self._usage = await loop.run_in_executor(None, disk_usage)
+                self._checked_at = time.monotonic()
+        return self._usage
+
+    async def wait_for_space(self) -> None:
+        """Disk limitidan pastga tushguncha (yoki boshqa ish qolmaguncha) kutish"""
+        warned = False
+        while await self.usage() >= DISK_BUDGET_BYTES:
+            if _pipeline_idle():
+                logger.warning(
+                    f"Disk limitidan oshgan ({self._usage / 1024 / 1024:.0f} MB), lekin boshqa "
+                    f"ish yo'q - yuklash o'tkazildi"
+                )
+                return
+            if not warned:
+                logger.warning(
+                    f"Disk limiti to'ldi ({self._usage / 1024 / 1024:.0f} MB), "
+                    f"yangi yuklashlar joy bo'shashini kutmoqda"
+                )
+                warned = True
+            await asyncio.sleep(self.check_interval)
+
+
+# Jarayon uchun yagona disk nazoratchisi
+disk_budget = DiskBudget()
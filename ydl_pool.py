@@ -0,0 +1,175 @@
+"""
+YoutubeDL Pool Module
+Qayta ishlatiladigan yt_dlp.YoutubeDL obyektlari (profil bo'yicha pool)
+
+Har bir `yt_dlp.YoutubeDL(opts)` yaratilganda extractor'lar, cookie jar va
+HTTP handler'lar qaytadan ishga tushiriladi va keep-alive ulanishlar yo'qoladi.
+Pool har bir profil (search, audio, video) uchun uzoq yashaydigan obyektlarni
+saqlaydi: ish vaqtida obyekt faqat bitta thread'ga beriladi (checkout) va
+ishdan so'ng poolga qaytariladi.
+
+Misol:
+    with audio_pool.checkout(outtmpl=path, progress_hooks=[on_progress]) as ydl:
+        ydl.download([url])
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Tuple
+
+import yt_dlp
+
+from metrics import YDL_FIRST_BYTE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class _PooledYdl:
+    """
+    Pooldagi bitta YoutubeDL. Hook'lar yaratishda bir marta o'rnatiladi
+    (yt-dlp ularni postprocessor'larga bog'lab qo'yadi), checkout'dagi
+    hook'lar esa shu dispetcherlar orqali chaqiriladi.
+    """
+
+    def __init__(self, profile: str, params: dict):
+        self.profile = profile
+        self.uses = 0
+        self.progress_hooks: List[Callable] = []
+        self.postprocessor_hooks: List[Callable] = []
+        self._started: Optional[float] = None
+        self.ydl = yt_dlp.YoutubeDL({
+            **params,
+            'progress_hooks': [self._on_progress],
+            'postprocessor_hooks': [self._on_postprocess],
+        })
+
+    def _on_progress(self, d: dict) -> None:
+        if self._started is not None and d.get('status') == 'downloading' and d.get('downloaded_bytes'):
+            # Birinchi bayt: yangi obyekt va qayta ishlatilgan obyektni solishtirish uchun
+            YDL_FIRST_BYTE_SECONDS.observe(
+                time.perf_counter() - self._started,
+                profile=self.profile,
+                warm='1' if self.uses > 1 else '0'
+            )
+            self._started = None
+        for hook in self.progress_hooks:
+            hook(d)
+
+    def _on_postprocess(self, d: dict) -> None:
+        for hook in self.postprocessor_hooks:
+            hook(d)
+
+
+class YdlPool:
+    """
+    Bitta parametr profili uchun YoutubeDL obyektlari puli.
+
+    Checkout hech qachon kutmaydi: bo'sh obyekt bo'lmasa yangisi yaratiladi
+    (parallellik scheduler va executor tomonidan cheklanadi). Poolda eng ko'pi
+    `max_idle` ta bo'sh obyekt saqlanadi. Xatolik bilan tugagan yoki `max_uses`
+    martadan ko'p ishlatilgan obyekt yopiladi.
+    """
+
+    def __init__(self, profile: str, params: Callable[[], dict], max_idle: int = 8, max_uses: int = 200):
+        """
+        Args:
+            profile: Profil nomi (log va metrikalar uchun)
+            params: YoutubeDL parametrlarini qaytaruvchi funksiya (birinchi
+                yaratishda chaqiriladi, shuning uchun media.configure() ta'sir qiladi)
+            max_idle: Poolda saqlanadigan bo'sh obyektlar soni
+            max_uses: Bitta obyektning qayta ishlatilish chegarasi
+        """
+        self.profile = profile
+        self.params = params
+        self.max_idle = max_idle
+        self.max_uses = max_uses
+        self.created = 0
+        self.reused = 0
+        self._idle: List[_PooledYdl] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def checkout(self, **overrides):
+        """
+        Obyektni vaqtincha olish
+
+        Args:
+            **overrides: Shu checkout uchun parametrlar (outtmpl, format,
+                progress_hooks, postprocessor_hooks va h.k.), qaytarishda tiklanadi
+        """
+        item = self._take()
+        item.uses += 1
+        item._started = time.perf_counter()
+        saved, absent = self._apply(item, overrides)
+        ok = False
+        try:
+            yield item.ydl
+            ok = True
+        finally:
+            item.progress_hooks = []
+            item.postprocessor_hooks = []
+            item._started = None
+            item.ydl.params.update(saved)
+            for key in absent:
+                item.ydl.params.pop(key, None)
+            self._give_back(item, ok)
+
+    def stats(self) -> dict:
+        with self._lock:
+            idle = len(self._idle)
+        return {'created': self.created, 'reused': self.reused, 'idle': idle}
+
+    def close(self) -> None:
+        """Bo'sh obyektlarni yopish"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for item in idle:
+            self._close(item)
+
+    def _take(self) -> _PooledYdl:
+        with self._lock:
+            if self._idle:
+                self.reused += 1
+                return self._idle.pop()
+            self.created += 1
+        return _PooledYdl(self.profile, self.params())
+
+    def _give_back(self, item: _PooledYdl, ok: bool) -> None:
+        if ok and item.uses < self.max_uses:
+            # Xatolik kodi keyingi checkout'ga o'tmasin
+            item.ydl._download_retcode = 0
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(item)
+                    return
+        self._close(item)
+
+    @staticmethod
+    def _apply(item: _PooledYdl, overrides: dict) -> Tuple[dict, List[str]]:
+        """
+        Checkout parametrlarini o'rnatish
+
+        Returns:
+            (eski qiymatlar, oldin bo'lmagan kalitlar) - qaytarishda kalitlar
+            o'chiriladi: ba'zi yt-dlp parametrlari uchun None va yo'q kalit farq qiladi
+        """
+        item.progress_hooks = list(overrides.pop('progress_hooks', []))
+        item.postprocessor_hooks = list(overrides.pop('postprocessor_hooks', []))
+        params = item.ydl.params
+        saved = {key: params[key] for key in overrides if key in params}
+        absent = [key for key in overrides if key not in params]
+        for key, value in overrides.items():
+            current = params.get(key)
+            if key == 'outtmpl' and isinstance(current, dict) and not isinstance(value, dict):
+                # yt-dlp outtmpl'ni {'default': ..., 'chapter': ...} ko'rinishida saqlaydi
+                value = {**current, 'default': value}
+            params[key] = value
+        return saved, absent
+
+    def _close(self, item: _PooledYdl) -> None:
+        try:
+            item.ydl.close()
+        except Exception as e:
+            logger.debug(f"{self.profile}: YoutubeDL yopishda xatolik: {e}")